@@ -12,6 +12,9 @@ import streamlit as st
 import mysql.connector
 from mysql.connector import Error
 from db import get_connection
+from utils.recipe_graph import would_create_cake_cycle
+from utils.cost_index import invalidate_recipe_index
+from utils.costing import cake_parts, cake_components, cost_breakdown, component_breakdown
 
 def add_ingredient():
     st.header('Add New Ingredient')
@@ -88,6 +91,7 @@ def add_sub_recipe():
                             c.execute('INSERT INTO sub_recipe_nested (parent_sub_recipe_id, sub_recipe_id, quantity) VALUES (%s, %s, %s)', (sub_recipe_id, item_id, qty))
 
                     conn.commit()
+                    invalidate_recipe_index()
                     st.success(f'Sub-Recipe "{sub_recipe_name}" added successfully!')
                 except mysql.connector.IntegrityError:
                     st.error('Sub-Recipe already exists.')
@@ -103,55 +107,109 @@ def add_sub_recipe():
         st.warning('No ingredients or sub-recipes available.')
 
 
-def add_cake():
-    st.header("Add New Cake")
+def add_cake(cake_id=None):
+    st.header("Add New Cake" if not cake_id else "Edit Cake")
 
     conn = get_connection()
     c = conn.cursor()
+
+    cake_name = ""
+    percent_yield = 0.0
+    existing_parts = []
+    existing_components = []
+    if cake_id:
+        c.execute("SELECT name, percent_yield FROM cakes WHERE id = %s", (cake_id,))
+        row = c.fetchone()
+        if not row:
+            st.error("Cake not found.")
+            conn.close()
+            return
+        cake_name, percent_yield = row[0], float(row[1] or 0)
+        existing_parts = cake_parts(conn, cake_id)
+        existing_components = cake_components(conn, cake_id)
+
     c.execute("SELECT id, name FROM ingredients")
     ingredients = c.fetchall()
     c.execute("SELECT id, name FROM sub_recipes")
     sub_recipes = c.fetchall()
-    conn.close()
+    c.execute("SELECT id, name FROM cakes WHERE id != %s", (cake_id or -1,))
+    other_cakes = c.fetchall()
 
-    cake_name = st.text_input("Cake Name")
-    percent_yield = st.number_input("Percent Yield (%)", min_value=0.0, step=0.01, format="%.2f")
+    cake_name = st.text_input("Cake Name", value=cake_name)
+    percent_yield = st.number_input("Percent Yield (%)", min_value=0.0, step=0.01, format="%.2f", value=percent_yield)
 
-    all_items = [f"{i[1]} (Ingredient ID:{i[0]})" for i in ingredients] + \
-                [f"{s[1]} (Sub-Recipe ID:{s[0]})" for s in sub_recipes]
+    ingredient_labels = {i[0]: f"{i[1]} (Ingredient ID:{i[0]})" for i in ingredients}
+    sub_labels = {s[0]: f"{s[1]} (Sub-Recipe ID:{s[0]})" for s in sub_recipes}
+    cake_labels = {k[0]: f"{k[1]} (Cake ID:{k[0]})" for k in other_cakes}
+    all_items = list(ingredient_labels.values()) + list(sub_labels.values()) + list(cake_labels.values())
 
-    selected_items = st.multiselect("Select Ingredients or Sub-Recipes", all_items)
+    existing_qty = {(item_id, 'subrecipe' if is_sub else 'ingredient'): qty for item_id, is_sub, qty in existing_parts}
+    existing_qty.update({(item_id, 'cake'): qty for item_id, qty in existing_components})
+    default_items = [(sub_labels if is_sub else ingredient_labels).get(item_id) for item_id, is_sub, _ in existing_parts]
+    default_items += [cake_labels.get(item_id) for item_id, _ in existing_components]
+    selected_items = st.multiselect("Select Ingredients, Sub-Recipes, or Other Cakes", all_items,
+                                    default=[label for label in default_items if label])
 
     quantities = {}
     for item in selected_items:
         if "Ingredient ID:" in item:
             item_id = int(item.split('Ingredient ID:')[1].replace(")", ""))
-            key = f"ingredient_{item_id}"
             item_type = 'ingredient'
-        else:
+        elif "Sub-Recipe ID:" in item:
             item_id = int(item.split('Sub-Recipe ID:')[1].replace(")", ""))
-            key = f"subrecipe_{item_id}"
             item_type = 'subrecipe'
+        else:
+            item_id = int(item.split('Cake ID:')[1].replace(")", ""))
+            item_type = 'cake'
 
-        qty = st.number_input(f"Quantity for {item.split(' (')[0]}", min_value=0.0, step=0.00001, format="%.5f", key=key)
+        qty = st.number_input(f"Quantity for {item.split(' (')[0]}", min_value=0.0, step=0.00001, format="%.5f",
+                              key=f"{item_type}_{item_id}", value=existing_qty.get((item_id, item_type), 0.0))
         quantities[(item_id, item_type)] = qty
 
+    # Other cakes are stored as references and resolved when costed, so edits to them carry through
+    parts = [(item_id, item_type == 'subrecipe', qty) for (item_id, item_type), qty in quantities.items() if item_type != 'cake']
+    components = [(item_id, qty) for (item_id, item_type), qty in quantities.items() if item_type == 'cake']
+
+    _, _, parts_cost, _ = cost_breakdown(conn, parts)
+    _, components_cost, _ = component_breakdown(conn, components)
+    total_cost = parts_cost + components_cost
+    creates_cycle = bool(cake_id) and would_create_cake_cycle(conn, cake_id, [item_id for item_id, _ in components])
+    conn.close()
+    adjusted_cost = total_cost * (1 + percent_yield / 100)
+    st.success(f"Estimated Cake Cost with {percent_yield:.2f}% Yield: {round(adjusted_cost, 2)}")
+
     if st.button("Save Cake"):
         if not cake_name or not quantities:
             st.error("Please enter a cake name and at least one item.")
             return
+        if creates_cycle:
+            st.error("Cannot save: one of the selected cakes already contains this cake.")
+            return
         try:
             conn = get_connection()
             c = conn.cursor()
-            c.execute("INSERT INTO cakes (name, percent_yield) VALUES (%s, %s)", (cake_name, percent_yield))
-            cake_id = c.lastrowid
+            if not cake_id:
+                c.execute("INSERT INTO cakes (name, percent_yield) VALUES (%s, %s)", (cake_name, percent_yield))
+                cake_id = c.lastrowid
+            else:
+                c.execute("UPDATE cakes SET name = %s, percent_yield = %s WHERE id = %s", (cake_name, percent_yield, cake_id))
+                c.execute("DELETE FROM cake_ingredients WHERE cake_id = %s", (cake_id,))
+                c.execute("DELETE FROM cake_components WHERE cake_id = %s", (cake_id,))
 
-            for (item_id, item_type), qty in quantities.items():
-                is_sub = 1 if item_type == 'subrecipe' else 0
-                c.execute("INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity) VALUES (%s, %s, %s, %s)", (cake_id, item_id, is_sub, qty))
+            c.executemany(
+                "INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity) VALUES (%s, %s, %s, %s)",
+                [(cake_id, item_id, int(is_sub), qty) for item_id, is_sub, qty in parts]
+            )
+            c.executemany(
+                "INSERT INTO cake_components (cake_id, component_cake_id, quantity) VALUES (%s, %s, %s)",
+                [(cake_id, item_id, qty) for item_id, qty in components]
+            )
 
             conn.commit()
+            invalidate_recipe_index()
             st.success(f"Cake '{cake_name}' saved successfully!")
+        except mysql.connector.IntegrityError:
+            st.error("Cake already exists.")
         except mysql.connector.Error as err:
             st.error(f"MySQL Error: {err}")
         finally:
@@ -9,19 +9,17 @@ import zipfile
 import matplotlib.pyplot as plt
 import hashlib
 from config import DB_PATH
+from db import get_sqlite_connection
+from utils.grid import paged_editor, clear_editor
+from utils.search import ranked_ids
+from utils.stock import (ensure_stock_schema, set_stock_levels, update_stock_level, parse_stock_upload,
+                         iter_stock_levels, record_receipt, StockConflictError)
 def update_stock():
     st.header("📦 Update Warehouse Stock")
 
     # CSS Styling
     st.markdown("""
         <style>
-            .ingredient-card {
-                background-color: #fff0f5;
-                padding: 1.5rem;
-                border-radius: 10px;
-                border: 1px solid #f8d6e0;
-                margin-bottom: 1rem;
-            }
             .no-data {
                 text-align: center;
                 font-weight: 500;
@@ -31,7 +29,7 @@ def update_stock():
         </style>
     """, unsafe_allow_html=True)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_sqlite_connection()
     c = conn.cursor()
 
     # Ensure necessary tables
@@ -56,6 +54,7 @@ def update_stock():
         reason TEXT,
         timestamp TEXT
     )''')
+    ensure_stock_schema(conn)
 
     # Get warehouse list and selection
     c.execute("SELECT id, name FROM warehouses ORDER BY name")
@@ -66,13 +65,7 @@ def update_stock():
     warehouse_id = warehouse_dict[selected_warehouse]
 
     # Export stock to Excel
-    c.execute('''
-        SELECT i.id AS ingredient_id, i.name AS ingredient_name, IFNULL(ws.quantity, 0) AS quantity
-        FROM ingredients i
-        LEFT JOIN warehouse_stock ws ON i.id = ws.ingredient_id AND ws.warehouse_id = ?
-        ORDER BY i.name
-    ''', (warehouse_id,))
-    df_export = pd.DataFrame(c.fetchall(), columns=["ingredient_id", "ingredient_name", "quantity"])
+    df_export = pd.DataFrame(list(iter_stock_levels(conn, warehouse_id)), columns=["ingredient_id", "ingredient_name", "quantity"])
 
     excel_buffer = BytesIO()
     df_export.to_excel(excel_buffer, index=False)
@@ -91,92 +84,101 @@ def update_stock():
 
     if uploaded_file:
         df_uploaded = pd.read_excel(uploaded_file)
-        if not {"ingredient_id", "quantity"}.issubset(df_uploaded.columns):
+        try:
+            levels, skipped = parse_stock_upload(df_uploaded)
+        except ValueError:
             st.error("❌ Excel must include 'ingredient_id' and 'quantity' columns.")
         else:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            for _, row in df_uploaded.iterrows():
-                try:
-                    ing_id = int(row["ingredient_id"])
-                    new_qty = float(row["quantity"])
-
-                    c.execute('SELECT quantity FROM warehouse_stock WHERE warehouse_id = ? AND ingredient_id = ?', (warehouse_id, ing_id))
-                    existing = c.fetchone()
-                    old_qty = existing[0] if existing else 0
-                    change = new_qty - old_qty
-
-                    c.execute('''
-                        INSERT INTO warehouse_stock (warehouse_id, ingredient_id, quantity)
-                        VALUES (?, ?, ?)
-                        ON CONFLICT(warehouse_id, ingredient_id) DO UPDATE SET
-                            quantity = excluded.quantity
-                    ''', (warehouse_id, ing_id, new_qty))
-
-                    if change != 0:
-                        c.execute('''
-                            INSERT INTO stock_movements (ingredient_id, warehouse_id, change, reason, timestamp)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (ing_id, warehouse_id, change, "Excel Upload", now))
-                except Exception as e:
-                    st.warning(f"⚠️ Failed to process row: {e}")
-
+            if skipped:
+                st.warning(f"⚠️ Skipped {skipped} row(s) with a missing or non-numeric ingredient_id/quantity.")
+            try:
+                set_stock_levels(conn, warehouse_id, levels, "Excel Upload")
+            except StockConflictError as e:
+                conn.rollback()
+                st.error(f"❌ {e}")
+            else:
+                conn.commit()
+                st.success("✅ Excel stock update applied successfully.")
+
+    # Purchase receipts open a cost lot at the price actually paid
+    st.divider()
+    st.subheader("🧾 Record Purchase Receipt")
+    c.execute("SELECT id, name, unit, price_per_unit FROM ingredients WHERE name IS NOT NULL ORDER BY name")
+    catalogue = {f"{name} ({unit})": (ing_id, price) for ing_id, name, unit, price in c.fetchall()}
+    with st.form("purchase_receipt", clear_on_submit=True):
+        received = st.selectbox("Ingredient", list(catalogue))
+        col1, col2, col3 = st.columns(3)
+        received_qty = col1.number_input("Quantity Received", min_value=0.0, step=0.1)
+        unit_price = col2.number_input("Unit Price Paid", min_value=0.0, step=0.00001, format="%.5f",
+                                       help="Leave at 0 to use the ingredient's list price")
+        supplier = col3.text_input("Supplier")
+        if st.form_submit_button("📥 Receive Stock") and received and received_qty > 0:
+            ing_id, list_price = catalogue[received]
+            receipt_id = record_receipt(conn, warehouse_id, ing_id, received_qty, unit_price or float(list_price or 0),
+                                        supplier.strip() or None)
             conn.commit()
-            st.success("✅ Excel stock update applied successfully.")
+            st.success(f"✅ Receipt #{receipt_id}: {received_qty} of {received} added to {selected_warehouse}.")
 
     # Manual update per ingredient
     st.divider()
     st.subheader("🔧 Manually Update Ingredients")
 
-    c.execute('''
-        SELECT i.id, i.name, i.unit, IFNULL(ws.quantity, 0)
-        FROM ingredients i
-        LEFT JOIN warehouse_stock ws ON i.id = ws.ingredient_id AND ws.warehouse_id = ?
-        ORDER BY i.name
-    ''', (warehouse_id,))
-    ingredients = c.fetchall()
-
-    search = st.text_input("🔍 Search Ingredients").lower()
-    found = False
-
-    for ing_id, name, unit, quantity in ingredients:
-        if not name or (search and search not in name.lower()):
-            continue
-
-        found = True
-        st.markdown("<div class='ingredient-card'>", unsafe_allow_html=True)
-        st.subheader(f"{name} ({unit})")
-
-        col1, col2 = st.columns([5, 3])
-        new_qty = col1.number_input("Stock Quantity", min_value=0.0, step=0.1, format="%.2f", value=float(quantity),
-                                    key=f"qty_{warehouse_id}_{ing_id}")
-
-        reason = col2.selectbox("Reason", ["Manual Update", "Spoilage", "Restock", "Adjustment"], key=f"reason_{warehouse_id}_{ing_id}")
-
-        st.caption(f"🕓 Current Qty: {quantity}")
-
-        if st.button("📂 Apply Update", key=f"apply_{warehouse_id}_{ing_id}"):
-            change = new_qty - quantity
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            c.execute('''
-                INSERT INTO warehouse_stock (warehouse_id, ingredient_id, quantity)
-                VALUES (?, ?, ?)
-                ON CONFLICT(warehouse_id, ingredient_id) DO UPDATE SET
-                    quantity = excluded.quantity
-            ''', (warehouse_id, ing_id, new_qty))
-
-            if change != 0:
-                c.execute('''
-                    INSERT INTO stock_movements (ingredient_id, warehouse_id, change, reason, timestamp)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (ing_id, warehouse_id, change, reason, now))
+    search = st.text_input("🔍 Search Ingredients")
+    matches = ranked_ids(conn, "ingredients", search) if search.strip() else None
+
+    ingredients = []
+    if matches is None or matches:
+        id_filter = f"WHERE i.id IN ({','.join('?' * len(matches))})" if matches else ""
+        c.execute(f'''
+            SELECT i.id, i.name, i.unit, IFNULL(ws.quantity, 0), ws.version
+            FROM ingredients i
+            LEFT JOIN warehouse_stock ws ON i.id = ws.ingredient_id AND ws.warehouse_id = ?
+            {id_filter}
+            ORDER BY i.name
+        ''', (warehouse_id, *(matches or ())))
+        ingredients = [row for row in c.fetchall() if row[1]]
+    if matches:
+        ingredients.sort(key=lambda row: matches[row[0]])
+
+    if not ingredients:
+        st.markdown("<div class='no-data'>🚫 No matching ingredients found.</div>", unsafe_allow_html=True)
+        conn.close()
+        return
+
+    df = pd.DataFrame([row[:4] for row in ingredients], columns=["ingredient_id", "Ingredient", "Unit", "Current Qty"]).set_index("ingredient_id")
+    # Row versions are 62-bit tokens; an object column keeps them exact where a missing row would make them float
+    df["version"] = pd.Series([row[4] for row in ingredients], index=df.index, dtype=object)
+    df["Stock Quantity"] = df["Current Qty"]
+    df["Reason"] = "Manual Update"
+
+    editor_key = f"stock_{warehouse_id}"
+    _, pending = paged_editor(
+        df, editor_key, ["Stock Quantity", "Reason"],
+        column_config={
+            "version": None,
+            "Stock Quantity": st.column_config.NumberColumn(min_value=0.0, step=0.1, format="%.2f"),
+            "Reason": st.column_config.SelectboxColumn(options=["Manual Update", "Spoilage", "Restock", "Adjustment"]),
+        },
+    )
 
+    if st.button(f"📂 Apply {len(pending)} Change(s)", disabled=not pending):
+        # Each edit is applied relative to the row as the clerk first saw it, not blindly overwritten
+        rebased = []
+        try:
+            for ing_id, (seen, values) in pending.items():
+                saved_qty, was_rebased = update_stock_level(conn, warehouse_id, ing_id, seen["Current Qty"], seen["version"],
+                                                            values["Stock Quantity"], values["Reason"])
+                if was_rebased:
+                    rebased.append(f"{seen['Ingredient']} → {saved_qty:.2f}")
+        except StockConflictError as e:
+            conn.rollback()
+            st.error(f"❌ {e}")
+        else:
             conn.commit()
-            st.success(f"✅ Stock for {name} updated in {selected_warehouse}.")
-
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    if not found:
-        st.markdown("<div class='no-data'>🚫 No matching ingredients found.</div>", unsafe_allow_html=True)
+            clear_editor(editor_key)
+            st.success(f"✅ Updated {len(pending)} ingredient(s) in {selected_warehouse}.")
+            if rebased:
+                st.warning("⚠️ Changed by someone else while you edited; your adjustments were applied on top: "
+                           + ", ".join(rebased))
 
     conn.close()
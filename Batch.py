@@ -2,8 +2,12 @@ import streamlit as st
 import pandas as pd
 import io
 import mysql.connector
-from db import get_connection  # Make sure this returns a valid MySQL connection object
-from utils.batch_helpers import resolve_subrecipe_ingredients_detailed
+from db import get_connection, get_sqlite_connection  # get_connection returns the MySQL recipe database
+from utils.batch_helpers import calculate_batch, parse_batch_plan
+from utils.recipe_graph import load_recipe_graph
+from utils.cost_layers import fifo_issue_cost
+from utils.stock import _table_exists
+from utils.stock_netting import load_stock_matrix, net_requirements, suggest_transfers
 
 def batch_production():
     st.header('Batch Production Calculator')
@@ -21,17 +25,13 @@ def batch_production():
 
     if uploaded_file is not None:
         df_uploaded = pd.read_excel(uploaded_file)
-        if 'Cake Name' not in df_uploaded.columns or 'Quantity' not in df_uploaded.columns:
+        try:
+            cake_quantities, unknown = parse_batch_plan(df_uploaded, {n: i for i, n in cakes})
+        except ValueError:
             st.error("Excel must have columns 'Cake Name' and 'Quantity'")
         else:
-            cake_name_to_id = {n: i for i, n in cakes}
-            for _, row in df_uploaded.iterrows():
-                cake_name = row['Cake Name']
-                qty = row['Quantity']
-                if cake_name in cake_name_to_id:
-                    cake_quantities[cake_name_to_id[cake_name]] = qty
-                else:
-                    st.warning(f"Cake '{cake_name}' not found in the database.")
+            for cake_name in unknown:
+                st.warning(f"Cake '{cake_name}' not found in the database.")
     else:
         selected_cakes = st.multiselect('Select Cakes to Produce', [f"{n} (ID:{i})" for i, n in cakes])
         for cake in selected_cakes:
@@ -39,61 +39,24 @@ def batch_production():
             qty = st.number_input(f'Quantity of {cake.split(" (ID:")[0]} (number of cakes)', min_value=0.0, step=0.00001, format="%.5f", key=f"qty_{cake_id}")
             cake_quantities[cake_id] = qty
 
+    # Recipes come from MySQL; warehouses and their stock live in the SQLite warehouse database
+    stock_conn = get_sqlite_connection()
+    sc = stock_conn.cursor()
+    sc.execute('SELECT id, name FROM warehouses ORDER BY name')
+    warehouses = sc.fetchall()
+    warehouse_names = [n for _, n in warehouses]
+    net_against = None
+    if warehouses:
+        default = warehouse_names.index('Kitchen') if 'Kitchen' in warehouse_names else 0
+        net_against = st.selectbox('🏢 Check Stock In Warehouse', warehouse_names, index=default)
+
     if cake_quantities and st.button('Calculate Batch Ingredients'):
-        from utils.batch_helpers import resolve_subrecipe_ingredients_detailed  # Put helper in a separate file
-
-        total_ingredients = {}
-        detailed_rows = []
-        subrecipe_summary = {}
-
-        for cake_id, num_cakes in cake_quantities.items():
-            c.execute('SELECT ingredient_or_subrecipe_id, is_subrecipe, quantity FROM cake_ingredients WHERE cake_id = %s', (cake_id,))
-            cake_parts = c.fetchall()
-
-            for iid, is_sub, qty in cake_parts:
-                if is_sub:
-                    resolved = resolve_subrecipe_ingredients_detailed(conn, iid, qty * num_cakes)
-                    detailed_rows.extend(resolved)
-
-                    c.execute('SELECT name FROM sub_recipes WHERE id = %s', (iid,))
-                    sr_name = c.fetchone()[0]
-                    if sr_name not in subrecipe_summary:
-                        subrecipe_summary[sr_name] = {'quantity': 0.0, 'unit_cost': 0.0}
-                    subrecipe_summary[sr_name]['quantity'] += qty * num_cakes
-
-                    if subrecipe_summary[sr_name]['unit_cost'] == 0:
-                        unit_cost = sum(r['cost'] for r in resolve_subrecipe_ingredients_detailed(conn, iid, 1.0))
-                        subrecipe_summary[sr_name]['unit_cost'] = unit_cost
-
-                    for r in resolved:
-                        name = r['ingredient']
-                        if name in total_ingredients:
-                            total_ingredients[name]['quantity'] += r['quantity']
-                            total_ingredients[name]['cost'] += r['cost']
-                        else:
-                            total_ingredients[name] = {
-                                'quantity': r['quantity'],
-                                'cost': r['cost'],
-                                'unit': r['unit']
-                            }
-                else:
-                    c.execute('SELECT name, unit, price_per_unit FROM ingredients WHERE id = %s', (iid,))
-                    ing_name, ing_unit, ing_price = c.fetchone()
-                    scaled_qty = qty * num_cakes
-                    cost = scaled_qty * float(ing_price)
-
-                    if ing_name in total_ingredients:
-                        total_ingredients[ing_name]['quantity'] += scaled_qty
-                        total_ingredients[ing_name]['cost'] += cost
-                    else:
-                        total_ingredients[ing_name] = {'quantity': scaled_qty, 'unit': ing_unit, 'cost': cost}
-                    detailed_rows.append({
-                        'source': 'Direct in Cake',
-                        'ingredient': ing_name,
-                        'unit': ing_unit,
-                        'quantity': scaled_qty,
-                        'cost': cost
-                    })
+        graph = load_recipe_graph(conn)
+        if graph['cyclic']:
+            st.error('Some sub-recipes are nested inside themselves. Fix them in Manage Sub-Recipes: '
+                     + ', '.join(graph['names'].get(s, str(s)) for s in graph['cyclic']))
+
+        total_ingredients, detailed_rows, subrecipe_summary = calculate_batch(conn, cake_quantities, graph)
 
         if total_ingredients:
             st.subheader('🧾 Total Ingredients Needed for Batch')
@@ -105,6 +68,46 @@ def batch_production():
             total_cost = sum(v['cost'] for v in total_ingredients.values())
             st.success(f'💰 Total Batch Cost: {round(total_cost, 2)}')
 
+        if total_ingredients and net_against:
+            target_id = {n: i for i, n in warehouses}[net_against]
+            required = pd.DataFrame(
+                {'required': [float(v['quantity']) for v in total_ingredients.values()]},
+                index=[v['id'] for v in total_ingredients.values()]
+            ).groupby(level=0).sum()
+            stock, warehouse_lookup = load_stock_matrix(stock_conn, required.index)
+            shortfall = net_requirements(required, stock, target_id)['required']
+            id_to_name = {v['id']: k for k, v in total_ingredients.items()}
+
+            st.subheader(f"📦 Stock Check — {net_against}")
+            df_net = pd.DataFrame({
+                'Ingredient': [id_to_name[i] for i in required.index],
+                'Required': required['required'].round(5).to_numpy(),
+                'In Stock': stock[target_id].round(5).to_numpy() if target_id in stock.columns else 0.0,
+                'Shortfall': shortfall.round(5).to_numpy(),
+            })
+            st.dataframe(df_net[df_net['Shortfall'] > 0] if (df_net['Shortfall'] > 0).any() else df_net)
+
+            # What the batch costs drawn from the warehouse's oldest lots, rather than at today's list prices
+            issued = (fifo_issue_cost(stock_conn, target_id, required['required'].to_dict())
+                      if _table_exists(stock_conn, 'inventory_costs') else {})
+            if issued:
+                stock_cost = sum(issued.values())
+                st.info(f"📦 Batch Cost at {net_against} Stock Cost (FIFO): {round(stock_cost, 2)} "
+                        f"({stock_cost - total_cost:+.2f} vs list prices)")
+            if (shortfall > 0).any():
+                transfers = suggest_transfers(shortfall, stock, target_id)
+                if not transfers.empty:
+                    st.subheader("🚚 Suggested Transfers")
+                    st.dataframe(pd.DataFrame({
+                        'From': transfers['warehouse_id'].map(warehouse_lookup).to_numpy(),
+                        'To': net_against,
+                        'Ingredient': transfers['ingredient_id'].map(id_to_name).to_numpy(),
+                        'Quantity': transfers['quantity'].round(5).to_numpy(),
+                    }))
+                st.warning(f"⚠️ {int((shortfall > 0).sum())} ingredient(s) short in {net_against}.")
+            else:
+                st.success(f"✅ {net_against} has enough stock for this batch.")
+
         if subrecipe_summary:
             st.subheader("🧪 Sub-Recipe Usage Summary")
             df_subs = pd.DataFrame([{
@@ -150,4 +153,5 @@ def batch_production():
                 mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
             )
 
+    stock_conn.close()
     conn.close()
@@ -11,20 +11,28 @@ import hashlib
 import mysql.connector
 from mysql.connector import Error
 from db import get_connection
+from utils.recipe_graph import would_create_cycle, would_create_cake_cycle, load_recipe_graph, parent_cake_names
+from utils.costing import cake_components, all_cake_costs
+from utils.cost_index import price_change_impact, invalidate_recipe_index
+from utils.grid import paged_editor, clear_editor
+from utils.numeric import fetch_frame, to_float_array
+from utils.search import ranked_ids
 def manage_ingredients():
     st.header('Manage Ingredients')
     conn = get_connection()
     c = conn.cursor()
     search_term = st.text_input('Search Ingredients')
 
-    if search_term:
-        query = "SELECT id, name, price_per_unit, unit FROM ingredients WHERE name LIKE %s"
-        c.execute(query, (f"%{search_term}%",))
+    if search_term.strip():
+        matches = ranked_ids(conn, 'ingredients', search_term)
+        if matches:
+            c.execute(f"SELECT id, name, price_per_unit, unit FROM ingredients WHERE id IN ({', '.join(['%s'] * len(matches))})",
+                      tuple(matches))
+        rows = sorted(c.fetchall(), key=lambda row: matches[row[0]]) if matches else []
     else:
         query = "SELECT id, name, price_per_unit, unit FROM ingredients"
         c.execute(query)
-
-    rows = c.fetchall()
+        rows = c.fetchall()
 
     if rows:
         for ing_id, name, price, unit in rows:
@@ -32,12 +40,17 @@ def manage_ingredients():
             new_price = st.number_input(f"Price per Unit for {name}", value=float(price), step=0.00001, format="%.5f", key=f"price_{ing_id}")
             new_unit = st.text_input(f"Unit for {name}", value=unit, key=f"unit_{ing_id}")
             if st.button(f"Update {name}", key=f"update_{ing_id}"):
+                impact = price_change_impact(conn, ing_id, price, new_price) if float(price or 0) != new_price else []
                 c.execute("UPDATE ingredients SET price_per_unit = %s, unit = %s WHERE id = %s", (new_price, new_unit, ing_id))
                 conn.commit()
                 st.success(f"Updated {name} successfully!")
+                if impact:
+                    st.subheader(f"💸 Cost Impact of {name} Price Change")
+                    st.dataframe(pd.DataFrame(impact).sort_values('Change', key=abs, ascending=False), use_container_width=True)
             if st.button(f"Delete {name}", key=f"delete_{ing_id}"):
                 c.execute("DELETE FROM ingredients WHERE id = %s", (ing_id,))
                 conn.commit()
+                invalidate_recipe_index()
                 st.success(f"Deleted {name} successfully!")
     else:
         st.info("No ingredients found.")
@@ -67,36 +80,54 @@ def manage_sub_recipes():
 
         st.write(f"**Sub-Recipe Name:** {row[0]}")
 
-        c.execute('''
-            SELECT sri.id, sri.quantity, i.name, i.unit, i.price_per_unit, i.id as ing_id
-            FROM sub_recipe_ingredients sri
-            JOIN ingredients i ON sri.ingredient_id = i.id
-            WHERE sri.sub_recipe_id = %s
-        ''', (sub_id,))
-        ingredients = c.fetchall()
-
-        st.subheader('Current Ingredients')
-        total_cost = 0
-        cost_breakdown = []
-
-        for row_id, qty, name, unit, price, ing_id in ingredients:
-            qty = float(qty)
-            price = float(price)
-            new_qty = st.number_input(f"{name} Quantity", min_value=0.0, step=0.1, format="%.2f", value=qty, key=f"qty_{ing_id}")
-            item_cost = new_qty * price
-            total_cost += item_cost
-            cost_breakdown.append({"Ingredient": name, "Quantity": new_qty, "Unit": unit, "Cost": round(item_cost, 2)})
-            st.markdown(f"<span style='color:green'>Estimated Cost for {name}: {item_cost:,.2f}</span>", unsafe_allow_html=True)
-
-            if st.button(f"Update {name}", key=f"update_{row_id}_sub"):
-                c.execute('UPDATE sub_recipe_ingredients SET quantity = %s WHERE id = %s', (new_qty, row_id))
-                conn.commit()
-                st.success(f"Updated {name} quantity!")
-
-            if st.button(f"Delete {name}", key=f"delete_{row_id}_sub"):
-                c.execute('DELETE FROM sub_recipe_ingredients WHERE id = %s', (row_id,))
-                conn.commit()
-                st.success(f"Deleted {name} from Sub-Recipe!")
+        columns = ['key', 'Item', 'Type', 'Unit', 'Quantity', 'price', 'child_id']
+        df = pd.concat([
+            fetch_frame(conn, '''
+                SELECT CONCAT('i:', sri.id), i.name, 'Ingredient', i.unit, sri.quantity, i.price_per_unit, NULL
+                FROM sub_recipe_ingredients sri
+                JOIN ingredients i ON sri.ingredient_id = i.id
+                WHERE sri.sub_recipe_id = %s
+            ''', columns, (sub_id,), numeric=['Quantity', 'price']),
+            fetch_frame(conn, '''
+                SELECT CONCAT('n:', n.id), sr.name, 'Sub-Recipe', 'kg', n.quantity, NULL, sr.id
+                FROM sub_recipe_nested n
+                JOIN sub_recipes sr ON n.sub_recipe_id = sr.id
+                WHERE n.parent_sub_recipe_id = %s
+            ''', columns, (sub_id,), numeric=['Quantity', 'price']),
+        ], ignore_index=True).set_index('key')
+
+        st.subheader('Current Ingredients and Nested Sub-Recipes')
+        # Ingredients cost quantity × price, nested sub-recipes their share of the child's batch cost
+        graph = load_recipe_graph(conn)
+        weights = df['child_id'].map(graph['weights']).fillna(0.0)
+        nested_cost = (df['child_id'].map(graph['costs']).fillna(0.0) / weights.where(weights > 0)).fillna(0.0)
+        df['Unit Cost'] = df['price'].where(df['Type'] == 'Ingredient', nested_cost)
+        df['Remove'] = False
+
+        editor_key = f"sub_recipe_{sub_id}"
+        merged, pending = paged_editor(
+            df[['Item', 'Type', 'Unit', 'Quantity', 'Unit Cost', 'Remove']], editor_key, ['Quantity', 'Remove'],
+            column_config={'Quantity': st.column_config.NumberColumn(min_value=0.0, step=0.00001, format="%.5f")},
+        )
+        merged = merged[~merged['Remove'].astype(bool)]
+        merged = merged.assign(Cost=(merged['Quantity'] * merged['Unit Cost']).round(2))
+        total_cost = (merged['Quantity'] * merged['Unit Cost']).sum()
+        cost_breakdown = merged[['Item', 'Type', 'Quantity', 'Unit', 'Cost']]
+
+        if st.button(f"💾 Save {len(pending)} Change(s)", disabled=not pending, key='save_sub_items'):
+            removed = [key for key, (_, values) in pending.items() if values['Remove']]
+            changed = [(values['Quantity'], key) for key, (_, values) in pending.items() if not values['Remove']]
+            for prefix, table in (('i', 'sub_recipe_ingredients'), ('n', 'sub_recipe_nested')):
+                c.executemany(f'DELETE FROM {table} WHERE id = %s',
+                              [(int(key[2:]),) for key in removed if key[0] == prefix])
+                c.executemany(f'UPDATE {table} SET quantity = %s WHERE id = %s',
+                              [(float(qty), int(key[2:])) for qty, key in changed if key[0] == prefix])
+            conn.commit()
+            invalidate_recipe_index()
+            clear_editor(editor_key)
+            st.success(f"Saved {len(pending)} change(s) to the Sub-Recipe!")
+            st.rerun()
+            return
 
         st.subheader('Add New Ingredient or Sub-Recipe')
         c.execute('SELECT id, name, unit FROM ingredients')
@@ -117,6 +148,10 @@ def manage_sub_recipes():
         item_qty = st.number_input('Quantity (kg, L, etc)', min_value=0.0, step=0.00001, format="%.5f", key='qty_new_item_sub')
 
         if st.button('Add to Sub-Recipe'):
+            if item_type == 'subrecipe' and would_create_cycle(conn, sub_id, [item_id]):
+                st.error('Cannot add: this sub-recipe is already used inside the selected sub-recipe.')
+                conn.close()
+                return
             try:
                 if item_type == 'ingredient':
                     c.execute(
@@ -124,15 +159,13 @@ def manage_sub_recipes():
                         (sub_id, item_id, float(item_qty))
                     )
                 else:
-                    c.execute('SELECT ingredient_id, quantity FROM sub_recipe_ingredients WHERE sub_recipe_id = %s', (item_id,))
-                    nested_parts = c.fetchall()
-                    for ing_id, ing_qty in nested_parts:
-                        flattened_qty = float(item_qty) * float(ing_qty)
-                        c.execute(
-                            'INSERT INTO sub_recipe_ingredients (sub_recipe_id, ingredient_id, quantity) VALUES (%s, %s, %s)',
-                            (sub_id, ing_id, flattened_qty)
-                        )
+                    # Nest by reference; the recipe graph resolves it, so later edits to the child carry through
+                    c.execute(
+                        'INSERT INTO sub_recipe_nested (parent_sub_recipe_id, sub_recipe_id, quantity) VALUES (%s, %s, %s)',
+                        (sub_id, item_id, float(item_qty))
+                    )
                 conn.commit()
+                invalidate_recipe_index()
                 st.success('Item added successfully!')
             except mysql.connector.IntegrityError:
                 st.error('Item already part of this sub-recipe.')
@@ -145,7 +178,9 @@ def manage_sub_recipes():
         if st.button('Delete Entire Sub-Recipe'):
             c.execute('DELETE FROM sub_recipes WHERE id = %s', (sub_id,))
             c.execute('DELETE FROM sub_recipe_ingredients WHERE sub_recipe_id = %s', (sub_id,))
+            c.execute('DELETE FROM sub_recipe_nested WHERE parent_sub_recipe_id = %s OR sub_recipe_id = %s', (sub_id, sub_id))
             conn.commit()
+            invalidate_recipe_index()
             st.success('Sub-Recipe deleted successfully!')
 
     else:
@@ -179,6 +214,7 @@ def manage_cakes():
                 try:
                     c.execute('UPDATE cakes SET name = %s WHERE id = %s', (new_name, cake_id))
                     conn.commit()
+                    invalidate_recipe_index()
                     st.success('Cake name updated successfully!')
                     st.rerun()
                     return
@@ -190,111 +226,123 @@ def manage_cakes():
                 try:
                     c.execute('UPDATE cakes SET percent_yield = %s WHERE id = %s', (new_yield, cake_id))
                     conn.commit()
+                    invalidate_recipe_index()
                     st.success('Percent yield updated successfully!')
                     st.rerun()
                     return
                 except Exception as e:
                     st.error(f'Failed to update yield. Error: {e}')
 
-            # Load Ingredients
-            c.execute('''
-                SELECT ci.id,
-                       ci.is_subrecipe,
-                       ci.quantity,
+            # Load Ingredients, sub-recipes and component cakes into one grid keyed by their row
+            df = fetch_frame(conn, '''
+                SELECT CONCAT('c:', ci.id),
                        COALESCE(i.name, sr.name),
                        CASE WHEN ci.is_subrecipe THEN 'Sub-Recipe' ELSE 'Ingredient' END,
-                       ci.ingredient_or_subrecipe_id
+                       ci.ingredient_or_subrecipe_id,
+                       ci.quantity,
+                       i.price_per_unit
                 FROM cake_ingredients ci
                          LEFT JOIN ingredients i ON ci.ingredient_or_subrecipe_id = i.id AND ci.is_subrecipe = 0
                          LEFT JOIN sub_recipes sr ON ci.ingredient_or_subrecipe_id = sr.id AND ci.is_subrecipe = 1
                 WHERE ci.cake_id = %s
-            ''', (cake_id,))
-            ingredients = c.fetchall()
-
-            st.subheader('Current Ingredients/Sub-Recipes')
-            cost_breakdown = []
-            total_cost = 0
-
-            for item_id, is_subrecipe, qty, item_name, item_type, ref_id in ingredients:
-                qty = float(qty)
-                new_qty = st.number_input(f"{item_name} ({item_type})", value=qty, step=0.00001, format="%.5f", key=f"{item_id}_qty_cake")
-
-                item_cost = 0
-                if is_subrecipe:
-                    c.execute('''
-                        SELECT SUM(sri.quantity * i.price_per_unit)
-                        FROM sub_recipe_ingredients sri
-                        JOIN ingredients i ON sri.ingredient_id = i.id
-                        WHERE sri.sub_recipe_id = %s
-                    ''', (ref_id,))
-                    result = c.fetchone()
-                    sub_recipe_total_cost = float(result[0]) if result and result[0] is not None else 0
-
-                    c.execute('SELECT SUM(quantity) FROM sub_recipe_ingredients WHERE sub_recipe_id = %s', (ref_id,))
-                    weight_result = c.fetchone()
-                    total_weight = float(weight_result[0]) if weight_result and weight_result[0] else 0
-
-                    if total_weight:
-                        item_cost = (new_qty / total_weight) * sub_recipe_total_cost
-                        st.caption(f"{item_name} — Sub Weight: {total_weight:.3f} kg, Used: {new_qty:.3f} kg")
-                        formula_str = f"({new_qty:.3f} / {total_weight:.3f}) × {sub_recipe_total_cost:.2f} = {item_cost:.2f}"
-                        st.markdown(f"<small style='color:#888;'>[Formula] {formula_str}</small>", unsafe_allow_html=True)
-                else:
-                    c.execute('SELECT price_per_unit FROM ingredients WHERE id = %s', (ref_id,))
-                    row = c.fetchone()
-                    if row and row[0] is not None:
-                        item_cost = new_qty * float(row[0])
-                    else:
-                        item_cost = 0
-                        st.warning(f"⚠️ Missing price for ingredient '{item_name}'")
-
-                st.markdown(
-                    f"<span style='color:green'>Estimated Cost for {item_name}: {round(item_cost, 2)}</span>",
-                    unsafe_allow_html=True)
-                cost_breakdown.append(
-                    {"Item": item_name, "Type": item_type, "Quantity": new_qty, "Cost": round(item_cost, 2)})
-                total_cost += item_cost
-
-                if st.button(f"Update {item_name}", key=f"update_{item_id}_cake"):
-                    c.execute('UPDATE cake_ingredients SET quantity = %s WHERE id = %s', (new_qty, item_id))
-                    conn.commit()
-                    st.success(f"Updated {item_name} quantity!")
-                    st.rerun()
-                    return
-
-                if st.button(f"Delete {item_name}", key=f"delete_{item_id}_cake"):
-                    c.execute('DELETE FROM cake_ingredients WHERE id = %s', (item_id,))
-                    conn.commit()
-                    st.success(f"Deleted {item_name} from Cake!")
-                    st.rerun()
-                    return
+            ''', ['key', 'Item', 'Type', 'ref_id', 'Quantity', 'price'], (cake_id,), numeric=['Quantity'])
+
+            graph = load_recipe_graph(conn)
+            is_sub = df['Type'] == 'Sub-Recipe'
+            weights = df['ref_id'].map(graph['weights']).where(is_sub).fillna(0.0)
+            sub_cost = (df['ref_id'].map(graph['costs']).fillna(0.0) / weights.where(weights > 0)).fillna(0.0)
+            missing_price = df.loc[~is_sub & df['price'].isna(), 'Item'].tolist()
+            df['Unit Cost'] = to_float_array(df['price'])
+            df['Unit Cost'] = df['Unit Cost'].where(~is_sub, sub_cost)
+            df['Sub Weight (kg)'] = weights.where(is_sub)
+
+            components = cake_components(conn, cake_id)
+            if components:
+                component_ids = [component_id for component_id, _ in components]
+                component_costs = all_cake_costs(conn, component_ids)
+                cake_names = dict(cakes)
+                df = pd.concat([df, pd.DataFrame({
+                    'key': [f"k:{component_id}" for component_id in component_ids],
+                    'Item': [cake_names.get(component_id, f"Cake {component_id}") for component_id in component_ids],
+                    'Type': 'Cake',
+                    'ref_id': component_ids,
+                    'Quantity': [float(qty) for _, qty in components],
+                    'Unit Cost': [component_costs[component_id] for component_id in component_ids],
+                })], ignore_index=True)
+            df = df.set_index('key')
+            df['Remove'] = False
+
+            st.subheader('Current Ingredients, Sub-Recipes and Component Cakes')
+            for name in missing_price:
+                st.warning(f"⚠️ Missing price for ingredient '{name}'")
+
+            editor_key = f"cake_{cake_id}"
+            merged, pending = paged_editor(
+                df[['Item', 'Type', 'Quantity', 'Unit Cost', 'Sub Weight (kg)', 'Remove']], editor_key, ['Quantity', 'Remove'],
+                column_config={'Quantity': st.column_config.NumberColumn(step=0.00001, format="%.5f")},
+            )
+            merged = merged[~merged['Remove'].astype(bool)]
+            merged = merged.assign(Cost=(merged['Quantity'] * merged['Unit Cost']).round(2))
+            total_cost = (merged['Quantity'] * merged['Unit Cost']).sum()
+            cost_breakdown = merged[['Item', 'Type', 'Quantity', 'Cost']]
+
+            if st.button(f"💾 Save {len(pending)} Change(s)", disabled=not pending, key='save_cake_items'):
+                removed = [key for key, (_, values) in pending.items() if values['Remove']]
+                changed = [(float(values['Quantity']), key) for key, (_, values) in pending.items() if not values['Remove']]
+                c.executemany('DELETE FROM cake_ingredients WHERE id = %s',
+                              [(int(key[2:]),) for key in removed if key[0] == 'c'])
+                c.executemany('UPDATE cake_ingredients SET quantity = %s WHERE id = %s',
+                              [(qty, int(key[2:])) for qty, key in changed if key[0] == 'c'])
+                c.executemany('DELETE FROM cake_components WHERE cake_id = %s AND component_cake_id = %s',
+                              [(cake_id, int(key[2:])) for key in removed if key[0] == 'k'])
+                c.executemany('UPDATE cake_components SET quantity = %s WHERE cake_id = %s AND component_cake_id = %s',
+                              [(qty, cake_id, int(key[2:])) for qty, key in changed if key[0] == 'k'])
+                conn.commit()
+                invalidate_recipe_index()
+                clear_editor(editor_key)
+                st.success(f"Saved {len(pending)} change(s) to the Cake!")
+                st.rerun()
+                return
 
             # Add new item
-            st.subheader('Add New Ingredient or Sub-Recipe')
+            st.subheader('Add New Ingredient, Sub-Recipe or Cake')
             c.execute('SELECT id, name FROM ingredients')
             ingredients_list = c.fetchall()
             c.execute('SELECT id, name FROM sub_recipes')
             sub_recipes_list = c.fetchall()
 
             options = [f"{i[1]} (Ingredient ID:{i[0]})" for i in ingredients_list] + \
-                      [f"{s[1]} (Sub-Recipe ID:{s[0]})" for s in sub_recipes_list]
+                      [f"{s[1]} (Sub-Recipe ID:{s[0]})" for s in sub_recipes_list] + \
+                      [f"{k[1]} (Cake ID:{k[0]})" for k in cakes if k[0] != cake_id]
 
             selected_item = st.selectbox('Select Item', options, key='new_ingredient_or_sub')
             if 'Ingredient ID:' in selected_item:
                 item_id = int(selected_item.split('Ingredient ID:')[1].replace(')', ''))
                 is_sub = 0
-            else:
+            elif 'Sub-Recipe ID:' in selected_item:
                 item_id = int(selected_item.split('Sub-Recipe ID:')[1].replace(')', ''))
                 is_sub = 1
+            else:
+                item_id = int(selected_item.split('Cake ID:')[1].replace(')', ''))
+                is_sub = None
 
             item_qty = st.number_input('Quantity (kg, L, etc)', min_value=0.0, step=0.00001, format="%.5f", key='item_qty')
             if st.button('Add to Cake'):
+                if is_sub is None and would_create_cake_cycle(conn, cake_id, [item_id]):
+                    st.error('Cannot add: the selected cake already contains this cake.')
+                    conn.close()
+                    return
                 try:
-                    c.execute('''
-                        INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity)
-                        VALUES (%s, %s, %s, %s)
-                    ''', (cake_id, item_id, is_sub, item_qty))
+                    if is_sub is None:
+                        c.execute('INSERT INTO cake_components (cake_id, component_cake_id, quantity) VALUES (%s, %s, %s)',
+                                  (cake_id, item_id, item_qty))
+                    else:
+                        c.execute('''
+                            INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity)
+                            VALUES (%s, %s, %s, %s)
+                        ''', (cake_id, item_id, is_sub, item_qty))
                     conn.commit()
+                    invalidate_recipe_index()
                     st.success('Added to cake successfully!')
                     st.rerun()
                     return
@@ -314,12 +362,19 @@ def manage_cakes():
                 st.success(f"Cost per kg: {round(cost_per_kg, 2)}")
 
             if st.button('Delete Entire Cake'):
-                c.execute('DELETE FROM cakes WHERE id = %s', (cake_id,))
-                c.execute('DELETE FROM cake_ingredients WHERE cake_id = %s', (cake_id,))
-                conn.commit()
-                st.success('Cake deleted successfully!')
-                st.rerun()
-                return
+                # Deleting a component would silently change the recipe and cost of every cake using it
+                parents = parent_cake_names(conn, cake_id)
+                if parents:
+                    st.error(f"This cake is used inside {', '.join(parents)}. Remove it from those cakes before deleting it.")
+                else:
+                    c.execute('DELETE FROM cakes WHERE id = %s', (cake_id,))
+                    c.execute('DELETE FROM cake_ingredients WHERE cake_id = %s', (cake_id,))
+                    c.execute('DELETE FROM cake_components WHERE cake_id = %s', (cake_id,))
+                    conn.commit()
+                    invalidate_recipe_index()
+                    st.success('Cake deleted successfully!')
+                    st.rerun()
+                    return
     else:
         st.warning('No cakes found.')
 
@@ -9,6 +9,25 @@ import zipfile
 import matplotlib.pyplot as plt
 import hashlib
 from config import DB_PATH
+from db import get_sqlite_connection
+from utils.recipe_paste import parse_paste_rows, resolve_item_names, format_unknown_names
+from utils.cost_index import invalidate_recipe_index
+
+
+def _parse_and_resolve(conn, paste_data):
+    parsed_rows, errors = parse_paste_rows(paste_data)
+    if errors:
+        st.error('\n'.join(errors))
+        return None
+
+    resolved, unknown = resolve_item_names(conn, [name for name, _ in parsed_rows])
+    if unknown:
+        st.error(format_unknown_names(unknown))
+        return None
+
+    return [(resolved[name], qty) for name, qty in parsed_rows]
+
+
 def quick_add_cake():
     st.header('Quick Add Cake from Excel Paste')
     cake_name = st.text_input('Cake Name')
@@ -19,46 +38,22 @@ def quick_add_cake():
             st.error('Please provide a name and paste data.')
             return
 
-        rows = paste_data.strip().split('\n')
-        parsed_rows = []
-        for row in rows:
-            row = row.strip()
-            if '\t' in row:
-                parts = row.split('\t')
-            else:
-                parts = row.rsplit(' ', 1)
-            if len(parts) != 2:
-                st.error(f"Invalid row format: {row}")
-                return
-            try:
-                name = parts[0].strip()
-                quantity = float(parts[1].strip())
-                parsed_rows.append((name, quantity))
-            except ValueError:
-                st.error(f"Invalid quantity in row: {row}")
-                return
-
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_sqlite_connection()
         c = conn.cursor()
+        lines = _parse_and_resolve(conn, paste_data)
+        if lines is None:
+            conn.close()
+            return
+
         try:
             c.execute('INSERT INTO cakes (name) VALUES (?)', (cake_name,))
             cake_id = c.lastrowid
-            for name, qty in parsed_rows:
-                c.execute('SELECT id FROM ingredients WHERE name = ?', (name,))
-                ing = c.fetchone()
-                if ing:
-                    c.execute('INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity) VALUES (?, ?, 0, ?)', (cake_id, ing[0], qty))
-                else:
-                    c.execute('SELECT id FROM sub_recipes WHERE name = ?', (name,))
-                    sub = c.fetchone()
-                    if sub:
-                        c.execute('INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity) VALUES (?, ?, 1, ?)', (cake_id, sub[0], qty))
-                    else:
-                        st.error(f'Item "{name}" not found as Ingredient or Sub-Recipe.')
-                        conn.rollback()
-                        conn.close()
-                        return
+            c.executemany(
+                'INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity) VALUES (?, ?, ?, ?)',
+                [(cake_id, item_id, 1 if item_type == 'subrecipe' else 0, qty) for (item_type, item_id), qty in lines]
+            )
             conn.commit()
+            invalidate_recipe_index()
             st.success(f'Cake {cake_name} saved successfully!')
             st.balloons()
         except sqlite3.IntegrityError:
@@ -75,51 +70,74 @@ def quick_add_sub_recipe():
             st.error('Please provide a name and paste data.')
             return
 
-        rows = paste_data.strip().split('\n')
-        parsed_rows = []
-        for row in rows:
-            row = row.strip()
-            if '\t' in row:
-                parts = row.split('\t')
-            else:
-                parts = row.rsplit(' ', 1)
-            if len(parts) != 2:
-                st.error(f"Invalid row format: {row}")
-                return
-            try:
-                name = parts[0].strip()
-                quantity = float(parts[1].strip())
-                parsed_rows.append((name, quantity))
-            except ValueError:
-                st.error(f"Invalid quantity in row: {row}")
-                return
-
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_sqlite_connection()
         c = conn.cursor()
+        c.execute('CREATE TABLE IF NOT EXISTS sub_recipe_nested (id INTEGER PRIMARY KEY AUTOINCREMENT, parent_sub_recipe_id INTEGER, sub_recipe_id INTEGER, quantity REAL, FOREIGN KEY (parent_sub_recipe_id) REFERENCES sub_recipes(id), FOREIGN KEY (sub_recipe_id) REFERENCES sub_recipes(id))')
+        lines = _parse_and_resolve(conn, paste_data)
+        if lines is None:
+            conn.close()
+            return
+
         try:
-            c.execute('CREATE TABLE IF NOT EXISTS sub_recipe_nested (id INTEGER PRIMARY KEY AUTOINCREMENT, parent_sub_recipe_id INTEGER, sub_recipe_id INTEGER, quantity REAL, FOREIGN KEY (parent_sub_recipe_id) REFERENCES sub_recipes(id), FOREIGN KEY (sub_recipe_id) REFERENCES sub_recipes(id))')
             c.execute('INSERT INTO sub_recipes (name) VALUES (?)', (sub_recipe_name,))
             sub_recipe_id = c.lastrowid
 
-            for item_name, qty in parsed_rows:
-                c.execute('SELECT id FROM ingredients WHERE name = ?', (item_name,))
-                row = c.fetchone()
-                if row:
-                    c.execute('INSERT INTO sub_recipe_ingredients (sub_recipe_id, ingredient_id, quantity) VALUES (?, ?, ?)', (sub_recipe_id, row[0], qty))
-                else:
-                    c.execute('SELECT id FROM sub_recipes WHERE name = ?', (item_name,))
-                    row = c.fetchone()
-                    if row:
-                        c.execute('INSERT INTO sub_recipe_nested (parent_sub_recipe_id, sub_recipe_id, quantity) VALUES (?, ?, ?)', (sub_recipe_id, row[0], qty))
-                    else:
-                        st.error(f'Item "{item_name}" not found as Ingredient or Sub-Recipe.')
-                        conn.rollback()
-                        conn.close()
-                        return
+            c.executemany(
+                'INSERT INTO sub_recipe_ingredients (sub_recipe_id, ingredient_id, quantity) VALUES (?, ?, ?)',
+                [(sub_recipe_id, item_id, qty) for (item_type, item_id), qty in lines if item_type == 'ingredient']
+            )
+            c.executemany(
+                'INSERT INTO sub_recipe_nested (parent_sub_recipe_id, sub_recipe_id, quantity) VALUES (?, ?, ?)',
+                [(sub_recipe_id, item_id, qty) for (item_type, item_id), qty in lines if item_type == 'subrecipe']
+            )
 
             conn.commit()
+            invalidate_recipe_index()
             st.success(f'Sub-Recipe {sub_recipe_name} saved!')
             st.balloons()
         except sqlite3.IntegrityError:
             st.error('Sub-recipe already exists.')
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+def bulk_import_recipes():
+    from utils.recipe_import import read_recipe_workbook, validate_recipes, load_recipes
+
+    st.header('Bulk Import Recipes from Workbook')
+    st.caption("Use one sheet per recipe (sheet name = recipe, columns 'Item', 'Quantity', optional 'Recipe Type', "
+               "'Percent Yield') or a single long sheet with columns 'Recipe', 'Recipe Type', 'Item', 'Quantity'.")
+
+    uploaded_file = st.file_uploader('Upload Recipe Workbook', type=['xlsx'])
+    if uploaded_file is None:
+        return
+
+    recipes = read_recipe_workbook(uploaded_file)
+    if not recipes:
+        st.error("No sheets with 'Item' and 'Quantity' columns were found.")
+        return
+
+    conn = get_sqlite_connection()
+    recipes = validate_recipes(conn, recipes)
+
+    report = pd.DataFrame([{
+        'Recipe': r['name'],
+        'Type': r['type'],
+        'Lines': len(r['lines']),
+        'Status': '❌ ' + '; '.join(r['errors']) if r['errors'] else '✅ Ready',
+    } for r in recipes])
+    st.dataframe(report, use_container_width=True)
+
+    valid_count = sum(1 for r in recipes if not r['errors'])
+    st.info(f"{valid_count} of {len(recipes)} recipes are ready to import.")
+
+    if valid_count and st.button(f'Import {valid_count} Recipes'):
+        try:
+            stats = load_recipes(conn, recipes)
+            invalidate_recipe_index()
+            st.success(
+                f"Imported {stats['recipes']} recipes ({stats['lines']} lines) in {stats['seconds']:.2f}s — "
+                f"{stats['recipes_per_second']:.0f} recipes/s, {stats['lines_per_second']:.0f} lines/s"
+            )
+        except sqlite3.Error as e:
+            st.error(f'Import failed, nothing was saved: {e}')
+    conn.close()
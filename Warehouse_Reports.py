@@ -9,122 +9,27 @@ from io import BytesIO
 import zipfile
 import matplotlib.pyplot as plt
 import hashlib
-from config import DB_PATH
-def transfer_order_history_page():
-    st.header("📦 Transfer Order History")
+from config import DB_PATH, METRICS_SAMPLE_RATE
+from db import get_sqlite_connection
+from utils.stock import ensure_stock_schema, invalidate_stock_matrix, low_stock_alert_count, stock_matrix
+from utils.valuation import month_ends, stock_as_of, valuation_summary
+from utils.waste import RECENT_WEEKS, BASELINE_WEEKS, ensure_waste_summary, waste_rates, waste_trends
+from utils.reports import (transfer_orders_frame, transfer_items_frame, transfer_summaries, order_items_frame, stock_report_frame,
+                           warehouse_overview_frame, low_stock_alerts_frame, waste_summary_frame)
 
-    conn = sqlite3.connect(DB_PATH)
-
-    # Fetch transfer order overview
-    df_orders = pd.read_sql_query('''
-        SELECT 
-            t.id AS order_id,
-            ws.name AS source,
-            wt.name AS target,
-            t.status,
-            t.created_at
-        FROM transfer_orders t
-        JOIN warehouses ws ON t.source_warehouse_id = ws.id
-        JOIN warehouses wt ON t.target_warehouse_id = wt.id
-        ORDER BY t.created_at DESC
-    ''', conn)
-
-    if df_orders.empty:
-        st.info("No transfer orders found.")
-        conn.close()
-        return
-
-    # Filters
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        status = st.selectbox("Filter by Status", ["All"] + sorted(df_orders["status"].unique()))
-    with col2:
-        source = st.selectbox("Source Warehouse", ["All"] + sorted(df_orders["source"].unique()))
-    with col3:
-        target = st.selectbox("Target Warehouse", ["All"] + sorted(df_orders["target"].unique()))
-
-    date_range = st.date_input("Filter by Date Range", [])
-
-    # Apply filters
-    if status != "All":
-        df_orders = df_orders[df_orders["status"] == status]
-    if source != "All":
-        df_orders = df_orders[df_orders["source"] == source]
-    if target != "All":
-        df_orders = df_orders[df_orders["target"] == target]
-    if len(date_range) == 2:
-        start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-        df_orders['created_at'] = pd.to_datetime(df_orders['created_at'])
-        df_orders = df_orders[df_orders["created_at"].between(start, end)]
-
-    st.dataframe(df_orders, use_container_width=True)
-
-    # Order detail viewer
-    order_ids = df_orders["order_id"].tolist()
-    if order_ids:
-        selected_id = st.selectbox("Select Order to View Details", order_ids)
-        df_items = pd.read_sql_query('''
-            SELECT 
-                i.name AS ingredient,
-                toi.quantity AS sent,
-                toi.accepted_qty,
-                toi.returned_qty,
-                toi.wasted_qty
-            FROM transfer_order_items toi
-            JOIN ingredients i ON toi.ingredient_id = i.id
-            WHERE toi.transfer_order_id = ?
-        ''', conn, params=(selected_id,))
-
-        st.markdown(f"### 📦 Transfer Order #{selected_id} Details")
-        st.dataframe(df_items, use_container_width=True)
-
-        # Export to Excel
-        buffer = BytesIO()
-        df_items.to_excel(buffer, index=False)
-        buffer.seek(0)
-        st.download_button(
-            label="📤 Export This Order to Excel",
-            data=buffer,
-            file_name=f"transfer_order_{selected_id}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-
-    conn.close()
 
 def transfer_dashboard_page():
     st.header("📊 Transfer Dashboard Overview")
 
-    conn = sqlite3.connect(DB_PATH)
-
-    # Load all transfer item data with warehouse info
-    df = pd.read_sql_query('''
-        SELECT 
-            toi.ingredient_id,
-            i.name AS ingredient,
-            to.status,
-            to.created_at,
-            ws.name AS source,
-            wt.name AS target,
-            toi.quantity AS sent,
-            toi.accepted_qty,
-            toi.returned_qty,
-            toi.wasted_qty
-        FROM transfer_order_items toi
-        JOIN transfer_orders to ON to.id = toi.transfer_order_id
-        JOIN warehouses ws ON to.source_warehouse_id = ws.id
-        JOIN warehouses wt ON to.target_warehouse_id = wt.id
-        JOIN ingredients i ON toi.ingredient_id = i.id
-    ''', conn)
+    conn = get_sqlite_connection()
 
+    df = transfer_items_frame(conn)
     conn.close()
 
     if df.empty:
         st.info("No transfers found.")
         return
 
-    # Convert dates
-    df['created_at'] = pd.to_datetime(df['created_at'])
-
     # Filters
     col1, col2 = st.columns(2)
     with col1:
@@ -145,14 +50,11 @@ def transfer_dashboard_page():
 
     # Summary 1: Ingredient movement
     st.subheader("📦 Total Transferred Quantity per Ingredient")
-    summary_ingredient = df.groupby("ingredient")[["sent", "accepted_qty", "returned_qty", "wasted_qty"]].sum()
+    summary_ingredient, warehouse_summary = transfer_summaries(df)
     st.dataframe(summary_ingredient)
 
     # Summary 2: Warehouse-level totals
     st.subheader("🏭 Transfer Volume per Warehouse")
-    df_sent = df.groupby("source")[["sent"]].sum().rename(columns={"sent": "total_sent"})
-    df_received = df.groupby("target")[["accepted_qty"]].sum().rename(columns={"accepted_qty": "total_received"})
-    warehouse_summary = df_sent.join(df_received, how="outer").fillna(0)
     st.dataframe(warehouse_summary)
 
     # Optional: Export all summaries
@@ -169,38 +71,20 @@ def transfer_dashboard_page():
         file_name="transfer_dashboard_summary.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
-import matplotlib.pyplot as plt
 
 def transfer_visual_dashboard_page():
     st.header("📊 Transfer Visual Dashboard")
 
-    conn = sqlite3.connect(DB_PATH)
-
-    df = pd.read_sql_query('''
-        SELECT 
-            toi.ingredient_id,
-            i.name AS ingredient,
-            to.created_at,
-            ws.name AS source,
-            wt.name AS target,
-            toi.quantity AS sent,
-            toi.accepted_qty
-        FROM transfer_order_items toi
-        JOIN transfer_orders to ON to.id = toi.transfer_order_id
-        JOIN ingredients i ON toi.ingredient_id = i.id
-        JOIN warehouses ws ON to.source_warehouse_id = ws.id
-        JOIN warehouses wt ON to.target_warehouse_id = wt.id
-        WHERE to.status = 'Received'
-    ''', conn)
+    conn = get_sqlite_connection()
 
+    df = transfer_items_frame(conn)
     conn.close()
+    df = df[df['status'] == 'Received']
 
     if df.empty:
         st.info("No received transfer data to visualize.")
         return
 
-    df['created_at'] = pd.to_datetime(df['created_at'])
-
     # Filters
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -293,45 +177,17 @@ def transfer_visual_dashboard_page():
     )
 def view_warehouse():
     st.header("📊 Warehouse Stock Overview")
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_sqlite_connection()
     c = conn.cursor()
 
     # Fetch categories
-    c.execute("SELECT id, name FROM inventory_categories")
-    category_rows = c.fetchall()
-    category_dict = {cat_id: name for cat_id, name in category_rows}
-    category_filter_options = ["All"] + [name for _, name in category_rows]
+    c.execute("SELECT name FROM inventory_categories ORDER BY name")
+    category_filter_options = ["All"] + [row[0] for row in c.fetchall()]
     selected_category = st.selectbox("📂 Filter by Category", category_filter_options)
 
-    # Fetch stock
-    c.execute('''
-        SELECT i.name, w.quantity, i.unit, w.par_level, w.last_updated, w.category_id
-        FROM ingredients i
-        LEFT JOIN warehouse w ON i.id = w.ingredient_id
-    ''')
-
-    rows = c.fetchall()
-    data = []
-
-    for name, qty, unit, par, updated, cat_id in rows:
-        qty = qty or 0
-        par = par or 0
-        cat_name = category_dict.get(cat_id, "Uncategorized")
-        if selected_category != "All" and cat_name != selected_category:
-            continue
-        alert = "🔴 LOW!" if qty < par else ""
-        data.append({
-            "Ingredient": name,
-            "Category": cat_name,
-            "Stock": round(qty, 2),
-            "Par Level": round(par, 2),
-            "Unit": unit,
-            "Last Updated": updated or "N/A",
-            "Alert": alert
-        })
-
-    if data:
-        df = pd.DataFrame(data)
+    df = warehouse_overview_frame(conn, selected_category)
+
+    if not df.empty:
         st.dataframe(df)
 
         # 📥 Export Button
@@ -349,26 +205,33 @@ def view_warehouse():
     else:
         st.warning("No stock data found for selected category.")
 
+    ensure_stock_schema(conn)
+    alerts = low_stock_alerts_frame(conn)
+    st.subheader(f"🚨 Low Stock Alerts ({len(alerts)})")
+    if alerts.empty:
+        st.success("✅ All warehouse stock is at or above par.")
+    else:
+        st.dataframe(alerts, use_container_width=True)
+
+    conn.close()
+
+
+def low_stock_badge():
+    conn = get_sqlite_connection()
+    try:
+        count = low_stock_alert_count(conn)
+    except sqlite3.OperationalError:
+        count = 0
     conn.close()
+    if count:
+        st.sidebar.markdown(f"🔴 **{count}** low-stock alert(s) — see Warehouse Overview")
 
 def transfer_order_history_page():
     st.header("📦 Transfer Order History")
 
-    conn = sqlite3.connect(DB_PATH)
-
-    # Fetch transfer order overview
-    df_orders = pd.read_sql_query('''
-        SELECT 
-            t.id AS order_id,
-            ws.name AS source,
-            wt.name AS target,
-            t.status,
-            t.created_at
-        FROM transfer_orders t
-        JOIN warehouses ws ON t.source_warehouse_id = ws.id
-        JOIN warehouses wt ON t.target_warehouse_id = wt.id
-        ORDER BY t.created_at DESC
-    ''', conn)
+    conn = get_sqlite_connection()
+
+    df_orders = transfer_orders_frame(conn)
 
     if df_orders.empty:
         st.info("No transfer orders found.")
@@ -404,17 +267,7 @@ def transfer_order_history_page():
     order_ids = df_orders["order_id"].tolist()
     if order_ids:
         selected_id = st.selectbox("Select Order to View Details", order_ids)
-        df_items = pd.read_sql_query('''
-            SELECT 
-                i.name AS ingredient,
-                toi.quantity AS sent,
-                toi.accepted_qty,
-                toi.returned_qty,
-                toi.wasted_qty
-            FROM transfer_order_items toi
-            JOIN ingredients i ON toi.ingredient_id = i.id
-            WHERE toi.transfer_order_id = ?
-        ''', conn, params=(selected_id,))
+        df_items = order_items_frame(conn, selected_id)
 
         st.markdown(f"### 📦 Transfer Order #{selected_id} Details")
         st.dataframe(df_items, use_container_width=True)
@@ -432,85 +285,15 @@ def transfer_order_history_page():
 
     conn.close()
 
-    def stock_report():
-        st.header("📊 Stock Report")
-
-        conn = sqlite3.connect(DB_PATH)
-
-        # Load full data
-        df = pd.read_sql_query('''
-                               SELECT i.name  AS ingredient,
-                                      i.unit,
-                                      ic.name AS category,
-                                      w.quantity,
-                                      w.par_level,
-                                      w.last_updated
-                               FROM warehouse w
-                                        JOIN ingredients i ON w.ingredient_id = i.id
-                                        LEFT JOIN inventory_categories ic ON w.category_id = ic.id
-                               ORDER BY i.name
-                               ''', conn)
-
-        # Convert last_updated to datetime
-        if not df.empty:
-            df['last_updated'] = pd.to_datetime(df['last_updated'], errors='coerce')
-
-            # Filters
-            col1, col2 = st.columns(2)
-
-            with col1:
-                search = st.text_input("🔍 Search Ingredient Name").strip().lower()
-            with col2:
-                date_range = st.date_input("📅 Filter by Last Updated", [], help="Select start and end date")
-
-            # Apply filters
-            if search:
-                df = df[df['ingredient'].str.lower().str.contains(search)]
-            if len(date_range) == 2:
-                start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-                df = df[df['last_updated'].between(start, end)]
-
-            st.dataframe(df, use_container_width=True)
-
-            # Export to Excel
-            to_excel = BytesIO()
-            df.to_excel(to_excel, index=False)
-            to_excel.seek(0)
-
-            st.download_button(
-                label="📤 Export Report to Excel",
-                data=to_excel,
-                file_name="stock_report.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-        else:
-            st.warning("No stock data available.")
-
-        conn.close()
 
 def stock_report():
     st.header("📊 Stock Report")
 
-    conn = sqlite3.connect(DB_PATH)
-
-    # Load full data
-    df = pd.read_sql_query('''
-                                   SELECT i.name  AS ingredient,
-                                          i.unit,
-                                          ic.name AS category,
-                                          w.quantity,
-                                          w.par_level,
-                                          w.last_updated
-                                   FROM warehouse w
-                                            JOIN ingredients i ON w.ingredient_id = i.id
-                                            LEFT JOIN inventory_categories ic ON w.category_id = ic.id
-                                   ORDER BY i.name
-                                   ''', conn)
-
-    # Convert last_updated to datetime
-    if not df.empty:
-        df['last_updated'] = pd.to_datetime(df['last_updated'], errors='coerce')
+    conn = get_sqlite_connection()
 
+    df = stock_report_frame(conn)
+
+    if not df.empty:
         # Filters
         col1, col2 = st.columns(2)
 
@@ -542,4 +325,236 @@ def stock_report():
     else:
         st.warning("No stock data available.")
 
+    st.divider()
+    st.subheader("💰 Stock Valuation")
+    ensure_stock_schema(conn)
+    mode = st.radio("Value stock", ["As of a date", "At each month-end"], horizontal=True)
+    if mode == "As of a date":
+        dates = [st.date_input("📅 As of end of", datetime.now().date(), key="valuation_date")]
+    else:
+        today = datetime.now().date()
+        period = st.date_input("📅 Months", [today.replace(year=today.year - 1, day=1), today], key="valuation_months")
+        dates = month_ends(period[0], period[-1]) if period else []
+
+    positions = stock_as_of(conn, dates)
+    if positions.empty:
+        st.info("No warehouse stock to value.")
+    else:
+        summary = valuation_summary(positions)
+        st.dataframe(
+            summary.pivot_table(index=["warehouse", "category"], columns="date", values="value", aggfunc="sum").round(2),
+            use_container_width=True
+        )
+        st.caption("Quantities are rebuilt from stock movements; values use current prices per unit.")
+        with st.expander("Positions"):
+            st.dataframe(positions[positions["quantity"] != 0].round(4), use_container_width=True)
+
+        to_excel = BytesIO()
+        with pd.ExcelWriter(to_excel) as writer:
+            summary.to_excel(writer, sheet_name="Summary", index=False)
+            positions.to_excel(writer, sheet_name="Positions", index=False)
+        to_excel.seek(0)
+        st.download_button(
+            label="📤 Export Valuation to Excel",
+            data=to_excel,
+            file_name="stock_valuation.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
     conn.close()
+
+
+def stock_matrix_page():
+    st.header("🧮 Stock Matrix")
+    if st.button("🔄 Refresh", help="Re-read ingredient names, prices and categories changed outside the app."):
+        invalidate_stock_matrix()
+
+    conn = get_sqlite_connection()
+    ensure_stock_schema(conn)
+    matrix, low = stock_matrix(conn)
+    conn.close()
+
+    warehouses = list(low.columns)
+    if matrix.empty or not warehouses:
+        st.info("No ingredients or warehouses found.")
+        return
+
+    col1, col2, col3 = st.columns([3, 3, 2])
+    with col1:
+        categories = st.multiselect("📂 Categories", sorted(matrix["category"].unique()))
+    with col2:
+        search = st.text_input("🔍 Search Ingredient Name").strip().lower()
+    with col3:
+        show = st.radio("Show", ["Quantity", "Value"], horizontal=True)
+    col1, col2 = st.columns(2)
+    only_low = col1.checkbox("Only ingredients below par somewhere")
+    group = col2.checkbox("Group by category", value=True)
+
+    keep = pd.Series(True, index=matrix.index)
+    if categories:
+        keep &= matrix["category"].isin(categories)
+    if search:
+        keep &= matrix["ingredient"].str.lower().str.contains(search, regex=False)
+    if only_low:
+        keep &= low.any(axis=1)
+    matrix, low = matrix[keep], low[keep]
+    if matrix.empty:
+        st.warning("No ingredients match the selected filters.")
+        return
+
+    columns = warehouses + ["Total"]
+    if show == "Value":
+        matrix[columns] = matrix[columns].mul(matrix["price"], axis=0)
+    if group:
+        matrix = matrix.sort_values(["category", "ingredient"])
+        low = low.loc[matrix.index]
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Ingredients", len(matrix))
+    col2.metric("Positions Below Par", int(low.to_numpy().sum()))
+    if show == "Value":
+        col3.metric("Total Value", f"{matrix['Total'].sum():,.2f}")
+
+    view = matrix[["ingredient", "unit", "category"] + columns].rename(
+        columns={"ingredient": "Ingredient", "unit": "Unit", "category": "Category"}).round(2)
+    highlight = low.replace({True: "background-color: #ffd6d6", False: ""})
+    st.dataframe(view.style.apply(lambda _: highlight.to_numpy(), axis=None, subset=warehouses).format(precision=2),
+                 use_container_width=True, hide_index=True)
+    st.caption("Highlighted cells are below their par level. Empty cells: the warehouse has no stock row.")
+
+    sheets = {"Matrix": view}
+    if group:
+        st.subheader("📂 By Category")
+        below_par = low.groupby(matrix["category"]).sum().add_suffix(" below par")
+        by_category = matrix.groupby("category").agg(Ingredients=("ingredient", "count")).join(below_par)
+        if show == "Value":
+            by_category = by_category.join(matrix.groupby("category")[columns].sum())
+            by_category.loc["Total"] = by_category.sum()
+        sheets["By Category"] = by_category.round(2).reset_index().rename(columns={"category": "Category"})
+        st.dataframe(sheets["By Category"], use_container_width=True, hide_index=True)
+
+    to_excel = BytesIO()
+    with pd.ExcelWriter(to_excel) as writer:
+        for name, sheet in sheets.items():
+            sheet.to_excel(writer, sheet_name=name, index=False)
+    to_excel.seek(0)
+    st.download_button(
+        label="📤 Export Stock Matrix to Excel",
+        data=to_excel,
+        file_name="stock_matrix.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+
+def waste_analytics_page():
+    st.header("🗑️ Waste & Shrinkage Analytics")
+
+    conn = get_sqlite_connection()
+    ensure_waste_summary(conn)
+    df = waste_summary_frame(conn)
+    conn.close()
+
+    if df.empty:
+        st.info("No received transfers to analyse.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_route = st.selectbox("Route", ["All"] + sorted(df["route"].unique()))
+    with col2:
+        date_range = st.date_input("Weeks Starting Between", [])
+    if selected_route != "All":
+        df = df[df["route"] == selected_route]
+    if len(date_range) == 2:
+        start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+        df = df[df["week"].between(start, end)]
+    if df.empty:
+        st.warning("No receipts found for selected filters.")
+        return
+
+    overall = waste_rates(df.assign(all="All"), ["all"]).iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Sent", f"{overall['sent']:,.2f}")
+    col2.metric("Waste Rate", f"{overall['waste_rate']:.1%}")
+    col3.metric("Return Rate", f"{overall['return_rate']:.1%}")
+    col4.metric("Shrinkage Rate", f"{overall['shrinkage_rate']:.1%}")
+
+    rate_columns = {"sent": "Sent", "accepted": "Accepted", "returned": "Returned", "wasted": "Wasted",
+                    "waste_rate": "Waste %", "return_rate": "Return %", "shrinkage_rate": "Shrinkage %"}
+
+    def rate_table(by, labels):
+        table = waste_rates(df, by).rename(columns={**labels, **rate_columns})
+        for col in ("Waste %", "Return %", "Shrinkage %"):
+            table[col] = (table[col] * 100).round(2)
+        return table.round(3)
+
+    tables = {
+        "By Ingredient": rate_table(["ingredient", "unit"], {"ingredient": "Ingredient", "unit": "Unit"}),
+        "By Route": rate_table(["route"], {"route": "Route"}),
+        "By Receiver": rate_table(["receiver"], {"receiver": "Received By"}),
+    }
+    tabs = st.tabs(list(tables) + ["By Week", "Trends"])
+    for tab, table in zip(tabs, tables.values()):
+        with tab:
+            st.dataframe(table, use_container_width=True, hide_index=True)
+
+    with tabs[3]:
+        weekly = waste_rates(df, ["week"]).sort_values("week").set_index("week")
+        st.line_chart(weekly[["waste_rate", "return_rate", "shrinkage_rate"]] * 100)
+        tables["By Week"] = weekly.reset_index().rename(columns={"week": "Week", **rate_columns})
+        st.dataframe(tables["By Week"], use_container_width=True, hide_index=True)
+
+    with tabs[4]:
+        dimension = st.radio("Trend by", ["Ingredient", "Route", "Receiver"], horizontal=True)
+        trends = waste_trends(df, [dimension.lower()])
+        st.caption(f"Waste rate of the last {RECENT_WEEKS} weeks against the {BASELINE_WEEKS} weeks before, "
+                   f"with the least-squares slope of the weekly rate.")
+        rising = trends[trends["trend"] == "Rising"]
+        if rising.empty:
+            st.success("✅ No rising waste trends.")
+        else:
+            st.warning(f"⚠️ Waste is rising for {len(rising)} {dimension.lower()}(s): " + ", ".join(rising[dimension.lower()].head(10)))
+        trends[["baseline_rate", "recent_rate", "slope_per_week"]] *= 100
+        tables["Trends"] = trends.rename(columns={dimension.lower(): dimension, "baseline_rate": "Baseline Waste %",
+                                                  "recent_rate": "Recent Waste %", "slope_per_week": "Slope (pts/week)",
+                                                  "trend": "Trend"}).round(3)
+        st.dataframe(tables["Trends"], use_container_width=True, hide_index=True)
+
+    to_excel = BytesIO()
+    with pd.ExcelWriter(to_excel) as writer:
+        for name, table in tables.items():
+            table.to_excel(writer, sheet_name=name, index=False)
+    to_excel.seek(0)
+    st.download_button(
+        label="📤 Export Waste Analytics to Excel",
+        data=to_excel,
+        file_name="waste_analytics.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+
+def performance_page():
+    from utils.profiling import flush_metrics, page_percentiles
+
+    st.header("⏱️ Page Performance")
+    days = st.selectbox("Period", [1, 7, 30], index=1, format_func=lambda d: f"Last {d} day(s)")
+    since = (datetime.now() - pd.Timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = get_sqlite_connection()
+    flush_metrics(conn)
+    df = page_percentiles(conn, since)
+    conn.close()
+
+    if df.empty:
+        st.info("No page runs recorded for this period.")
+        return
+
+    st.caption(f"Wall, DB and pandas times in ms, peak memory in KB (only recorded when memory tracing is on). "
+               f"Runs are a {METRICS_SAMPLE_RATE:.0%} sample of page reruns.")
+    st.dataframe(df, use_container_width=True)
+
+    fig, ax = plt.subplots()
+    df[['wall_ms p50', 'wall_ms p95']].head(15).plot(kind="barh", ax=ax)
+    ax.set_xlabel("ms")
+    ax.invert_yaxis()
+    st.pyplot(fig)
@@ -9,10 +9,18 @@ import zipfile
 import matplotlib.pyplot as plt
 import hashlib
 from config import DB_PATH
+from db import get_sqlite_connection
+from utils.grid import paged_editor, clear_editor
+from utils.search import ranked_ids
+from utils.stock import EFFECTIVE_PAR_SQL, ensure_stock_schema, invalidate_stock_matrix
+from utils.transfers import (InsufficientStockError, create_transfer_order, pending_orders, order_items,
+                             receive_transfer_order, source_shortages)
+from utils.waste import ensure_waste_summary
 def create_transfer_order_page():
     st.header("🚚 Create Transfer Order")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_sqlite_connection()
+    ensure_stock_schema(conn)
     c = conn.cursor()
 
     # Load warehouses
@@ -34,68 +42,51 @@ def create_transfer_order_page():
     target_id = warehouse_dict[target]
 
     # Ingredient name filter
-    search_term = st.text_input("🔍 Search Ingredients").strip().lower()
+    search_term = st.text_input("🔍 Search Ingredients").strip()
+    matches = ranked_ids(conn, "ingredients", search_term) if search_term else None
 
     # Query ingredients with stock in source and target
-    c.execute('''
-        SELECT 
-            i.id,
-            i.name,
-            i.unit,
-            IFNULL(src_ws.quantity, 0),
-            IFNULL(trg_ws.quantity, 0)
-        FROM ingredients i
-        LEFT JOIN warehouse_stock src_ws 
-            ON i.id = src_ws.ingredient_id AND src_ws.warehouse_id = ?
-        LEFT JOIN warehouse_stock trg_ws 
-            ON i.id = trg_ws.ingredient_id AND trg_ws.warehouse_id = ?
-        ORDER BY i.name
-    ''', (source_id, target_id))
-
-    ingredients = c.fetchall()
+    ingredients = []
+    if matches is None or matches:
+        id_filter = f"WHERE i.id IN ({','.join('?' * len(matches))})" if matches else ""
+        c.execute(f'''
+            SELECT 
+                i.id,
+                i.name,
+                i.unit,
+                IFNULL(src_ws.quantity, 0),
+                IFNULL(trg_ws.quantity, 0)
+            FROM ingredients i
+            LEFT JOIN warehouse_stock src_ws 
+                ON i.id = src_ws.ingredient_id AND src_ws.warehouse_id = ?
+            LEFT JOIN warehouse_stock trg_ws 
+                ON i.id = trg_ws.ingredient_id AND trg_ws.warehouse_id = ?
+            {id_filter}
+            ORDER BY i.name
+        ''', (source_id, target_id, *(matches or ())))
+        ingredients = c.fetchall()
+    if matches:
+        ingredients.sort(key=lambda row: matches[row[0]])
 
     st.subheader("📦 Select Items to Transfer")
-    selected_items = []
+    df = pd.DataFrame(ingredients, columns=["ingredient_id", "Ingredient", "Unit", "Source Qty", "Target Qty"]).set_index("ingredient_id")
+    df["Transfer Qty"] = 0.0
 
-    for ing_id, name, unit, source_qty, target_qty in ingredients:
-        if search_term and search_term not in name.lower():
-            continue  # Filter out unmatched names
-
-        col1, col2, col3 = st.columns([5, 3, 2])
-        label = f"{name} ({unit}) – Source: {source_qty} | Target: {target_qty}"
-
-        if source_qty > 0:
-            transfer_qty = col1.number_input(
-                label, min_value=0.0, max_value=source_qty, step=0.1, key=f"transfer_{ing_id}"
-            )
-        else:
-            col1.markdown(f"<span style='color:#999'>{label}</span>", unsafe_allow_html=True)
-            transfer_qty = 0
-
-        if transfer_qty > 0:
-            selected_items.append((ing_id, transfer_qty))
+    editor_key = f"transfer_{source_id}_{target_id}"
+    _, pending = paged_editor(df, editor_key, ["Transfer Qty"], column_config={
+        "Transfer Qty": st.column_config.NumberColumn(min_value=0.0, step=0.1),
+    })
+    selected_items = [(ing_id, values["Transfer Qty"]) for ing_id, (_, values) in pending.items() if values["Transfer Qty"] > 0]
+    over = [seen["Ingredient"] for ing_id, (seen, values) in pending.items() if values["Transfer Qty"] > seen["Source Qty"]]
 
     if st.button("➕ Create Transfer Order"):
         if not selected_items:
             st.warning("⚠️ You must select at least one ingredient with quantity.")
+        elif over:
+            st.error(f"❌ Transfer exceeds source stock for: {', '.join(over)}")
         else:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # Create transfer order
-            c.execute('''
-                INSERT INTO transfer_orders (source_warehouse_id, target_warehouse_id, status, created_at)
-                VALUES (?, ?, 'Pending', ?)
-            ''', (source_id, target_id, now))
-            order_id = c.lastrowid
-
-            # Insert items
-            for ing_id, qty in selected_items:
-                c.execute('''
-                    INSERT INTO transfer_order_items (transfer_order_id, ingredient_id, quantity)
-                    VALUES (?, ?, ?)
-                ''', (order_id, ing_id, qty))
-
-            conn.commit()
+            order_id = create_transfer_order(conn, source_id, target_id, selected_items)
+            clear_editor(editor_key)
             st.success(f"✅ Transfer Order #{order_id} created successfully.")
 
     conn.close()
@@ -118,7 +109,9 @@ def create_kitchen_batch_log_table(conn):
 def receive_transfer_order_page():
     st.header("📥 Receive Transfer Orders")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_sqlite_connection()
+    ensure_stock_schema(conn)
+    ensure_waste_summary(conn)
     c = conn.cursor()
 
     # Get kitchen warehouse ID
@@ -130,15 +123,7 @@ def receive_transfer_order_page():
         return
     kitchen_id = kitchen_row[0]
 
-    # Fetch pending transfer orders targeted to kitchen
-    c.execute('''
-        SELECT t.id, w1.name AS source_name, t.created_at
-        FROM transfer_orders t
-        JOIN warehouses w1 ON t.source_warehouse_id = w1.id
-        WHERE t.target_warehouse_id = ? AND t.status = 'Pending'
-        ORDER BY t.created_at DESC
-    ''', (kitchen_id,))
-    orders = c.fetchall()
+    orders = pending_orders(conn, kitchen_id)
 
     if not orders:
         st.info("No pending transfer orders to receive.")
@@ -152,84 +137,57 @@ def receive_transfer_order_page():
     )
     selected_order_id = int(selected.split('#')[1].split(' ')[0])
 
-    # Fetch items in selected order
-    c.execute('''
-        SELECT toi.ingredient_id, i.name, i.unit, toi.quantity
-        FROM transfer_order_items toi
-        JOIN ingredients i ON toi.ingredient_id = i.id
-        WHERE toi.transfer_order_id = ?
-    ''', (selected_order_id,))
-    items = c.fetchall()
+    items = order_items(conn, selected_order_id)
 
     st.subheader("🔍 Review and Confirm Receipt")
 
-    updated_items = []
-
-    for ing_id, name, unit, qty in items:
-        st.markdown(f"**{name} ({unit})** — Ordered: {qty}")
-        col1, col2, col3 = st.columns(3)
-        accepted = col1.number_input(
-            "Accepted Qty",
-            min_value=0.0,
-            max_value=qty,
-            step=0.1,
-            value=qty,  # ✅ Pre-fill with full quantity
-            key=f"acc_{ing_id}"
-        )
+    df = pd.DataFrame(items, columns=["ingredient_id", "Ingredient", "Unit", "Ordered"]).set_index("ingredient_id")
+    df["Accepted"] = df["Ordered"]  # ✅ Pre-fill with full quantity
+    df["Returned"] = 0.0
+    df["Wasted"] = 0.0
 
-        returned = col2.number_input("Returned Qty", min_value=0.0, max_value=qty - accepted, step=0.1, key=f"ret_{ing_id}")
-        wasted = col3.number_input("Wasted Qty", min_value=0.0, max_value=qty - accepted - returned, step=0.1, key=f"was_{ing_id}")
+    editor_key = f"receive_{selected_order_id}"
+    quantity = st.column_config.NumberColumn(min_value=0.0, step=0.1)
+    merged, _ = paged_editor(df, editor_key, ["Accepted", "Returned", "Wasted"],
+                             column_config={"Accepted": quantity, "Returned": quantity, "Wasted": quantity})
 
-        if accepted + returned + wasted > qty:
-            st.error(f"❌ Total for {name} exceeds sent quantity.")
-        else:
-            updated_items.append((ing_id, qty, accepted, returned, wasted))
+    over = merged[merged["Accepted"] + merged["Returned"] + merged["Wasted"] > merged["Ordered"]]
+    for name in over["Ingredient"]:
+        st.error(f"❌ Total for {name} exceeds sent quantity.")
+
+    # The full sent quantity leaves the source, which must still hold it
+    c.execute("SELECT source_warehouse_id FROM transfer_orders WHERE id = ?", (selected_order_id,))
+    source_name = next(o[1] for o in orders if o[0] == selected_order_id)
+    shortages = source_shortages(conn, c.fetchone()[0], merged["Ordered"].to_dict())
+    for ing_id, (sent, held) in shortages.items():
+        st.error(f"❌ {source_name} holds only {held:g} {merged.at[ing_id, 'Unit']} of {merged.at[ing_id, 'Ingredient']}, "
+                 f"but {sent:g} were sent. Correct its stock before receiving this order.")
+
+    received_by = st.text_input("Received By")
 
     # Handle Confirm
-    if st.button("✅ Confirm Receipt"):
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        for ing_id, sent, accepted, returned, wasted in updated_items:
-            # Deduct full qty from source warehouse
-            c.execute('''
-                UPDATE warehouse_stock
-                SET quantity = quantity - ?
-                WHERE warehouse_id = (
-                    SELECT source_warehouse_id FROM transfer_orders WHERE id = ?
-                ) AND ingredient_id = ?
-            ''', (sent, selected_order_id, ing_id))
-
-            # Add accepted qty to kitchen warehouse
-            c.execute('''
-                INSERT INTO warehouse_stock (warehouse_id, ingredient_id, quantity)
-                VALUES (?, ?, ?)
-                ON CONFLICT(warehouse_id, ingredient_id) DO UPDATE SET
-                    quantity = quantity + excluded.quantity
-            ''', (kitchen_id, ing_id, accepted))
-
-            # Log accepted/returned/wasted amounts
-            c.execute('''
-                UPDATE transfer_order_items
-                SET accepted_qty = ?, returned_qty = ?, wasted_qty = ?
-                WHERE transfer_order_id = ? AND ingredient_id = ?
-            ''', (accepted, returned, wasted, selected_order_id, ing_id))
-
-        # Mark order as received
-        c.execute("UPDATE transfer_orders SET status = 'Received' WHERE id = ?", (selected_order_id,))
-        conn.commit()
-        st.success("✅ Transfer order successfully received.")
+    if st.button("✅ Confirm Receipt", disabled=not over.empty or bool(shortages)):
+        updated_items = list(zip(merged.index.tolist(), merged["Ordered"].tolist(), merged["Accepted"].tolist(),
+                                 merged["Returned"].tolist(), merged["Wasted"].tolist()))
+        try:
+            receive_transfer_order(conn, selected_order_id, updated_items, received_by.strip())
+        except InsufficientStockError as e:
+            st.error(f"❌ {e}")
+        else:
+            clear_editor(editor_key)
+            st.success("✅ Transfer order successfully received.")
 
     conn.close()
 
 def manage_categories():
     st.header("🗂️ Manage Inventory Categories")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_sqlite_connection()
     c = conn.cursor()
 
     # Add new category
-    new_cat = st.text_input("Add New Category")
-    if st.button("➕ Add Category"):
+    new_cat = st.text_input("➕ Add New Category", key="new_cat_input")
+    if st.button("Add Category", key="add_cat_btn"):
         try:
             c.execute("INSERT INTO inventory_categories (name) VALUES (?)", (new_cat.strip(),))
             conn.commit()
@@ -238,18 +196,38 @@ def manage_categories():
             st.error("Category already exists or is invalid.")
 
     st.divider()
+    st.subheader("📝 Edit or Delete Existing Categories")
 
-    # List and delete existing categories
-    c.execute("SELECT id, name FROM inventory_categories ORDER BY name")
+    # Categories and their usage in one query
+    c.execute('''
+        SELECT ic.id, ic.name, COUNT(w.ingredient_id)
+        FROM inventory_categories ic
+        LEFT JOIN warehouse w ON w.category_id = ic.id
+        GROUP BY ic.id, ic.name
+        ORDER BY ic.name
+    ''')
     categories = c.fetchall()
 
-    for cat_id, name in categories:
-        col1, col2 = st.columns([5, 1])
-        col1.markdown(f"**{name}**")
-        if col2.button("🗑️ Delete", key=f"del_{cat_id}"):
-            c.execute("SELECT COUNT(*) FROM warehouse WHERE category_id = ?", (cat_id,))
-            count = c.fetchone()[0]
-            if count > 0:
+    for cat_id, name, in_use in categories:
+        col1, col2, col3 = st.columns([6, 2, 2])
+        new_name = col1.text_input(label="Name", value=name, key=f"edit_name_{cat_id}", label_visibility="collapsed")
+
+        if col2.button("💾 Rename", key=f"rename_btn_{cat_id}"):
+            if new_name.strip() == "":
+                st.warning("Name cannot be empty.")
+            elif new_name.strip() == name:
+                st.info("No changes made.")
+            else:
+                try:
+                    c.execute("UPDATE inventory_categories SET name = ? WHERE id = ?", (new_name.strip(), cat_id))
+                    conn.commit()
+                    invalidate_stock_matrix()
+                    st.success(f"Renamed '{name}' to '{new_name.strip()}'")
+                except sqlite3.IntegrityError:
+                    st.error("That name already exists.")
+
+        if col3.button("🗑️ Delete", key=f"del_{cat_id}"):
+            if in_use > 0:
                 st.warning(f"Category '{name}' is in use and cannot be deleted.")
             else:
                 c.execute("DELETE FROM inventory_categories WHERE id = ?", (cat_id,))
@@ -258,3 +236,211 @@ def manage_categories():
 
     conn.close()
 
+
+
+def auto_replenishment_page():
+    from utils.replenishment import load_par_positions, allocate_transfers, draft_transfer_orders
+
+    st.header("🔁 Automatic Replenishment")
+
+    conn = get_sqlite_connection()
+    ensure_stock_schema(conn)
+    c = conn.cursor()
+
+    c.execute("SELECT id, name FROM warehouses ORDER BY name")
+    warehouses = c.fetchall()
+    warehouse_dict = {name: wid for wid, name in warehouses}
+    id_to_warehouse = {wid: name for wid, name in warehouses}
+    if len(warehouses) < 2:
+        st.warning("⚠️ At least two warehouses are needed to plan transfers.")
+        conn.close()
+        return
+
+    default_targets = [n for n in warehouse_dict if n == 'Kitchen'] or [warehouses[0][1]]
+    targets = st.multiselect("Warehouses to Replenish (up to par level)", list(warehouse_dict.keys()), default=default_targets)
+    if not targets:
+        st.info("Select at least one warehouse to replenish.")
+        conn.close()
+        return
+
+    positions = load_par_positions(conn, [warehouse_dict[t] for t in targets])
+    allocations = allocate_transfers(positions)
+
+    c.execute("SELECT id, name, unit FROM ingredients")
+    ingredient_info = {ing_id: (name, unit) for ing_id, name, unit in c.fetchall()}
+
+    deficits = positions[positions['deficit'] > 0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Positions Below Par", len(deficits))
+    col2.metric("Total Deficit", f"{deficits['deficit'].sum():,.2f}")
+    col3.metric("Transfer Lines", len(allocations))
+    if (positions['incoming'] > 0).any():
+        st.caption(f"Pending transfer orders already cover {int((positions['incoming'] > 0).sum())} position(s); "
+                   f"their quantities are counted as arriving and are not drafted again.")
+
+    if allocations.empty:
+        st.success("✅ Nothing to transfer — no deficits that other warehouses can cover.")
+        conn.close()
+        return
+
+    covered = allocations.groupby(['target_warehouse_id', 'ingredient_id'])['quantity'].sum()
+    uncovered = deficits.set_index(['warehouse_id', 'ingredient_id'])['deficit'].sub(covered, fill_value=0).clip(lower=0)
+
+    st.subheader("🚚 Proposed Transfers")
+    st.dataframe(pd.DataFrame({
+        'From': allocations['source_warehouse_id'].map(id_to_warehouse),
+        'To': allocations['target_warehouse_id'].map(id_to_warehouse),
+        'Ingredient': allocations['ingredient_id'].map(lambda i: ingredient_info.get(i, ('?', ''))[0]),
+        'Unit': allocations['ingredient_id'].map(lambda i: ingredient_info.get(i, ('', ''))[1]),
+        'Quantity': allocations['quantity'].round(3),
+    }), use_container_width=True)
+
+    if (uncovered > 0).any():
+        st.warning(f"⚠️ {int((uncovered > 0).sum())} deficit(s) cannot be fully covered from other warehouses.")
+
+    if st.button("➕ Draft Transfer Orders"):
+        order_ids = draft_transfer_orders(conn, allocations)
+        st.success(f"✅ Drafted {len(order_ids)} transfer order(s): " + ", ".join(f"#{o}" for o in order_ids))
+
+    conn.close()
+
+
+def demand_forecast_page():
+    from utils.forecasting import (HISTORY_DAYS, LEAD_TIME_DAYS, REVIEW_DAYS, SERVICE_Z, forecast_demand,
+                                   suggest_par_levels, set_par_levels)
+
+    st.header("📈 Demand Forecast")
+
+    conn = get_sqlite_connection()
+    ensure_stock_schema(conn)
+    ensure_waste_summary(conn)
+    c = conn.cursor()
+
+    c.execute("SELECT id, name FROM warehouses ORDER BY name")
+    warehouse_dict = {name: wid for wid, name in c.fetchall()}
+    if not warehouse_dict:
+        st.warning("No warehouses found.")
+        conn.close()
+        return
+    names = list(warehouse_dict.keys())
+    selected_warehouse = st.selectbox("🏢 Forecast Demand For", names, index=names.index('Kitchen') if 'Kitchen' in names else 0)
+    production = st.checkbox("Include kitchen production log", value=selected_warehouse == 'Kitchen',
+                             help="Ingredients used in logged production are forecast from that consumption instead of transfers.")
+
+    forecast = forecast_demand(conn, warehouse_dict[selected_warehouse], production=production)
+    if forecast.empty:
+        st.info(f"No received transfers or production in the last {HISTORY_DAYS} days to forecast from.")
+        conn.close()
+        return
+
+    col1, col2, col3 = st.columns(3)
+    lead_time = col1.number_input("Lead Time (days)", min_value=0, value=LEAD_TIME_DAYS, step=1)
+    review = col2.number_input("Review Period (days)", min_value=1, value=REVIEW_DAYS, step=1)
+    service_z = col3.number_input("Safety Factor (z)", min_value=0.0, value=SERVICE_Z, step=0.05)
+
+    # The par the low-stock alerts use: the warehouse's own, else the legacy per-ingredient one
+    c.execute(f'''
+        SELECT i.id, i.name, i.unit, {EFFECTIVE_PAR_SQL}
+        FROM ingredients i
+        LEFT JOIN warehouse_stock ws ON ws.ingredient_id = i.id AND ws.warehouse_id = ?
+        LEFT JOIN warehouse w ON w.ingredient_id = i.id
+    ''', (warehouse_dict[selected_warehouse],))
+    info = pd.DataFrame(c.fetchall(), columns=['ingredient_id', 'Ingredient', 'Unit', 'Current Par'])
+    df = forecast.merge(info, on='ingredient_id')
+    df['Suggested Par'] = suggest_par_levels(df, lead_time, review, service_z)
+    df['Change'] = (df['Suggested Par'] - df['Current Par']).round(2)
+
+    st.dataframe(pd.DataFrame({
+        'Ingredient': df['Ingredient'],
+        'Unit': df['Unit'],
+        'Per Day': df['daily_forecast'].round(3),
+        'Per Week': df['weekly_forecast'].round(3),
+        'Last 28 Days (avg/day)': df['avg_28d'].round(3),
+        'Last Week': df['last_week'].round(3),
+        'Days With Demand': df['active_days'],
+        'Current Par': df['Current Par'].round(2),
+        'Suggested Par': df['Suggested Par'],
+        'Change': df['Change'],
+    }).sort_values('Ingredient'), use_container_width=True, hide_index=True)
+
+    changed = df[df['Change'].abs() > 0.005]
+    st.caption(f"Par levels cover {lead_time + review} day(s) of forecast demand plus safety stock; "
+               f"{len(changed)} of {len(df)} differ from the current par.")
+    if not changed.empty and st.button("✅ Apply Suggested Par Levels"):
+        set_par_levels(conn, warehouse_dict[selected_warehouse], dict(zip(changed['ingredient_id'], changed['Suggested Par'])))
+        st.success(f"✅ Updated the par level of {len(changed)} ingredient(s) in {selected_warehouse}.")
+
+    conn.close()
+
+
+def kitchen_production_page():
+    from utils.production import CAKE, SUB_RECIPE, production_consumption, post_production
+
+    st.header("👩‍🍳 Kitchen Production")
+
+    conn = get_sqlite_connection()
+    create_kitchen_batch_log_table(conn)
+    ensure_stock_schema(conn)
+    c = conn.cursor()
+
+    c.execute("SELECT id, name FROM warehouses ORDER BY name")
+    warehouse_dict = {name: wid for wid, name in c.fetchall()}
+    if not warehouse_dict:
+        st.warning("No warehouses found.")
+        conn.close()
+        return
+    names = list(warehouse_dict.keys())
+    selected_warehouse = st.selectbox("🏢 Consume Stock From", names, index=names.index('Kitchen') if 'Kitchen' in names else 0)
+    warehouse_id = warehouse_dict[selected_warehouse]
+
+    c.execute("SELECT id, name FROM cakes ORDER BY name")
+    cakes = c.fetchall()
+    c.execute("SELECT id, name FROM sub_recipes ORDER BY name")
+    sub_recipes = c.fetchall()
+
+    options = [f"{n} (Cake ID:{i})" for i, n in cakes] + [f"{n} (Sub-Recipe ID:{i})" for i, n in sub_recipes]
+    selected_items = st.multiselect("Select Produced Cakes or Sub-Recipes", options)
+
+    items = []
+    for item in selected_items:
+        if "Cake ID:" in item:
+            item_id = int(item.split('Cake ID:')[1].replace(')', ''))
+            qty = st.number_input(f"{item.split(' (')[0]} (pieces)", min_value=0.0, step=1.0, key=f"prod_cake_{item_id}")
+            items.append((CAKE, item_id, qty))
+        else:
+            item_id = int(item.split('Sub-Recipe ID:')[1].replace(')', ''))
+            qty = st.number_input(f"{item.split(' (')[0]} (kg)", min_value=0.0, step=0.001, format="%.3f", key=f"prod_sub_{item_id}")
+            items.append((SUB_RECIPE, item_id, qty))
+    produced_by = st.text_input("Produced By")
+
+    items = [i for i in items if i[2] > 0]
+    if not items:
+        conn.close()
+        return
+
+    consumption = production_consumption(conn, items)
+    c.execute('''
+        SELECT i.id, i.name, i.unit, IFNULL(ws.quantity, 0)
+        FROM ingredients i
+        LEFT JOIN warehouse_stock ws ON i.id = ws.ingredient_id AND ws.warehouse_id = ?
+    ''', (warehouse_id,))
+    stock = {ing_id: (name, unit, qty) for ing_id, name, unit, qty in c.fetchall()}
+
+    df = pd.DataFrame([{
+        'Ingredient': stock.get(ing_id, ('?', '', 0))[0],
+        'Unit': stock.get(ing_id, ('?', '', 0))[1],
+        'Consumed': round(qty, 5),
+        'In Stock': round(stock.get(ing_id, ('?', '', 0))[2], 5),
+        'After Posting': round(stock.get(ing_id, ('?', '', 0))[2] - qty, 5),
+    } for ing_id, qty in consumption.items()])
+
+    st.subheader("🧾 Ingredient Consumption")
+    st.dataframe(df, use_container_width=True)
+    if not df.empty and (df['After Posting'] < 0).any():
+        st.warning(f"⚠️ {int((df['After Posting'] < 0).sum())} ingredient(s) will go below zero in {selected_warehouse}.")
+
+    if st.button("✅ Post Production"):
+        post_production(conn, items, warehouse_id, produced_by)
+        st.success(f"✅ Production posted — {len(consumption)} ingredient(s) consumed from {selected_warehouse}.")
+
+    conn.close()
@@ -0,0 +1,207 @@
+"""JSON API over cake costs, batch requirements, warehouse stock and transfer orders.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Recipe endpoints read MySQL through the connection pool, stock and transfer endpoints read the
+SQLite warehouse database. Costing uses the same recipe index code as the pages, but this process
+keeps its own copy of the index: page edits cannot invalidate it, so it is rebuilt once per
+API_CACHE_SECONDS. GET responses (404s included) are reused for API_CACHE_SECONDS and carry an
+ETag, so clients polling with If-None-Match get an empty 304 while nothing has changed.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel
+
+from config import API_CACHE_SECONDS
+from db import get_pooled_connection, get_sqlite_connection
+from utils.batch_helpers import calculate_batch
+from utils.cost_index import get_recipe_index, invalidate_recipe_index
+from utils.costing import all_cake_costs
+from utils.reports import invalidate_transfer_reports, order_items_frame, transfer_orders_frame
+from utils.stock import iter_stock_levels
+
+app = FastAPI(title="KB's Cake Studio API")
+
+_RESPONSE_CACHE = {}
+_key_locks = {}
+_cache_lock = threading.Lock()
+_last_refresh = [0.0]
+
+
+class BatchRequest(BaseModel):
+    cakes: Dict[int, float]
+
+
+def _cached(key, loader):
+    """(body, etag) for `key`, built by `loader` at most once per API_CACHE_SECONDS.
+
+    Concurrent requests for an expired key wait on that key's lock while one of them rebuilds it,
+    instead of each running the loader. A 404 raised by the loader is cached like a body.
+    """
+    hit = _fresh(key)
+    if hit is None:
+        with _cache_lock:
+            key_lock = _key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            hit = _fresh(key)
+            if hit is None:
+                _refresh_shared_caches()
+                try:
+                    body = json.dumps(loader(), default=str, separators=(',', ':')).encode()
+                    hit = ((body, '"' + hashlib.sha1(body).hexdigest() + '"'), None)
+                except HTTPException as exc:
+                    if exc.status_code != 404:
+                        raise
+                    hit = (None, (exc.status_code, exc.detail))
+                with _cache_lock:
+                    _RESPONSE_CACHE[key] = (time.monotonic() + API_CACHE_SECONDS, hit)
+    response, error = hit
+    if error:
+        raise HTTPException(status_code=error[0], detail=error[1])
+    return response
+
+
+def _fresh(key):
+    with _cache_lock:
+        entry = _RESPONSE_CACHE.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _refresh_shared_caches():
+    # Recipe and transfer edits are made in the Streamlit process, and its invalidations never
+    # reach this one, so the recipe index and transfer frames are dropped once per cache period.
+    # Expired responses (and the idle locks of their keys) are pruned at the same time, so
+    # requests for ids that do not exist cannot grow the cache beyond one period's worth
+    now = time.monotonic()
+    with _cache_lock:
+        if now - _last_refresh[0] < API_CACHE_SECONDS:
+            return
+        _last_refresh[0] = now
+        for key in [key for key, (expires, _) in _RESPONSE_CACHE.items() if expires <= now]:
+            del _RESPONSE_CACHE[key]
+            if key in _key_locks and not _key_locks[key].locked():
+                del _key_locks[key]
+    invalidate_recipe_index()
+    invalidate_transfer_reports()
+
+
+def _json(request, key, loader):
+    """Cached JSON response for a GET, answering 304 when the client already has this version.
+
+    `key` names the endpoint and the parameters it accepts, so unknown query parameters or
+    different spellings of the same id share one entry.
+    """
+    body, etag = _cached(key, loader)
+    headers = {'ETag': etag, 'Cache-Control': f'max-age={API_CACHE_SECONDS}'}
+    if etag in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+def _recipe_query(func):
+    conn = get_pooled_connection()
+    try:
+        return func(conn)
+    finally:
+        conn.close()
+
+
+def _stock_query(func):
+    # sqlite3 connections cannot be shared across the worker threads, so each request opens its own
+    conn = get_sqlite_connection()
+    try:
+        return func(conn)
+    finally:
+        conn.close()
+
+
+def _cake_costs(conn, cake_ids=None):
+    index = get_recipe_index(conn)
+    return [
+        {
+            'id': cake_id,
+            'name': index['cake_names'][cake_id],
+            'percent_yield': index['cake_yields'].get(cake_id, 0.0),
+            'cost_before_yield': round(cost, 4),
+            'cost': round(cost * (1 + index['cake_yields'].get(cake_id, 0.0) / 100), 4),
+        }
+        for cake_id, cost in all_cake_costs(conn, cake_ids).items()
+        if cake_id in index['cake_names']
+    ]
+
+
+@app.get('/health')
+def health():
+    return {'status': 'ok'}
+
+
+@app.get('/cakes/costs')
+def cake_costs(request: Request):
+    return _json(request, ('cake_costs',), lambda: _recipe_query(_cake_costs))
+
+
+@app.get('/cakes/{cake_id}/cost')
+def cake_cost(cake_id: int, request: Request):
+    def load():
+        rows = _recipe_query(lambda conn: _cake_costs(conn, [cake_id]))
+        if not rows:
+            raise HTTPException(status_code=404, detail=f'Cake {cake_id} not found')
+        return rows[0]
+    return _json(request, ('cake_cost', cake_id), load)
+
+
+@app.post('/batch')
+def batch_requirements(batch: BatchRequest):
+    totals, _, subrecipes = _recipe_query(lambda conn: calculate_batch(conn, batch.cakes))
+    return {
+        'ingredients': [
+            {'id': row['id'], 'name': name, 'quantity': round(row['quantity'], 5), 'unit': row['unit'],
+             'cost': round(row['cost'], 2)}
+            for name, row in totals.items()
+        ],
+        'sub_recipes': [
+            {'name': name, 'quantity': round(row['quantity'], 5), 'unit_cost': round(row['unit_cost'], 2)}
+            for name, row in subrecipes.items()
+        ],
+        'total_cost': round(sum(row['cost'] for row in totals.values()), 2),
+    }
+
+
+@app.get('/warehouses')
+def warehouses(request: Request):
+    def load(conn):
+        c = conn.cursor()
+        c.execute('SELECT id, name FROM warehouses ORDER BY name')
+        return [{'id': wid, 'name': name} for wid, name in c.fetchall()]
+    return _json(request, ('warehouses',), lambda: _stock_query(load))
+
+
+@app.get('/warehouses/{warehouse_id}/stock')
+def warehouse_stock(warehouse_id: int, request: Request):
+    def load(conn):
+        return [{'ingredient_id': ing_id, 'ingredient': name, 'quantity': qty}
+                for ing_id, name, qty in iter_stock_levels(conn, warehouse_id)]
+    return _json(request, ('warehouse_stock', warehouse_id), lambda: _stock_query(load))
+
+
+@app.get('/transfers')
+def transfers(request: Request, status: Optional[str] = None):
+    def load(conn):
+        df = transfer_orders_frame(conn)
+        if status:
+            df = df[df['status'] == status]
+        return df.to_dict(orient='records')
+    return _json(request, ('transfers', status), lambda: _stock_query(load))
+
+
+@app.get('/transfers/{order_id}/items')
+def transfer_items(order_id: int, request: Request):
+    return _json(request, ('transfer_items', order_id),
+                 lambda: _stock_query(lambda conn: order_items_frame(conn, order_id).to_dict(orient='records')))
@@ -0,0 +1,110 @@
+import random
+
+import streamlit as st
+
+from config import DEV_MODE, QUERY_STATS_LOG, QUERY_BUDGETS, DEFAULT_QUERY_BUDGET, TRACE_MEMORY, METRICS_SAMPLE_RATE
+from db import get_sqlite_connection
+from utils.profiling import profile_call, queue_metrics, flush_metrics
+from utils.query_stats import start_run, finish_run, write_log
+
+from Add_Items import add_cake, add_sub_recipe, add_ingredient
+from Manage_Items import manage_sub_recipes, manage_cakes, manage_ingredients
+from Quick_add import quick_add_cake, quick_add_sub_recipe, bulk_import_recipes
+from Add_stock import update_stock
+from view_cakes import view_costs, view_all_cakes, price_simulation
+from Batch import batch_production
+from Warehouse_functions import create_transfer_order_page, receive_transfer_order_page, manage_categories, auto_replenishment_page, kitchen_production_page, demand_forecast_page
+from Warehouse_Reports import view_warehouse, transfer_dashboard_page, transfer_visual_dashboard_page, transfer_order_history_page, stock_report, stock_matrix_page, waste_analytics_page, performance_page
+
+# Navigation label -> page function, shared by every entry point (warehouse.py, warehouselogin.py)
+PAGES = {
+    'Quick Add Cake': quick_add_cake,
+    'Add Ingredient': add_ingredient,
+    'Add Sub-Recipe': add_sub_recipe,
+    'Quick Add Sub-Recipe': quick_add_sub_recipe,
+    'Bulk Import Recipes': bulk_import_recipes,
+    'Add Cake': add_cake,
+    'View Costs': view_costs,
+    'Price Simulation': price_simulation,
+    'Batch Production': batch_production,
+    'Manage Ingredients': manage_ingredients,
+    'Manage Sub-Recipes': manage_sub_recipes,
+    'Manage Cakes': manage_cakes,
+    'Cake Report': view_all_cakes,
+    'Warehouse Overview': view_warehouse,
+    'Manage Categories': manage_categories,
+    'Update Stock': update_stock,
+    'Stock Report': stock_report,
+    'Stock Matrix': stock_matrix_page,
+    'Transfer Orders': create_transfer_order_page,
+    'Auto Replenishment': auto_replenishment_page,
+    'Demand Forecast': demand_forecast_page,
+    'Receive Transfers': receive_transfer_order_page,
+    'Transfer History': transfer_order_history_page,
+    'Transfer Dashboard': transfer_dashboard_page,
+    'Transfer Charts': transfer_visual_dashboard_page,
+    'Waste Analytics': waste_analytics_page,
+    'Kitchen Production': kitchen_production_page,
+}
+
+# Pages only offered to admins by warehouselogin.py
+ADMIN_PAGES = {
+    'Performance': performance_page,
+}
+
+
+def render_page(choice):
+    cprofile = DEV_MODE and st.sidebar.checkbox("🔬 Profile this run (cProfile)", key="profile_run")
+    # Only a sample of reruns pays for the stack sampler, memory tracing and the metrics row
+    measured = cprofile or random.random() < METRICS_SAMPLE_RATE
+    metrics = profile_text = None
+    start_run(choice)
+    try:
+        if measured:
+            metrics, profile_text = profile_call(lambda: _render(choice), trace_memory=TRACE_MEMORY, cprofile=cprofile)
+        else:
+            _render(choice)
+    finally:
+        summary = finish_run()
+        summary['budget'] = QUERY_BUDGETS.get(choice, DEFAULT_QUERY_BUDGET)
+        # Budget overruns are logged even outside developer mode so they show up from real use
+        if DEV_MODE or summary['queries'] > summary['budget']:
+            write_log(QUERY_STATS_LOG, summary)
+
+    # Reruns triggered from inside a page (st.rerun, st.stop) raise through here and are not recorded
+    if metrics is not None:
+        metrics.update(db_ms=summary['query_time_ms'], queries=summary['queries'])
+        if queue_metrics(choice, metrics):
+            conn = get_sqlite_connection()
+            flush_metrics(conn)
+            conn.close()
+
+    if DEV_MODE:
+        query_stats_panel(summary)
+    if profile_text:
+        with st.sidebar.expander("🔬 cProfile (top 30 by cumulative time)", expanded=True):
+            st.code(profile_text)
+
+
+def query_stats_panel(summary):
+    if summary['queries'] > summary['budget']:
+        st.sidebar.warning(f"⚠️ {summary['page']} ran {summary['queries']} queries (budget {summary['budget']})")
+    with st.sidebar.expander(f"🛠️ Queries: {summary['queries']} in {summary['query_time_ms']:.0f} ms", expanded=False):
+        st.caption(f"Page run: {summary['run_time_ms']:.0f} ms")
+        if summary['n_plus_one']:
+            st.markdown("**Repeated statements (likely N+1)**")
+            for row in summary['n_plus_one']:
+                st.code(f"×{row['count']}  {row['sql']}", language='sql')
+        st.markdown("**Slowest statements**")
+        for row in summary['slowest']:
+            st.code(f"{row['ms']:.1f} ms  {row['sql']}", language='sql')
+
+
+def _render(choice):
+    # The Cake Report's Edit button hands over to the cake editor on the next run
+    if "edit_cake_id" in st.session_state:
+        cake_id = st.session_state.edit_cake_id
+        del st.session_state.edit_cake_id
+        add_cake(cake_id)
+        return
+    PAGES.get(choice, ADMIN_PAGES.get(choice))()
@@ -0,0 +1,165 @@
+"""Time the costing, batch, stock and reporting hot paths against a synthetic catalogue.
+
+    python -m benchmarks.run --size medium
+    python -m benchmarks.run --size large --mysql-database bakery_bench
+
+Each run appends one JSON line per case to benchmarks/results.jsonl, tagged with the git commit,
+and is compared with the latest result recorded for a different commit.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+from benchmarks.synthetic import SIZES, generate_catalogue
+from utils.batch_helpers import resolve_subrecipe_ingredients_detailed, calculate_batch
+from utils.cost_index import invalidate_recipe_index
+from utils.costing import all_cake_costs
+from utils.recipe_graph import load_recipe_graph
+from utils.reports import invalidate_transfer_reports, transfer_items_frame, transfer_summaries
+from utils.stock import set_stock_levels
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results.jsonl')
+
+
+def _resolve_all_subrecipes(conn):
+    graph = load_recipe_graph(conn)
+    for sub_id in graph['order']:
+        resolve_subrecipe_ingredients_detailed(conn, sub_id, graph=graph)
+
+
+def _batch_all_cakes(conn):
+    c = conn.cursor()
+    c.execute('SELECT id FROM cakes')
+    calculate_batch(conn, {cake_id: 10 for cake_id, in c.fetchall()})
+
+
+def _cake_costs_cold(conn):
+    invalidate_recipe_index()
+    all_cake_costs(conn)
+
+
+def _cake_costs_warm(conn):
+    all_cake_costs(conn)
+
+
+def _stock_upload(conn):
+    c = conn.cursor()
+    c.execute('SELECT ingredient_id, quantity FROM warehouse_stock WHERE warehouse_id = 1')
+    set_stock_levels(conn, 1, {ing_id: float(qty) + 1 for ing_id, qty in c.fetchall()}, 'Benchmark Upload')
+    conn.rollback()
+
+
+def _transfer_dashboard(conn):
+    invalidate_transfer_reports()
+    transfer_summaries(transfer_items_frame(conn))
+
+
+CASES = {
+    'resolve_subrecipe_ingredients_detailed': _resolve_all_subrecipes,
+    'batch_production': _batch_all_cakes,
+    'view_all_cakes_cold': _cake_costs_cold,
+    'view_all_cakes_warm': _cake_costs_warm,
+    'stock_upload': _stock_upload,
+    'transfer_dashboard': _transfer_dashboard,
+}
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def time_case(func, conn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(conn)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def load_results():
+    if not os.path.exists(RESULTS_PATH):
+        return []
+    with open(RESULTS_PATH) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_result(history, record):
+    for old in reversed(history):
+        if (old['commit'] != record['commit'] and old['backend'] == record['backend']
+                and old['size'] == record['size'] and old['case'] == record['case']):
+            return old
+    return None
+
+
+def connect(args):
+    if not args.mysql_database:
+        return sqlite3.connect(args.sqlite_path)
+    if args.mysql_database == os.getenv('DB_NAME', 'bakery_db'):
+        raise SystemExit('Refusing to benchmark against the application database; use a scratch database.')
+    os.environ['DB_NAME'] = args.mysql_database
+    from db import get_connection
+    return get_connection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help='Run only these cases (repeatable)')
+    parser.add_argument('--sqlite-path', default=os.path.join(os.path.dirname(__file__), 'bench.db'))
+    parser.add_argument('--mysql-database', help='Scratch MySQL database to benchmark instead of SQLite (tables are recreated)')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Slowdown ratio reported as a regression')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args(argv)
+
+    conn = connect(args)
+    backend = 'mysql' if args.mysql_database else 'sqlite'
+    start = time.perf_counter()
+    counts = generate_catalogue(conn, **SIZES[args.size])
+    print(f"Generated {args.size} catalogue on {backend} in {time.perf_counter() - start:.1f}s: {counts}")
+
+    commit, dirty = git_commit()
+    history = load_results()
+    records, regressions = [], []
+    for name in args.case or CASES:
+        timings = time_case(CASES[name], conn, args.repeat)
+        record = {
+            'commit': commit, 'dirty': dirty, 'run_at': datetime.now().isoformat(timespec='seconds'),
+            'backend': backend, 'size': args.size, 'case': name,
+            'median_s': statistics.median(timings), 'min_s': min(timings), 'repeat': args.repeat,
+        }
+        records.append(record)
+
+        previous = previous_result(history, record)
+        change = ''
+        if previous and previous['median_s']:
+            ratio = record['median_s'] / previous['median_s']
+            change = f"  ({ratio:.2f}x vs {previous['commit']})"
+            if ratio > args.threshold:
+                regressions.append(name)
+        print(f"{name:<42} median {record['median_s'] * 1000:9.1f} ms   min {record['min_s'] * 1000:9.1f} ms{change}")
+    conn.close()
+
+    if not args.no_save:
+        with open(RESULTS_PATH, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+    if regressions:
+        print(f"Regressions over {args.threshold:.2f}x: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+from utils.sql import is_sqlite
+
+# Tables the benchmarks touch, in a dialect-neutral form rendered by create_schema().
+# 'pk' is an auto-increment id, 'name' a unique label.
+TABLES = {
+    'ingredients': [('id', 'pk'), ('name', 'name'), ('price_per_unit', 'real'), ('unit', 'text')],
+    'sub_recipes': [('id', 'pk'), ('name', 'name')],
+    'sub_recipe_ingredients': [('id', 'pk'), ('sub_recipe_id', 'int'), ('ingredient_id', 'int'), ('quantity', 'real')],
+    'sub_recipe_nested': [('id', 'pk'), ('parent_sub_recipe_id', 'int'), ('sub_recipe_id', 'int'), ('quantity', 'real')],
+    'cakes': [('id', 'pk'), ('name', 'name'), ('percent_yield', 'real')],
+    'cake_ingredients': [('id', 'pk'), ('cake_id', 'int'), ('ingredient_or_subrecipe_id', 'int'),
+                         ('is_subrecipe', 'int'), ('quantity', 'real')],
+    'cake_components': [('id', 'pk'), ('cake_id', 'int'), ('component_cake_id', 'int'), ('quantity', 'real')],
+    'inventory_categories': [('id', 'pk'), ('name', 'name')],
+    'warehouse': [('ingredient_id', 'int'), ('quantity', 'real'), ('last_updated', 'text'),
+                  ('category_id', 'int'), ('par_level', 'real')],
+    'warehouses': [('id', 'pk'), ('name', 'name')],
+    'warehouse_stock': [('warehouse_id', 'int'), ('ingredient_id', 'int'), ('quantity', 'real'), ('par_level', 'real')],
+    'stock_movements': [('id', 'pk'), ('ingredient_id', 'int'), ('warehouse_id', 'int'), ('change', 'real'),
+                        ('reason', 'text'), ('timestamp', 'text')],
+    'transfer_orders': [('id', 'pk'), ('source_warehouse_id', 'int'), ('target_warehouse_id', 'int'),
+                        ('status', 'text'), ('created_at', 'text')],
+    'transfer_order_items': [('id', 'pk'), ('transfer_order_id', 'int'), ('ingredient_id', 'int'), ('quantity', 'real'),
+                             ('accepted_qty', 'real'), ('returned_qty', 'real'), ('wasted_qty', 'real')],
+}
+
+PRIMARY_KEYS = {
+    'warehouse': ('ingredient_id',),
+    'warehouse_stock': ('warehouse_id', 'ingredient_id'),
+}
+
+INDEXES = [
+    ('sub_recipe_ingredients', 'sub_recipe_id'),
+    ('sub_recipe_nested', 'parent_sub_recipe_id'),
+    ('cake_ingredients', 'cake_id'),
+    ('cake_components', 'cake_id'),
+    ('transfer_order_items', 'transfer_order_id'),
+    ('stock_movements', 'ingredient_id'),
+]
+
+_TYPES = {
+    'sqlite': {'pk': 'INTEGER PRIMARY KEY AUTOINCREMENT', 'int': 'INTEGER', 'real': 'REAL',
+               'text': 'TEXT', 'name': 'TEXT UNIQUE'},
+    'mysql': {'pk': 'INT AUTO_INCREMENT PRIMARY KEY', 'int': 'INT', 'real': 'DECIMAL(16,6)',
+              'text': 'VARCHAR(255)', 'name': 'VARCHAR(255) UNIQUE'},
+}
+
+
+def create_schema(conn):
+    """Drop and recreate the benchmark tables. Only ever point this at a scratch database."""
+    dialect = 'sqlite' if is_sqlite(conn) else 'mysql'
+    quote = (lambda col: f'"{col}"') if dialect == 'sqlite' else (lambda col: f'`{col}`')
+    c = conn.cursor()
+    for table, columns in TABLES.items():
+        c.execute(f'DROP TABLE IF EXISTS {table}')
+        defs = [f'{quote(col)} {_TYPES[dialect][kind]}' for col, kind in columns]
+        if table in PRIMARY_KEYS:
+            defs.append(f"PRIMARY KEY ({', '.join(PRIMARY_KEYS[table])})")
+        c.execute(f"CREATE TABLE {table} ({', '.join(defs)})")
+    for table, column in INDEXES:
+        c.execute(f'CREATE INDEX idx_{table}_{column} ON {table} ({column})')
+    c.execute('DROP TABLE IF EXISTS low_stock_alerts')
+    conn.commit()
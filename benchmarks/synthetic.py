@@ -0,0 +1,105 @@
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.schema import create_schema
+from utils.sql import is_sqlite, placeholders
+from utils.stock import ensure_stock_schema
+
+# Catalogue sizes for --size; depth is the number of sub-recipe nesting levels
+SIZES = {
+    'small': dict(ingredients=100, sub_recipes=70, depth=2, cakes=40, warehouses=2, years=1, orders_per_day=2),
+    'medium': dict(ingredients=1000, sub_recipes=600, depth=4, cakes=400, warehouses=4, years=2, orders_per_day=5),
+    'large': dict(ingredients=5000, sub_recipes=3000, depth=6, cakes=2000, warehouses=8, years=3, orders_per_day=10),
+}
+
+UNITS = ['kilo', 'liter', 'piece', 'gram']
+CATEGORIES = ['Dairy', 'Dry Goods', 'Fruit', 'Chocolate', 'Packaging', 'Nuts']
+
+
+def _insert(conn, table, columns, rows, chunk=5000):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders(conn, len(columns))})"
+    c = conn.cursor()
+    for start in range(0, len(rows), chunk):
+        c.executemany(sql, rows[start:start + chunk])
+
+
+def generate_catalogue(conn, ingredients, sub_recipes, depth, cakes, warehouses, years, orders_per_day, seed=42):
+    """Fill a scratch database with a synthetic catalogue, stock and transfer history.
+
+    Sub-recipes are split into `depth` levels and only nest sub-recipes from the level below,
+    so the recipe graph is acyclic and exactly `depth` levels deep. Ids are assigned sequentially
+    from 1, which the generator relies on instead of reading them back.
+    """
+    rng = random.Random(seed)
+    create_schema(conn)
+
+    _insert(conn, 'inventory_categories', ['name'], [(name,) for name in CATEGORIES])
+    _insert(conn, 'ingredients', ['name', 'price_per_unit', 'unit'],
+            [(f'Ingredient {i:05d}', round(rng.uniform(1, 500), 2), rng.choice(UNITS)) for i in range(1, ingredients + 1)])
+    ingredient_ids = range(1, ingredients + 1)
+
+    _insert(conn, 'sub_recipes', ['name'], [(f'Sub-Recipe {s:05d}',) for s in range(1, sub_recipes + 1)])
+    levels = [list(range(1 + level, sub_recipes + 1, depth)) for level in range(depth)]
+    sub_lines, nested = [], []
+    for level, subs in enumerate(levels):
+        for sub_id in subs:
+            sub_lines.extend((sub_id, ing_id, round(rng.uniform(0.05, 3), 3))
+                             for ing_id in rng.sample(ingredient_ids, rng.randint(3, 8)))
+            if level and levels[level - 1]:
+                nested.extend((sub_id, child, round(rng.uniform(0.1, 2), 3))
+                              for child in rng.sample(levels[level - 1], min(2, len(levels[level - 1]))))
+    _insert(conn, 'sub_recipe_ingredients', ['sub_recipe_id', 'ingredient_id', 'quantity'], sub_lines)
+    _insert(conn, 'sub_recipe_nested', ['parent_sub_recipe_id', 'sub_recipe_id', 'quantity'], nested)
+
+    _insert(conn, 'cakes', ['name', 'percent_yield'],
+            [(f'Cake {k:05d}', round(rng.uniform(0, 15), 2)) for k in range(1, cakes + 1)])
+    cake_lines = []
+    for cake_id in range(1, cakes + 1):
+        cake_lines.extend((cake_id, ing_id, 0, round(rng.uniform(0.01, 0.5), 4))
+                          for ing_id in rng.sample(ingredient_ids, rng.randint(2, 6)))
+        cake_lines.extend((cake_id, sub_id, 1, round(rng.uniform(0.1, 1.5), 4))
+                          for sub_id in rng.sample(range(1, sub_recipes + 1), rng.randint(1, 4)))
+    _insert(conn, 'cake_ingredients', ['cake_id', 'ingredient_or_subrecipe_id', 'is_subrecipe', 'quantity'], cake_lines)
+    # Every tenth cake uses an earlier cake whole, which keeps the cake graph acyclic
+    _insert(conn, 'cake_components', ['cake_id', 'component_cake_id', 'quantity'],
+            [(cake_id, rng.randint(1, cake_id - 1), round(rng.uniform(0.1, 1), 3)) for cake_id in range(11, cakes + 1, 10)])
+
+    now = datetime.now()
+    stamp = now.strftime('%Y-%m-%d %H:%M:%S')
+    _insert(conn, 'warehouse', ['ingredient_id', 'quantity', 'last_updated', 'category_id', 'par_level'],
+            [(i, round(rng.uniform(0, 100), 2), stamp, rng.randint(1, len(CATEGORIES)), round(rng.uniform(5, 50), 2))
+             for i in ingredient_ids])
+    _insert(conn, 'warehouses', ['name'], [('Kitchen',)] + [(f'Store {w}',) for w in range(2, warehouses + 1)])
+    _insert(conn, 'warehouse_stock', ['warehouse_id', 'ingredient_id', 'quantity', 'par_level'],
+            [(w, i, round(rng.uniform(0, 200), 2), round(rng.uniform(5, 50), 2) if w == 1 else None)
+             for w in range(1, warehouses + 1) for i in ingredient_ids])
+
+    # Daily history: transfers from the stores into the kitchen and the matching stock movements
+    orders, items, movements = [], [], []
+    order_id = 0
+    start = now - timedelta(days=365 * years)
+    for day in range(365 * years):
+        day_stamp = (start + timedelta(days=day)).strftime('%Y-%m-%d %H:%M:%S')
+        for _ in range(orders_per_day if warehouses > 1 else 0):
+            order_id += 1
+            source = rng.randint(2, warehouses)
+            orders.append((source, 1, 'Received', day_stamp))
+            for ing_id in rng.sample(ingredient_ids, rng.randint(3, 10)):
+                sent = round(rng.uniform(1, 20), 2)
+                wasted = round(sent * rng.choice([0, 0, 0, 0.05]), 2)
+                items.append((order_id, ing_id, sent, sent - wasted, 0, wasted))
+                movements.append((ing_id, source, -sent, f'Transfer #{order_id} out', day_stamp))
+                movements.append((ing_id, 1, sent - wasted, f'Transfer #{order_id} in', day_stamp))
+    _insert(conn, 'transfer_orders', ['source_warehouse_id', 'target_warehouse_id', 'status', 'created_at'], orders)
+    _insert(conn, 'transfer_order_items',
+            ['transfer_order_id', 'ingredient_id', 'quantity', 'accepted_qty', 'returned_qty', 'wasted_qty'], items)
+    change = '"change"' if is_sqlite(conn) else '`change`'
+    _insert(conn, 'stock_movements', ['ingredient_id', 'warehouse_id', change, 'reason', 'timestamp'], movements)
+
+    conn.commit()
+    ensure_stock_schema(conn)
+    return {
+        'ingredients': ingredients, 'sub_recipes': sub_recipes, 'depth': depth, 'cakes': cakes,
+        'warehouses': warehouses, 'transfer_orders': len(orders), 'transfer_lines': len(items),
+        'stock_movements': len(movements),
+    }
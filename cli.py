@@ -0,0 +1,228 @@
+"""Headless access to costing, batch planning, stock and transfer jobs, for cron and scripts.
+
+    python cli.py cost-all --output costs.csv
+    python cli.py batch-plan plan.xlsx --workers 4
+    python cli.py stock-import counts.xlsx --warehouse Kitchen
+    python cli.py stock-export --warehouse Kitchen > kitchen.csv
+    python cli.py transfer-rollup --since 2026-01-01
+    python cli.py migrate
+
+Recipe commands read MySQL like the costing pages (--sqlite switches to config.DB_PATH); stock
+and transfer commands read the SQLite warehouse database like the warehouse pages. Results are
+written as CSV rows as they are produced.
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+
+from db import get_connection, get_sqlite_connection
+from utils.batch_helpers import calculate_batch, parse_batch_plan
+from utils.costing import all_cake_costs
+from utils.cost_index import get_recipe_index
+from utils.reports import transfer_items_frame, transfer_summaries
+from utils.stock import ensure_stock_schema, iter_stock_levels, parse_stock_upload, set_stock_levels
+
+# Plans with fewer cakes than this are costed in-process; worker start-up costs more than it saves
+PARALLEL_MIN_CAKES = 200
+
+
+def _connect(use_sqlite):
+    conn = get_sqlite_connection() if use_sqlite else get_connection()
+    if conn is None:
+        raise SystemExit('Could not connect to the database.')
+    return conn
+
+
+def _read_table(path):
+    return pd.read_csv(path) if path.lower().endswith('.csv') else pd.read_excel(path)
+
+
+@contextmanager
+def _writer(args):
+    """CSV writer on --output, closed on exit, or on stdout, flushed on exit."""
+    if not args.output:
+        yield csv.writer(sys.stdout)
+        sys.stdout.flush()
+        return
+    with open(args.output, 'w', newline='') as out:
+        yield csv.writer(out)
+
+
+def _warehouse_id(conn, name):
+    c = conn.cursor()
+    c.execute('SELECT id FROM warehouses WHERE name = ?', (name,))
+    row = c.fetchone()
+    if row is None:
+        raise SystemExit(f"Unknown warehouse '{name}'.")
+    return row[0]
+
+
+def cost_all(args):
+    conn = _connect(args.sqlite)
+    index = get_recipe_index(conn)
+    costs = all_cake_costs(conn)
+    conn.close()
+
+    with _writer(args) as writer:
+        writer.writerow(['cake_id', 'cake', 'cost_before_yield', 'percent_yield', 'cost'])
+        for cake_id, cost in costs.items():
+            percent_yield = index['cake_yields'].get(cake_id, 0.0)
+            writer.writerow([cake_id, index['cake_names'][cake_id], round(cost, 4), percent_yield,
+                             round(cost * (1 + percent_yield / 100), 4)])
+
+
+def _batch_chunk(use_sqlite, cake_quantities):
+    # Runs in a worker process: connections cannot cross processes, so each opens its own
+    conn = _connect(use_sqlite)
+    try:
+        return calculate_batch(conn, cake_quantities)[0]
+    finally:
+        conn.close()
+
+
+def _merge_totals(parts):
+    totals = {}
+    for part in parts:
+        for name, row in part.items():
+            if name in totals:
+                totals[name]['quantity'] += row['quantity']
+                totals[name]['cost'] += row['cost']
+            else:
+                totals[name] = dict(row)
+    return totals
+
+
+def batch_plan(args):
+    conn = _connect(args.sqlite)
+    c = conn.cursor()
+    c.execute('SELECT id, name FROM cakes')
+    cake_quantities, unknown = parse_batch_plan(_read_table(args.plan), {name: cake_id for cake_id, name in c.fetchall()})
+    for name in unknown:
+        print(f"warning: cake '{name}' not found", file=sys.stderr)
+
+    items = list(cake_quantities.items())
+    if args.workers > 1 and len(items) >= PARALLEL_MIN_CAKES:
+        conn.close()
+        chunks = [dict(items[i::args.workers]) for i in range(args.workers)]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            totals = _merge_totals(pool.map(_batch_chunk, [args.sqlite] * len(chunks), chunks))
+    else:
+        totals = calculate_batch(conn, cake_quantities)[0]
+        conn.close()
+
+    with _writer(args) as writer:
+        writer.writerow(['ingredient_id', 'ingredient', 'quantity', 'unit', 'cost'])
+        for name, row in sorted(totals.items()):
+            writer.writerow([row['id'], name, round(row['quantity'], 5), row['unit'], round(row['cost'], 2)])
+        writer.writerow(['', 'Total Batch Cost', '', '', round(sum(row['cost'] for row in totals.values()), 2)])
+
+
+def stock_import(args):
+    conn = _connect(True)
+    ensure_stock_schema(conn)
+    warehouse_id = _warehouse_id(conn, args.warehouse)
+    try:
+        levels, skipped = parse_stock_upload(_read_table(args.file))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if skipped:
+        print(f"warning: skipped {skipped} row(s) with a missing or non-numeric ingredient_id/quantity", file=sys.stderr)
+    changed = set_stock_levels(conn, warehouse_id, levels, args.reason)
+    if args.dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    conn.close()
+    print(f"{'Would change' if args.dry_run else 'Changed'} {changed} of {len(levels)} stock level(s) in {args.warehouse}.")
+
+
+def stock_export(args):
+    conn = _connect(True)
+    with _writer(args) as writer:
+        writer.writerow(['ingredient_id', 'ingredient_name', 'quantity'])
+        writer.writerows(iter_stock_levels(conn, _warehouse_id(conn, args.warehouse)))
+    conn.close()
+
+
+def transfer_rollup(args):
+    conn = _connect(True)
+    items = transfer_items_frame(conn)
+    conn.close()
+    if args.since:
+        items = items[items['created_at'] >= pd.Timestamp(args.since)]
+    if args.until:
+        items = items[items['created_at'] < pd.Timestamp(args.until)]
+    if args.status:
+        items = items[items['status'] == args.status]
+
+    by_ingredient, by_warehouse = transfer_summaries(items)
+    with _writer(args) as writer:
+        frame = by_warehouse if args.by == 'warehouse' else by_ingredient
+        writer.writerow([frame.index.name or args.by] + list(frame.columns))
+        for key, row in zip(frame.index, frame.itertuples(index=False)):
+            writer.writerow([key] + [round(value, 5) for value in row])
+
+
+def migrate(args):
+    # Imported here so the other commands do not need the MySQL migration settings
+    from migrate_sqlite_to_mysql import TABLES, migrate_table
+    for table in args.table or TABLES:
+        migrate_table(table)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cake-warehouse', description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('cost-all', help='Cost every cake, before and after yield')
+    p.add_argument('--sqlite', action='store_true', help='Read recipes from the SQLite database instead of MySQL')
+    p.add_argument('--output', help='CSV file to write (default: stdout)')
+    p.set_defaults(func=cost_all)
+
+    p = sub.add_parser('batch-plan', help="Ingredient totals for a plan (xlsx/csv with 'Cake Name' and 'Quantity')")
+    p.add_argument('plan')
+    p.add_argument('--sqlite', action='store_true', help='Read recipes from the SQLite database instead of MySQL')
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                   help=f'Worker processes for plans of {PARALLEL_MIN_CAKES}+ cakes')
+    p.add_argument('--output', help='CSV file to write (default: stdout)')
+    p.set_defaults(func=batch_plan)
+
+    p = sub.add_parser('stock-import', help='Set stock levels from a count (xlsx/csv with ingredient_id and quantity)')
+    p.add_argument('file')
+    p.add_argument('--warehouse', required=True)
+    p.add_argument('--reason', default='CLI Import')
+    p.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+    p.set_defaults(func=stock_import)
+
+    p = sub.add_parser('stock-export', help='Current stock of every ingredient in a warehouse')
+    p.add_argument('--warehouse', required=True)
+    p.add_argument('--output', help='CSV file to write (default: stdout)')
+    p.set_defaults(func=stock_export)
+
+    p = sub.add_parser('transfer-rollup', help='Transfer totals per ingredient or per warehouse')
+    p.add_argument('--by', choices=['ingredient', 'warehouse'], default='ingredient')
+    p.add_argument('--since', help='Only orders created on or after this date')
+    p.add_argument('--until', help='Only orders created before this date')
+    p.add_argument('--status', help='Only orders with this status, e.g. Received')
+    p.add_argument('--output', help='CSV file to write (default: stdout)')
+    p.set_defaults(func=transfer_rollup)
+
+    p = sub.add_parser('migrate', help='Copy the SQLite tables into MySQL (migrate_sqlite_to_mysql)')
+    p.add_argument('--table', action='append', help='Only migrate these tables (repeatable)')
+    p.set_defaults(func=migrate)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
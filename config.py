@@ -1,2 +1,29 @@
 # config.py
+import os
+
 DB_PATH = 'bakery.db'
+
+# Developer query instrumentation: sidebar panel + JSON log of per-rerun query stats
+DEV_MODE = os.getenv('CAKE_DEV_MODE', '0') == '1'
+QUERY_STATS_LOG = os.getenv('QUERY_STATS_LOG', 'query_stats.jsonl')
+# Peak memory per page run via tracemalloc; it slows allocations, so it follows dev mode by default
+TRACE_MEMORY = os.getenv('CAKE_TRACE_MEMORY', '1' if DEV_MODE else '0') == '1'
+# Fraction of page reruns that are measured (pandas stack sampler, memory tracing, page_metrics row);
+# the rest only pay for query counting
+METRICS_SAMPLE_RATE = float(os.getenv('CAKE_METRICS_SAMPLE_RATE', '1' if DEV_MODE else '0.05'))
+
+# Max queries per page rerun before a warning is shown; pages not listed use the default
+DEFAULT_QUERY_BUDGET = 50
+QUERY_BUDGETS = {
+    'Cake Report': 10,
+    'View Costs': 10,
+    'Batch Production': 20,
+    'Warehouse Overview': 10,
+    'Stock Matrix': 10,
+    'Transfer Dashboard': 5,
+    'Transfer Charts': 5,
+    'Waste Analytics': 10,
+}
+
+# JSON API (api.py): seconds a GET response is reused before the database is read again
+API_CACHE_SECONDS = int(os.getenv('CAKE_API_CACHE_SECONDS', '5'))
@@ -1,30 +1,54 @@
+import sqlite3
+
 import mysql.connector
+from mysql.connector import pooling
 from dotenv import load_dotenv
 import os
 import streamlit as st
 
+from config import DB_PATH
+from utils.query_stats import InstrumentedSqliteConnection, instrument
+
 # Load environment variables from .env file
 load_dotenv()
 
 
+_POOL = None
+
+
+def _connection_settings():
+    # Default values if environment variables are not set
+    return dict(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "3306")),
+        user=os.getenv("DB_USER", "root"),
+        password=os.getenv("DB_PASSWORD", ""),
+        database=os.getenv("DB_NAME", "bakery_db"),
+    )
+
+
 def get_connection():
     try:
-        # Default values if environment variables are not set
-        host = os.getenv("DB_HOST", "localhost")
-        port = int(os.getenv("DB_PORT", "3306"))
-        user = os.getenv("DB_USER", "root")
-        password = os.getenv("DB_PASSWORD", "")
-        database = os.getenv("DB_NAME", "bakery_db")
-        
         # Create connection
-        return mysql.connector.connect(
-            host=host,
-            port=port,
-            user=user,
-            password=password,
-            database=database
-        )
+        return instrument(mysql.connector.connect(**_connection_settings()))
     except mysql.connector.Error as err:
         st.error(f"❌ DB Connection failed: {err}")
         return None
 
+
+def get_sqlite_connection():
+    return sqlite3.connect(DB_PATH, factory=InstrumentedSqliteConnection)
+
+
+def get_pooled_connection():
+    """MySQL connection from a process-wide pool (size DB_POOL_SIZE); close() hands it back.
+
+    For long-running services such as api.py that open a connection per request. Streamlit pages
+    keep using get_connection(), since a page that returns early without closing would leak a
+    pool slot.
+    """
+    global _POOL
+    if _POOL is None:
+        _POOL = pooling.MySQLConnectionPool(pool_name="cake_warehouse", pool_size=int(os.getenv("DB_POOL_SIZE", "8")),
+                                            **_connection_settings())
+    return instrument(_POOL.get_connection())
@@ -12,6 +12,7 @@ TABLES = [
     "sub_recipe_ingredients",
     "cakes",
     "cake_ingredients",
+    "cake_components",
     "sub_recipe_nested",
     "warehouse",
     "stock_movements",
@@ -25,13 +26,16 @@ def migrate_table(table):
     mysql_conn = get_connection()
     mysql_cur = mysql_conn.cursor()
 
-    sqlite_cur.execute(f"SELECT * FROM {table}")
+    # Generated columns (name_normalized) are recomputed by MySQL and cannot be inserted
+    sqlite_cur.execute(f"PRAGMA table_xinfo({table})")
+    columns = [row[1] for row in sqlite_cur.fetchall() if row[6] == 0]
+    sqlite_cur.execute(f"SELECT {', '.join(columns)} FROM {table}")
     rows = sqlite_cur.fetchall()
 
     # Get column count to match insert placeholders
-    col_count = len(sqlite_cur.description)
+    col_count = len(columns)
     placeholders = ", ".join(["%s"] * col_count)
-    column_names = ", ".join([desc[0] for desc in sqlite_cur.description])
+    column_names = ", ".join(columns)
 
     insert_query = f"INSERT INTO {table} ({column_names}) VALUES ({placeholders})"
 
@@ -1,95 +1,117 @@
-def resolve_subrecipe_ingredients_detailed(conn, sub_recipe_id, final_qty=None, path=""):
-    def get_total_cost_and_weight(sub_id):
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT sri.quantity, i.price_per_unit
-            FROM sub_recipe_ingredients sri
-            JOIN ingredients i ON sri.ingredient_id = i.id
-            WHERE sri.sub_recipe_id = %s
-        ''', (sub_id,))
-        direct_items = cursor.fetchall()
-        direct_cost = sum(float(q) * float(p) for q, p in direct_items)
-        direct_weight = sum(float(q) for q, _ in direct_items)
-
-        cursor.execute('SELECT sub_recipe_id, quantity FROM sub_recipe_nested WHERE parent_sub_recipe_id = %s', (sub_id,))
-        nested_items = cursor.fetchall()
-        nested_cost = 0
-        nested_weight = 0
-
-        for nested_sub_id, qty in nested_items:
-            nc, nw = get_total_cost_and_weight(nested_sub_id)
-            if nw > 0:
-                nested_cost += (nc / nw) * float(qty)
-                nested_weight += float(qty)
-
-        return direct_cost + nested_cost, direct_weight + nested_weight
-
-    def flatten_nested_subrecipe(nested_id, nested_qty, current_path, parent_qty=1.0, parent_total=1.0):
-        flat_result = []
-        cursor = conn.cursor()
-        total_cost, total_weight = get_total_cost_and_weight(nested_id)
-        if total_weight == 0:
-            return flat_result
-
-        cursor.execute('''
-            SELECT sri.ingredient_id, sri.quantity, i.name, i.unit, i.price_per_unit
-            FROM sub_recipe_ingredients sri
-            JOIN ingredients i ON sri.ingredient_id = i.id
-            WHERE sri.sub_recipe_id = %s
-        ''', (nested_id,))
-        for ing_id, qty, name, unit, price in cursor.fetchall():
-            scaled_qty = float(qty) / total_weight * float(nested_qty) / parent_total * parent_qty
-            flat_result.append({
-                'source': current_path,
-                'ingredient': name,
-                'unit': unit,
-                'quantity': scaled_qty,
-                'cost': scaled_qty * float(price)
-            })
+import pandas as pd
 
-        cursor.execute('SELECT sub_recipe_id, quantity FROM sub_recipe_nested WHERE parent_sub_recipe_id = %s', (nested_id,))
-        for inner_id, inner_qty in cursor.fetchall():
-            flat_result.extend(flatten_nested_subrecipe(inner_id, inner_qty, current_path, parent_qty=nested_qty, parent_total=total_weight))
+from utils.numeric import fetch_frame, to_float_array
+from utils.recipe_graph import load_recipe_graph, load_cake_components, expand_cake_quantities, iter_subrecipe_ingredients
+from utils.sql import placeholders
 
-        return flat_result
 
-    cursor = conn.cursor()
-    result = []
+def resolve_subrecipe_ingredients_detailed(conn, sub_recipe_id, final_qty=None, path="", graph=None):
+    # Pass a preloaded `graph` when resolving many sub-recipes in one page run
+    if graph is None:
+        graph = load_recipe_graph(conn)
 
-    cursor.execute('SELECT name FROM sub_recipes WHERE id = %s', (sub_recipe_id,))
-    sub_name_row = cursor.fetchone()
-    if not sub_name_row:
+    sub_name = graph['names'].get(sub_recipe_id)
+    if sub_name is None:
         return []
 
-    sub_name = sub_name_row[0]
     current_path = f"{path} → {sub_name}" if path else sub_name
 
-    total_cost, total_weight = get_total_cost_and_weight(sub_recipe_id)
-    if total_weight == 0:
-        return []
-
     if final_qty is None:
-        final_qty = total_weight
-
-    cursor.execute('''
-        SELECT sri.ingredient_id, sri.quantity, i.name, i.unit, i.price_per_unit
-        FROM sub_recipe_ingredients sri
-        JOIN ingredients i ON sri.ingredient_id = i.id
-        WHERE sri.sub_recipe_id = %s
-    ''', (sub_recipe_id,))
-    for ing_id, qty, name, unit, price in cursor.fetchall():
-        proportion = float(qty) / total_weight
-        scaled_qty = proportion * final_qty
+        final_qty = graph['weights'].get(sub_recipe_id, 0)
+
+    result = []
+    for ing_id, scaled_qty, name, unit, price in iter_subrecipe_ingredients(graph, sub_recipe_id, float(final_qty)):
         result.append({
             'source': current_path,
+            'ingredient_id': ing_id,
             'ingredient': name,
             'unit': unit,
             'quantity': scaled_qty,
-            'cost': scaled_qty * float(price)
+            'cost': scaled_qty * price
         })
 
-    cursor.execute('SELECT sub_recipe_id, quantity FROM sub_recipe_nested WHERE parent_sub_recipe_id = %s', (sub_recipe_id,))
-    for nested_id, nested_qty in cursor.fetchall():
-        result.extend(flatten_nested_subrecipe(nested_id, nested_qty, current_path, parent_qty=final_qty, parent_total=total_weight))
-
     return result
+
+
+def calculate_batch(conn, cake_quantities, graph=None):
+    """Ingredient totals for producing {cake_id: number_of_cakes}.
+
+    Returns (total_ingredients, detailed_rows, subrecipe_summary); total_ingredients is keyed by
+    ingredient name with id/quantity/unit/cost. Cyclic sub-recipes are skipped.
+    """
+    if graph is None:
+        graph = load_recipe_graph(conn)
+    # Component cakes are produced as part of the cakes that use them
+    cake_quantities = expand_cake_quantities(load_cake_components(conn), cake_quantities)
+    cake_ids = list(cake_quantities)
+    total_ingredients = {}
+    detailed_rows = []
+    subrecipe_summary = {}
+    if not cake_ids:
+        return total_ingredients, detailed_rows, subrecipe_summary
+
+    parts = fetch_frame(conn, f'''
+        SELECT ci.cake_id, ci.ingredient_or_subrecipe_id, ci.is_subrecipe, ci.quantity, i.name, i.unit, i.price_per_unit
+        FROM cake_ingredients ci
+        LEFT JOIN ingredients i ON i.id = ci.ingredient_or_subrecipe_id AND ci.is_subrecipe = 0
+        WHERE ci.cake_id IN ({placeholders(conn, len(cake_ids))})
+    ''', ['cake_id', 'item_id', 'is_sub', 'quantity', 'name', 'unit', 'price'], tuple(cake_ids), numeric=['quantity', 'price'])
+    # Scale and cost every part in one pass; only sub-recipe parts need resolving row by row
+    parts['scaled'] = parts['quantity'] * to_float_array(parts['cake_id'].map(cake_quantities))
+    parts['cost'] = parts['scaled'] * parts['price']
+
+    def add(ing_id, name, unit, qty, cost):
+        if name in total_ingredients:
+            total_ingredients[name]['quantity'] += qty
+            total_ingredients[name]['cost'] += cost
+        else:
+            total_ingredients[name] = {'id': ing_id, 'quantity': qty, 'unit': unit, 'cost': cost}
+
+    for iid, is_sub, ing_name, ing_unit, scaled_qty, cost in zip(
+            parts['item_id'].tolist(), parts['is_sub'].tolist(), parts['name'].tolist(), parts['unit'].tolist(),
+            parts['scaled'].tolist(), parts['cost'].tolist()):
+        if is_sub:
+            if iid in graph['cyclic'] or iid not in graph['names']:
+                continue
+            resolved = resolve_subrecipe_ingredients_detailed(conn, iid, scaled_qty, graph=graph)
+            detailed_rows.extend(resolved)
+
+            sr_name = graph['names'][iid]
+            summary = subrecipe_summary.setdefault(sr_name, {'quantity': 0.0, 'unit_cost': 0.0})
+            summary['quantity'] += scaled_qty
+            weight = graph['weights'].get(iid, 0)
+            if weight:
+                summary['unit_cost'] = graph['costs'][iid] / weight
+
+            for r in resolved:
+                add(r['ingredient_id'], r['ingredient'], r['unit'], r['quantity'], r['cost'])
+        elif pd.notna(ing_name):
+            add(iid, ing_name, ing_unit, scaled_qty, cost)
+            detailed_rows.append({
+                'source': 'Direct in Cake',
+                'ingredient': ing_name,
+                'unit': ing_unit,
+                'quantity': scaled_qty,
+                'cost': cost
+            })
+
+    return total_ingredients, detailed_rows, subrecipe_summary
+
+
+def parse_batch_plan(df, cake_ids_by_name):
+    """{cake_id: quantity} from a production plan with 'Cake Name' and 'Quantity' columns.
+
+    Returns (cake_quantities, unknown_names); repeated cakes are summed. Raises ValueError if a
+    column is missing.
+    """
+    if 'Cake Name' not in df.columns or 'Quantity' not in df.columns:
+        raise ValueError("Plan must have columns 'Cake Name' and 'Quantity'")
+    cake_quantities, unknown = {}, []
+    quantities = pd.to_numeric(df['Quantity'], errors='coerce').fillna(0.0)
+    for cake_name, qty in zip(df['Cake Name'].tolist(), quantities.tolist()):
+        if cake_name in cake_ids_by_name:
+            cake_id = cake_ids_by_name[cake_name]
+            cake_quantities[cake_id] = cake_quantities.get(cake_id, 0.0) + qty
+        else:
+            unknown.append(cake_name)
+    return cake_quantities, unknown
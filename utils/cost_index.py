@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+
+from utils.numeric import fetch_frame, to_float_array
+from utils.recipe_graph import load_recipe_graph, load_cake_components, topological_order
+from utils.search import invalidate_name_search
+from utils.sql import is_sqlite, placeholders
+
+# Recipe structure only changes on recipe edits, so the index is cached per backend
+# and dropped by invalidate_recipe_index(); price edits never invalidate it.
+_INDEX_CACHE = {}
+
+
+def invalidate_recipe_index():
+    # Recipe writers also add, delete and rename catalogue rows, so the name search tries go too
+    _INDEX_CACHE.clear()
+    invalidate_name_search()
+
+
+def _usage_frame(owner, ingredient, quantity):
+    return pd.DataFrame({'owner': owner, 'ingredient_id': ingredient, 'quantity': quantity})
+
+
+def _fold_components(direct, order, children):
+    """Fold child usage into its owners, one dependency level at a time.
+
+    `direct` is a long (owner, ingredient_id, quantity) frame of each owner's own lines, `order`
+    lists owners children-first and `children[owner]` holds (child, factor) pairs: the owner uses
+    `factor` × the child's full usage. Each level is one merge and concat, so every owner is
+    evaluated once no matter how many others reuse it.
+    """
+    level = {}
+    edges = []
+    for owner in order:
+        kids = [(child, factor) for child, factor in children.get(owner, ()) if child in level]
+        level[owner] = 1 + max((level[child] for child, _ in kids), default=-1)
+        edges.extend((level[owner], owner, child, factor) for child, factor in kids)
+    edges = pd.DataFrame(edges, columns=['level', 'owner', 'child', 'factor'])
+
+    direct_level = direct['owner'].map(level)
+    usage = direct[direct_level.eq(0)]
+    for lvl in sorted(edges['level'].unique()):
+        step = edges[edges['level'] == lvl].merge(usage, left_on='child', right_on='owner', suffixes=('', '_child'))
+        step = _usage_frame(step['owner'], step['ingredient_id'], step['quantity'] * step['factor'])
+        usage = pd.concat([usage, direct[direct_level.eq(lvl)], step], ignore_index=True)
+    return usage.groupby(['owner', 'ingredient_id'], as_index=False, sort=False)['quantity'].sum()
+
+
+def _flatten_sub_usage(graph):
+    """Ingredient usage per full batch of every sub-recipe, nested sub-recipes folded in."""
+    weights = graph['weights']
+    rows = [(sub_id, ing_id, qty) for sub_id in graph['order'] for ing_id, qty, _, _, _ in graph['direct'].get(sub_id, ())]
+    direct = pd.DataFrame(rows, columns=['owner', 'ingredient_id', 'quantity'])
+    children = {
+        sub_id: [(child, qty / weights[child]) for child, qty in nested if weights.get(child, 0) > 0]
+        for sub_id, nested in graph['nested'].items()
+    }
+    return _fold_components(direct, graph['order'], children)
+
+
+def _flatten_cake_usage(direct, cake_ids, components):
+    """Ingredient usage per cake with component cakes folded in; cakes in a cycle keep only their own lines."""
+    order, cyclic = topological_order(cake_ids, {k: [child for child, _ in v] for k, v in components.items()})
+    children = {cake_id: components.get(cake_id, ()) for cake_id in order}
+    return _fold_components(direct, order + cyclic, children), set(cyclic)
+
+
+def _nested_dict(owners, keys, values):
+    """{owner: {key: value}} from three aligned arrays, slicing runs of a sorted owner array."""
+    if not len(owners):
+        return {}
+    order = np.argsort(owners, kind='stable')
+    owners, keys, values = owners[order], keys[order].tolist(), values[order].tolist()
+    ends = (np.flatnonzero(np.diff(owners)) + 1).tolist()
+    starts = [0] + ends
+    ends.append(len(keys))
+    return {owner: dict(zip(keys[s:e], values[s:e])) for owner, s, e in zip(owners[starts].tolist(), starts, ends)}
+
+
+def build_recipe_index(conn, graph=None):
+    """Flatten every cake and sub-recipe into ingredient usage and build the reverse index.
+
+    Usage is kept as (owner, ingredient_id, quantity) arrays per cake and per full sub-recipe
+    batch, with nested sub-recipes and component cakes resolved here rather than copied into
+    the recipe tables; rows/cols/quantities index the cake usage against the sorted cake_ids/ingredient_ids
+    as a sparse (COO) matrix for vectorized costing. Dict views come from usage_map().
+    """
+    if graph is None:
+        graph = load_recipe_graph(conn)
+
+    cakes = fetch_frame(conn, 'SELECT id, name, percent_yield FROM cakes', ['id', 'name', 'percent_yield'],
+                        numeric=['percent_yield'])
+    parts = fetch_frame(conn, 'SELECT cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity FROM cake_ingredients',
+                        ['owner', 'item_id', 'is_sub', 'quantity'], numeric=['quantity'])
+
+    sub_usage = _flatten_sub_usage(graph)
+
+    is_sub = parts['is_sub'].astype(bool)
+    direct = _usage_frame(parts['owner'][~is_sub], parts['item_id'][~is_sub], parts['quantity'][~is_sub])
+    sub_parts = parts[is_sub].copy()
+    sub_parts['weight'] = sub_parts['item_id'].map(graph['weights']).fillna(0.0)
+    sub_parts = sub_parts[(sub_parts['weight'] > 0) & ~sub_parts['item_id'].isin(graph['cyclic'])]
+    via_subs = sub_parts.merge(sub_usage, left_on='item_id', right_on='owner', suffixes=('', '_sub'))
+    via_subs = _usage_frame(via_subs['owner'], via_subs['ingredient_id'],
+                            via_subs['quantity_sub'] * via_subs['quantity'] / via_subs['weight'])
+    cake_usage, cyclic_cakes = _flatten_cake_usage(pd.concat([direct, via_subs], ignore_index=True),
+                                                   cakes['id'].tolist(), load_cake_components(conn))
+
+    cake_ids = np.sort(cakes['id'].to_numpy())
+    ingredient_ids = np.sort(cake_usage['ingredient_id'].unique())
+    return {
+        'graph': graph,
+        'cake_names': dict(zip(cakes['id'].tolist(), cakes['name'].tolist())),
+        'cake_yields': dict(zip(cakes['id'].tolist(), cakes['percent_yield'].tolist())),
+        'cyclic_cakes': cyclic_cakes,
+        'cake_usage_coo': [cake_usage[col].to_numpy() for col in ('owner', 'ingredient_id', 'quantity')],
+        'sub_usage_coo': [sub_usage[col].to_numpy() for col in ('owner', 'ingredient_id', 'quantity')],
+        'cake_ids': cake_ids,
+        'ingredient_ids': ingredient_ids,
+        'rows': np.searchsorted(cake_ids, cake_usage['owner'].to_numpy()),
+        'cols': np.searchsorted(ingredient_ids, cake_usage['ingredient_id'].to_numpy()),
+        'quantities': cake_usage['quantity'].to_numpy(dtype=np.float64),
+    }
+
+
+# name -> (usage arrays, outer key column, inner key column)
+_USAGE_MAPS = {
+    'cake_usage': ('cake_usage_coo', 0, 1),
+    'sub_usage': ('sub_usage_coo', 0, 1),
+    'ingredient_cakes': ('cake_usage_coo', 1, 0),
+    'ingredient_subs': ('sub_usage_coo', 1, 0),
+}
+
+
+def usage_map(index, name):
+    """Dict view of the index usage (cake_usage, sub_usage, ingredient_cakes or ingredient_subs), built on first use."""
+    if name not in index:
+        source, outer, inner = _USAGE_MAPS[name]
+        arrays = index[source]
+        index[name] = _nested_dict(arrays[outer], arrays[inner], arrays[2])
+    return index[name]
+
+
+def get_recipe_index(conn):
+    key = 'sqlite' if is_sqlite(conn) else 'mysql'
+    if key not in _INDEX_CACHE:
+        _INDEX_CACHE[key] = build_recipe_index(conn)
+    return _INDEX_CACHE[key]
+
+
+def fetch_prices(conn, ingredient_ids):
+    ingredient_ids = list(ingredient_ids)
+    if not ingredient_ids:
+        return {}
+    c = conn.cursor()
+    c.execute(
+        f'SELECT id, price_per_unit FROM ingredients WHERE id IN ({placeholders(conn, len(ingredient_ids))})',
+        tuple(ingredient_ids)
+    )
+    rows = c.fetchall()
+    return dict(zip([ing_id for ing_id, _ in rows], to_float_array([price for _, price in rows]).tolist()))
+
+
+def price_vector(conn, ingredient_ids):
+    """Current price of each of `ingredient_ids` as a float64 array aligned with it (0 when unknown)."""
+    c = conn.cursor()
+    c.execute('SELECT id, price_per_unit FROM ingredients')
+    rows = c.fetchall()
+    known = pd.Series(to_float_array([price for _, price in rows]), index=[ing_id for ing_id, _ in rows], dtype=np.float64)
+    return known.reindex(ingredient_ids, fill_value=0.0).to_numpy()
+
+
+def price_change_impact(conn, ingredient_id, old_price, new_price):
+    """Cost before/after a price change for only the sub-recipes and cakes that use the ingredient."""
+    index = get_recipe_index(conn)
+    cakes = usage_map(index, 'ingredient_cakes').get(ingredient_id, {})
+    subs = usage_map(index, 'ingredient_subs').get(ingredient_id, {})
+    cake_usage, sub_usage = usage_map(index, 'cake_usage'), usage_map(index, 'sub_usage')
+    if not cakes and not subs:
+        return []
+
+    used_ids = set()
+    for cake_id in cakes:
+        used_ids.update(cake_usage[cake_id])
+    for sub_id in subs:
+        used_ids.update(sub_usage[sub_id])
+    prices = fetch_prices(conn, used_ids)
+    prices[ingredient_id] = float(old_price or 0)
+    delta = float(new_price or 0) - float(old_price or 0)
+
+    rows = []
+    for sub_id, qty in subs.items():
+        old_cost = sum(q * prices.get(i, 0) for i, q in sub_usage[sub_id].items())
+        rows.append({
+            'Type': 'Sub-Recipe',
+            'Name': index['graph']['names'].get(sub_id, sub_id),
+            'Quantity Used': round(qty, 5),
+            'Old Cost': round(old_cost, 2),
+            'New Cost': round(old_cost + delta * qty, 2),
+            'Change': round(delta * qty, 2),
+        })
+    for cake_id, qty in cakes.items():
+        yield_factor = 1 + index['cake_yields'].get(cake_id, 0) / 100
+        old_cost = sum(q * prices.get(i, 0) for i, q in cake_usage[cake_id].items()) * yield_factor
+        change = delta * qty * yield_factor
+        rows.append({
+            'Type': 'Cake',
+            'Name': index['cake_names'].get(cake_id, cake_id),
+            'Quantity Used': round(qty, 5),
+            'Old Cost': round(old_cost, 2),
+            'New Cost': round(old_cost + change, 2),
+            'Change': round(change, 2),
+        })
+    return rows
@@ -0,0 +1,202 @@
+from datetime import datetime
+
+import numpy as np
+
+from utils.numeric import fetch_frame, to_float_array
+from utils.sql import is_sqlite, placeholder, placeholders
+
+
+def ensure_cost_layers(conn):
+    """Create purchase_receipts, the open FIFO lots (cost_layers) and the running averages (inventory_costs)."""
+    sqlite = is_sqlite(conn)
+    pk = 'INTEGER PRIMARY KEY AUTOINCREMENT' if sqlite else 'INT AUTO_INCREMENT PRIMARY KEY'
+    real = 'REAL' if sqlite else 'DECIMAL(16,6)'
+    text = 'TEXT' if sqlite else 'VARCHAR(255)'
+    c = conn.cursor()
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS purchase_receipts (
+            id {pk},
+            warehouse_id INTEGER,
+            ingredient_id INTEGER,
+            quantity {real},
+            unit_price {real},
+            supplier {text},
+            received_at {text}
+        )
+    ''')
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS cost_layers (
+            id {pk},
+            warehouse_id INTEGER,
+            ingredient_id INTEGER,
+            received_at {text},
+            quantity {real},
+            remaining {real},
+            unit_cost {real}
+        )
+    ''')
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS inventory_costs (
+            warehouse_id INTEGER,
+            ingredient_id INTEGER,
+            quantity {real},
+            avg_cost {real},
+            PRIMARY KEY (warehouse_id, ingredient_id)
+        )
+    ''')
+    if sqlite:
+        c.execute('CREATE INDEX IF NOT EXISTS idx_cost_layers_position ON cost_layers (warehouse_id, ingredient_id, received_at)')
+    else:
+        c.execute("SHOW INDEX FROM cost_layers WHERE Key_name = 'idx_cost_layers_position'")
+        if not c.fetchall():
+            c.execute('CREATE INDEX idx_cost_layers_position ON cost_layers (warehouse_id, ingredient_id, received_at)')
+
+
+def seed_cost_layers(conn, timestamp=None):
+    """Open one lot at the current list price for stock that predates cost tracking; run once, on creation."""
+    p = placeholder(conn)
+    now = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    c = conn.cursor()
+    c.execute(f'''
+        INSERT INTO cost_layers (warehouse_id, ingredient_id, received_at, quantity, remaining, unit_cost)
+        SELECT ws.warehouse_id, ws.ingredient_id, {p}, ws.quantity, ws.quantity, COALESCE(i.price_per_unit, 0)
+        FROM warehouse_stock ws
+        JOIN ingredients i ON i.id = ws.ingredient_id
+        WHERE ws.quantity > 0
+    ''', (now,))
+    c.execute('''
+        INSERT INTO inventory_costs (warehouse_id, ingredient_id, quantity, avg_cost)
+        SELECT ws.warehouse_id, ws.ingredient_id, ws.quantity, COALESCE(i.price_per_unit, 0)
+        FROM warehouse_stock ws
+        JOIN ingredients i ON i.id = ws.ingredient_id
+    ''')
+
+
+def _fallback_costs(conn, warehouse_id, ingredient_ids):
+    """{ingredient_id: unit cost} for stock with no lot: the position's average cost, else the list price."""
+    ingredient_ids = list(ingredient_ids)
+    if not ingredient_ids:
+        return {}
+    p = placeholder(conn)
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT i.id, COALESCE(ic.avg_cost, i.price_per_unit, 0)
+        FROM ingredients i
+        LEFT JOIN inventory_costs ic ON ic.ingredient_id = i.id AND ic.warehouse_id = {p}
+        WHERE i.id IN ({placeholders(conn, len(ingredient_ids))})
+    ''', (warehouse_id, *ingredient_ids))
+    rows = c.fetchall()
+    return dict(zip([ing_id for ing_id, _ in rows], to_float_array([cost for _, cost in rows]).tolist()))
+
+
+def _draw(conn, warehouse_id, quantities):
+    """Open lots of the given ingredients, oldest first, with the quantity `quantities` draws from each.
+
+    One indexed query for all ingredients; the oldest-first allocation is a grouped cumulative sum.
+    """
+    layers = fetch_frame(conn, f'''
+        SELECT id, ingredient_id, remaining, unit_cost
+        FROM cost_layers
+        WHERE warehouse_id = {placeholder(conn)} AND ingredient_id IN ({placeholders(conn, len(quantities))})
+        ORDER BY ingredient_id, received_at, id
+    ''', ['id', 'ingredient_id', 'remaining', 'unit_cost'], (warehouse_id, *quantities), numeric=['remaining', 'unit_cost'])
+    need = layers['ingredient_id'].map(quantities).fillna(0.0).to_numpy()
+    remaining = layers['remaining'].to_numpy()
+    drawn_before = layers.groupby('ingredient_id')['remaining'].cumsum().to_numpy() - remaining
+    return layers.assign(drawn=np.clip(need - drawn_before, 0.0, remaining))
+
+
+def fifo_issue_cost(conn, warehouse_id, quantities):
+    """{ingredient_id: cost} of issuing {ingredient_id: quantity} from a warehouse's oldest lots first.
+
+    Read-only, so it can value a planned batch. Quantity beyond the open lots is costed at the
+    position's average cost, else the list price.
+    """
+    quantities = {int(ing_id): float(qty) for ing_id, qty in quantities.items() if qty > 0}
+    if not quantities:
+        return {}
+    layers = _draw(conn, warehouse_id, quantities)
+    layers['cost'] = layers['drawn'] * layers['unit_cost']
+    covered = layers.groupby('ingredient_id')[['drawn', 'cost']].sum()
+    drawn, cost = covered['drawn'].to_dict(), covered['cost'].to_dict()
+    fallback = _fallback_costs(conn, warehouse_id, quantities)
+    return {
+        ing_id: cost.get(ing_id, 0.0) + max(qty - drawn.get(ing_id, 0.0), 0.0) * fallback.get(ing_id, 0.0)
+        for ing_id, qty in quantities.items()
+    }
+
+
+def average_unit_costs(conn, ingredient_ids, warehouse_id=None):
+    """{ingredient_id: weighted-average unit cost} of stock on hand, in one warehouse or across all."""
+    ingredient_ids = list(ingredient_ids)
+    if not ingredient_ids:
+        return {}
+    p = placeholder(conn)
+    warehouse_filter = f' AND warehouse_id = {p}' if warehouse_id is not None else ''
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT ingredient_id, SUM(quantity * avg_cost) / SUM(quantity)
+        FROM inventory_costs
+        WHERE quantity > 0 AND ingredient_id IN ({placeholders(conn, len(ingredient_ids))}){warehouse_filter}
+        GROUP BY ingredient_id
+    ''', (*ingredient_ids, *([warehouse_id] if warehouse_id is not None else [])))
+    rows = c.fetchall()
+    return dict(zip([ing_id for ing_id, _ in rows], to_float_array([cost for _, cost in rows]).tolist()))
+
+
+def _average_upsert_sql(conn):
+    # avg_cost is assigned before quantity: MySQL evaluates the assignments in order
+    p = placeholder(conn)
+    new_qty, new_cost = ('excluded.quantity', 'excluded.avg_cost') if is_sqlite(conn) else ('VALUES(quantity)', 'VALUES(avg_cost)')
+    on_hand = 'CASE WHEN quantity > 0 THEN quantity ELSE 0 END'
+    update = f'''
+        avg_cost = CASE WHEN {new_qty} > 0
+                        THEN ({on_hand} * avg_cost + {new_qty} * {new_cost}) / ({on_hand} + {new_qty})
+                        ELSE avg_cost END,
+        quantity = quantity + {new_qty}
+    '''
+    conflict = 'ON CONFLICT(warehouse_id, ingredient_id) DO UPDATE SET' if is_sqlite(conn) else 'ON DUPLICATE KEY UPDATE'
+    return f'''
+        INSERT INTO inventory_costs (warehouse_id, ingredient_id, quantity, avg_cost)
+        VALUES ({p}, {p}, {p}, {p})
+        {conflict} {update}
+    '''
+
+
+def post_cost_movements(conn, warehouse_id, rows, unit_costs=None, timestamp=None):
+    """Keep lots and average costs in step with (ingredient_id, change) stock movements.
+
+    Increases open a lot at `unit_costs[ingredient_id]`, else at the position's average cost or
+    the list price; decreases draw the oldest lots first, and drawn-out lots are deleted so the
+    layer table only ever holds open lots. Returns {ingredient_id: cost} of the decreases.
+    Does not commit.
+    """
+    incoming = {ing_id: change for ing_id, change in rows if change > 0}
+    outgoing = {ing_id: -change for ing_id, change in rows if change < 0}
+    if not incoming and not outgoing:
+        return {}
+    p = placeholder(conn)
+    now = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fallback = _fallback_costs(conn, warehouse_id, [ing_id for ing_id, _ in rows])
+    costs = {ing_id: float((unit_costs or {}).get(ing_id, fallback.get(ing_id, 0.0))) for ing_id, _ in rows}
+    c = conn.cursor()
+
+    issued = {}
+    if outgoing:
+        layers = _draw(conn, warehouse_id, outgoing)
+        drawn = layers[layers['drawn'] > 0]
+        emptied = drawn['drawn'] >= drawn['remaining'] - 1e-9
+        c.executemany(f'DELETE FROM cost_layers WHERE id = {p}', [(int(i),) for i in drawn.loc[emptied, 'id']])
+        c.executemany(f'UPDATE cost_layers SET remaining = remaining - {p} WHERE id = {p}',
+                      [(float(q), int(i)) for q, i in zip(drawn.loc[~emptied, 'drawn'], drawn.loc[~emptied, 'id'])])
+        covered = (drawn['drawn'] * drawn['unit_cost']).groupby(drawn['ingredient_id']).sum().to_dict()
+        drawn_qty = drawn.groupby('ingredient_id')['drawn'].sum().to_dict()
+        issued = {ing_id: covered.get(ing_id, 0.0) + max(qty - drawn_qty.get(ing_id, 0.0), 0.0) * costs[ing_id]
+                  for ing_id, qty in outgoing.items()}
+    if incoming:
+        c.executemany(
+            f'INSERT INTO cost_layers (warehouse_id, ingredient_id, received_at, quantity, remaining, unit_cost) VALUES ({p}, {p}, {p}, {p}, {p}, {p})',
+            [(warehouse_id, ing_id, now, qty, qty, costs[ing_id]) for ing_id, qty in incoming.items()]
+        )
+    c.executemany(_average_upsert_sql(conn), [(warehouse_id, ing_id, change, costs[ing_id]) for ing_id, change in rows])
+    return issued
@@ -0,0 +1,130 @@
+import numpy as np
+
+from utils.cost_index import get_recipe_index, price_vector, usage_map
+from utils.numeric import to_float_array
+from utils.recipe_graph import load_recipe_graph, iter_subrecipe_ingredients, ensure_cake_components_table
+from utils.sql import placeholder, placeholders
+
+
+def _ingredient_rows(conn, ingredient_ids):
+    ingredient_ids = list(set(ingredient_ids))
+    if not ingredient_ids:
+        return {}
+    c = conn.cursor()
+    c.execute(
+        f'SELECT id, name, price_per_unit, unit FROM ingredients WHERE id IN ({placeholders(conn, len(ingredient_ids))})',
+        tuple(ingredient_ids)
+    )
+    rows = c.fetchall()
+    prices = to_float_array([price for _, _, price, _ in rows])
+    return {ing_id: (name, None if raw is None else price, unit)
+            for (ing_id, name, raw, unit), price in zip(rows, prices.tolist())}
+
+
+def cake_parts(conn, cake_id):
+    c = conn.cursor()
+    c.execute(
+        f'SELECT ingredient_or_subrecipe_id, is_subrecipe, quantity FROM cake_ingredients WHERE cake_id = {placeholder(conn)}',
+        (cake_id,)
+    )
+    rows = c.fetchall()
+    quantities = to_float_array([qty for _, _, qty in rows]).tolist()
+    return [(item_id, bool(is_sub), qty) for (item_id, is_sub, _), qty in zip(rows, quantities)]
+
+
+def cost_breakdown(conn, parts, graph=None):
+    """Cost of a list of (item_id, is_subrecipe, quantity) parts, nested sub-recipes included.
+
+    Returns (direct_items, sub_sections, total, warnings). Issues one ingredient query plus the
+    graph load, regardless of how many parts there are.
+    """
+    if graph is None:
+        graph = load_recipe_graph(conn)
+    direct = _ingredient_rows(conn, [item_id for item_id, is_sub, _ in parts if not is_sub])
+
+    direct_items, sub_sections, warnings = [], [], []
+    total = 0.0
+    for item_id, is_sub, qty in parts:
+        if is_sub:
+            name = graph['names'].get(item_id, f'Sub-Recipe {item_id}')
+            if item_id in graph['cyclic']:
+                warnings.append(f"⚠️ Sub-recipe '{name}' is nested inside itself and was skipped.")
+                continue
+            if not graph['weights'].get(item_id):
+                warnings.append(f"⚠️ Sub-recipe '{name}' has zero total weight. Cannot calculate proportions.")
+                continue
+            rows = []
+            for _, scaled_qty, ing_name, unit, price in iter_subrecipe_ingredients(graph, item_id, qty):
+                rows.append({
+                    'Ingredient': ing_name,
+                    'Quantity Used': round(scaled_qty, 4),
+                    'Unit': unit,
+                    'Cost': round(scaled_qty * price, 2)
+                })
+            sub_total = graph['costs'][item_id] / graph['weights'][item_id] * qty
+            sub_sections.append((name, qty, rows, sub_total))
+            total += sub_total
+        else:
+            if item_id not in direct or direct[item_id][1] is None:
+                warnings.append(f"⚠️ Missing or deleted ingredient ID {item_id}")
+                continue
+            name, price, unit = direct[item_id]
+            cost = qty * price
+            total += cost
+            direct_items.append({'Ingredient': name, 'Quantity': qty, 'Unit': unit, 'Cost': round(cost, 2)})
+
+    return direct_items, sub_sections, total, warnings
+
+
+def cake_components(conn, cake_id):
+    ensure_cake_components_table(conn)
+    c = conn.cursor()
+    c.execute(f'SELECT component_cake_id, quantity FROM cake_components WHERE cake_id = {placeholder(conn)}', (cake_id,))
+    rows = c.fetchall()
+    quantities = to_float_array([qty for _, qty in rows]).tolist()
+    return [(component_id, qty) for (component_id, _), qty in zip(rows, quantities)]
+
+
+def component_breakdown(conn, components):
+    """Cost of (cake_id, quantity) component cakes, resolved through the recipe index.
+
+    Returns (cake_sections, total, warnings); each section is (name, qty, rows, section_total)
+    with the component's flattened ingredients. Component cakes are costed before their yield.
+    """
+    if not components:
+        return [], 0.0, []
+    index = get_recipe_index(conn)
+    cake_usage = usage_map(index, 'cake_usage')
+    ingredients = _ingredient_rows(conn, [i for cake_id, _ in components for i in cake_usage.get(cake_id, {})])
+
+    sections, warnings = [], []
+    total = 0.0
+    for cake_id, qty in components:
+        name = index['cake_names'].get(cake_id, f'Cake {cake_id}')
+        if cake_id in index['cyclic_cakes']:
+            warnings.append(f"⚠️ Cake '{name}' contains itself; only its own ingredients are counted.")
+        rows = []
+        section_total = 0.0
+        for ing_id, ing_qty in cake_usage.get(cake_id, {}).items():
+            ing_name, price, unit = ingredients.get(ing_id, (f'Ingredient {ing_id}', None, ''))
+            cost = ing_qty * qty * (price or 0.0)
+            section_total += cost
+            rows.append({'Ingredient': ing_name, 'Quantity Used': round(ing_qty * qty, 4), 'Unit': unit, 'Cost': round(cost, 2)})
+        sections.append((name, qty, rows, section_total))
+        total += section_total
+    return sections, total, warnings
+
+
+def all_cake_costs(conn, cake_ids=None):
+    """Cost before yield for every cake (or the given ones) from the cached recipe index.
+
+    One price query for the whole catalogue and one weighted bincount over the sparse usage
+    arrays; returns {cake_id: cost}.
+    """
+    index = get_recipe_index(conn)
+    prices = price_vector(conn, index['ingredient_ids'])
+    totals = np.bincount(index['rows'], weights=index['quantities'] * prices[index['cols']],
+                         minlength=len(index['cake_ids']))
+    costs = dict(zip(index['cake_ids'].tolist(), totals.tolist()))
+    cake_ids = costs.keys() if cake_ids is None else cake_ids
+    return {cake_id: costs.get(cake_id, 0.0) for cake_id in cake_ids}
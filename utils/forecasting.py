@@ -0,0 +1,172 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.production import production_consumption
+from utils.sql import is_sqlite, placeholder
+from utils.stock import _table_exists, invalidate_stock_matrix, refresh_low_stock_alerts
+
+# Days of demand history the models are fitted on
+HISTORY_DAYS = 365
+# Exponential smoothing half-lives: daily demand in days, weekly demand in weeks
+DAILY_HALFLIFE = 14
+WEEKLY_HALFLIFE = 4
+# Par suggestions cover the lead time plus the review period at the forecast rate, with safety
+# stock at this many standard deviations of daily demand (1.65 ≈ 95% of periods without a stock-out)
+LEAD_TIME_DAYS = 2
+REVIEW_DAYS = 7
+SERVICE_Z = 1.65
+
+# (backend, warehouse_id, production) -> (day, fingerprint, forecast frame), one entry per
+# warehouse. Receiving an order (even one created days ago) or logging production changes the
+# fingerprint, so the forecast is refitted after either and otherwise once a day
+_FORECAST_CACHE = {}
+
+
+def _production_demand(conn, since, until):
+    """Daily ingredient consumption implied by kitchen_batch_log, one recipe expansion per produced item."""
+    if not _table_exists(conn, 'kitchen_batch_log'):
+        return pd.DataFrame(columns=['day', 'ingredient_id', 'quantity'])
+    p = placeholder(conn)
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT SUBSTR(produced_at, 1, 10) AS day, item_type, item_id, SUM(quantity)
+        FROM kitchen_batch_log
+        WHERE produced_at >= {p} AND produced_at < {p}
+        GROUP BY SUBSTR(produced_at, 1, 10), item_type, item_id
+    ''', (since, until))
+    log = pd.DataFrame(c.fetchall(), columns=['day', 'item_type', 'item_id', 'produced'])
+    if log.empty:
+        return pd.DataFrame(columns=['day', 'ingredient_id', 'quantity'])
+    log['produced'] = pd.to_numeric(log['produced'], errors='coerce').fillna(0.0)
+
+    per_unit = pd.DataFrame(
+        [(item_type, item_id, ing_id, qty)
+         for item_type, item_id in log[['item_type', 'item_id']].drop_duplicates().itertuples(index=False)
+         for ing_id, qty in production_consumption(conn, [(item_type, item_id, 1.0)]).items()],
+        columns=['item_type', 'item_id', 'ingredient_id', 'per_unit']
+    )
+    usage = log.merge(per_unit, on=['item_type', 'item_id'])
+    usage['quantity'] = usage['produced'] * usage['per_unit']
+    return usage.groupby(['day', 'ingredient_id'], as_index=False)['quantity'].sum()
+
+
+def demand_history(conn, warehouse_id, since, until, production=True):
+    """Daily demand per ingredient between `since` and `until` (YYYY-MM-DD, until exclusive).
+
+    With `production`, ingredients the kitchen production log consumes use that consumption; the
+    rest use the quantities accepted into `warehouse_id` by received transfer orders, dated by when
+    they were received (orders received before that was recorded use their creation date; run
+    ensure_waste_summary() first). Using one source per ingredient keeps stock that was both
+    transferred in and produced with from counting twice. The log does not record a warehouse, so pass production=False for other warehouses.
+    Returns a long frame: day, ingredient_id, quantity.
+    """
+    p = placeholder(conn)
+    c = conn.cursor()
+    received = 'COALESCE(t.received_at, t.created_at)'
+    c.execute(f'''
+        SELECT SUBSTR({received}, 1, 10) AS day, toi.ingredient_id, SUM(toi.accepted_qty)
+        FROM transfer_order_items toi
+        JOIN transfer_orders t ON t.id = toi.transfer_order_id
+        WHERE t.target_warehouse_id = {p} AND t.status = 'Received'
+          AND {received} >= {p} AND {received} < {p}
+        GROUP BY SUBSTR({received}, 1, 10), toi.ingredient_id
+    ''', (warehouse_id, since, until))
+    transfers = pd.DataFrame(c.fetchall(), columns=['day', 'ingredient_id', 'quantity'])
+    if not production:
+        transfers['quantity'] = pd.to_numeric(transfers['quantity'], errors='coerce').fillna(0.0)
+        return transfers
+    production = _production_demand(conn, since, until)
+    transfers = transfers[~transfers['ingredient_id'].isin(production['ingredient_id'])]
+    history = pd.concat([production, transfers], ignore_index=True)
+    history['quantity'] = pd.to_numeric(history['quantity'], errors='coerce').fillna(0.0)
+    return history
+
+
+def _fit(history, since, until):
+    # Day × ingredient matrix with zero-demand days filled in; every model below runs over all
+    # ingredient columns at once
+    days = pd.date_range(since, pd.Timestamp(until) - pd.Timedelta(days=1), freq='D')
+    daily = (history.assign(day=pd.to_datetime(history['day']))
+             .pivot_table(index='day', columns='ingredient_id', values='quantity', aggfunc='sum')
+             .reindex(days, fill_value=0.0)
+             .fillna(0.0))
+    smoothed = daily.ewm(halflife=DAILY_HALFLIFE)
+    # Weeks end on the last full day, so the latest week is never a partial one
+    weekly = daily.resample(f"W-{days[-1].strftime('%a').upper()}").sum()
+
+    return pd.DataFrame({
+        'daily_forecast': smoothed.mean().iloc[-1],
+        'daily_std': smoothed.std().iloc[-1].fillna(0.0),
+        'weekly_forecast': weekly.ewm(halflife=WEEKLY_HALFLIFE).mean().iloc[-1],
+        'avg_28d': daily.rolling(28, min_periods=1).mean().iloc[-1],
+        'last_week': weekly.iloc[-1],
+        'active_days': (daily > 0).sum(),
+    }).rename_axis('ingredient_id').reset_index()
+
+
+def _history_fingerprint(conn, warehouse_id, production):
+    # Changes whenever an order is received into the warehouse or production is logged
+    p = placeholder(conn)
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT COUNT(*), MAX(received_at) FROM transfer_orders
+        WHERE target_warehouse_id = {p} AND status = 'Received'
+    """, (warehouse_id,))
+    fingerprint = c.fetchone()
+    if production and _table_exists(conn, 'kitchen_batch_log'):
+        c.execute('SELECT MAX(id) FROM kitchen_batch_log')
+        fingerprint += c.fetchone()
+    return fingerprint
+
+
+def forecast_demand(conn, warehouse_id, today=None, production=True):
+    """Per-ingredient demand forecast for `warehouse_id`, fitted on the HISTORY_DAYS before today.
+
+    Columns: ingredient_id, daily_forecast, daily_std (exponentially weighted), weekly_forecast
+    (smoothed weekly totals), avg_28d, last_week and active_days. Only ingredients with any
+    demand in the window are returned.
+    """
+    today = pd.Timestamp(today or date.today()).normalize()
+    key = ('sqlite' if is_sqlite(conn) else 'mysql', warehouse_id, production)
+    version = (str(today.date()), _history_fingerprint(conn, warehouse_id, production))
+    cached = _FORECAST_CACHE.get(key)
+    if cached is None or cached[0] != version:
+        since = str((today - timedelta(days=HISTORY_DAYS)).date())
+        until = str(today.date())
+        history = demand_history(conn, warehouse_id, since, until, production)
+        if history.empty:
+            forecast = pd.DataFrame(columns=['ingredient_id', 'daily_forecast', 'daily_std', 'weekly_forecast',
+                                             'avg_28d', 'last_week', 'active_days'])
+        else:
+            forecast = _fit(history, since, until)
+        cached = _FORECAST_CACHE[key] = (version, forecast)
+    return cached[1].copy()
+
+
+def suggest_par_levels(forecast, lead_time_days=LEAD_TIME_DAYS, review_days=REVIEW_DAYS, service_z=SERVICE_Z):
+    """Suggested par level per forecast row: demand over lead time + review period plus safety stock."""
+    cover = lead_time_days + review_days
+    return (forecast['daily_forecast'] * cover + service_z * forecast['daily_std'] * np.sqrt(cover)).round(2)
+
+
+def set_par_levels(conn, warehouse_id, par_levels):
+    """Write {ingredient_id: par} to a warehouse's warehouse_stock.par_level and re-evaluate its low-stock alerts."""
+    if not par_levels:
+        return
+    p = placeholder(conn)
+    upsert = ('ON CONFLICT(warehouse_id, ingredient_id) DO UPDATE SET par_level = excluded.par_level'
+              if is_sqlite(conn) else 'ON DUPLICATE KEY UPDATE par_level = VALUES(par_level)')
+    c = conn.cursor()
+    try:
+        c.executemany(
+            f'INSERT INTO warehouse_stock (warehouse_id, ingredient_id, quantity, par_level) VALUES ({p}, {p}, 0, {p}) {upsert}',
+            [(warehouse_id, int(ing_id), float(par)) for ing_id, par in par_levels.items()]
+        )
+        refresh_low_stock_alerts(conn, warehouse_id=warehouse_id, ingredient_ids=[int(ing_id) for ing_id in par_levels])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_stock_matrix()
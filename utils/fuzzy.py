@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+
+def normalize_name(name):
+    return ' '.join(str(name).lower().split())
+
+
+def trigrams(text):
+    padded = f"  {normalize_name(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted trigram index over a list of names, used for "did you mean" suggestions."""
+
+    def __init__(self, names=()):
+        self.names = []
+        self.grams = []
+        self.postings = defaultdict(set)
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        pos = len(self.names)
+        grams = trigrams(name)
+        self.names.append(name)
+        self.grams.append(grams)
+        for gram in grams:
+            self.postings[gram].add(pos)
+
+    def suggest(self, text, limit=3, min_score=0.3):
+        query = trigrams(text)
+        if not query:
+            return []
+
+        shared = defaultdict(int)
+        for gram in query:
+            for pos in self.postings.get(gram, ()):
+                shared[pos] += 1
+
+        scored = []
+        for pos, hits in shared.items():
+            score = hits / len(query | self.grams[pos])
+            if score >= min_score:
+                scored.append((score, self.names[pos]))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [name for _, name in scored[:limit]]
+
+
+class PrefixTrie:
+    """Word-prefix trie over names for typeahead.
+
+    Every word of a normalized name is inserted down to `max_depth` characters, and each node keeps
+    at most `capacity` names. Names are ranked before insertion (whole-name prefix first, then
+    shorter names), so a lookup is a walk of the prefix with no sorting.
+    """
+
+    def __init__(self, max_depth=4, capacity=50):
+        self.max_depth = max_depth
+        self.capacity = capacity
+        self.root = {}
+
+    @classmethod
+    def build(cls, entries, max_depth=4, capacity=50):
+        """Trie over (value, name) pairs."""
+        trie = cls(max_depth, capacity)
+        keyed = []
+        for value, name in entries:
+            words = normalize_name(name).split()
+            for pos, word in enumerate(words):
+                keyed.append(((pos > 0, len(name), name), word, value))
+        keyed.sort(key=lambda k: k[0])
+        for _, word, value in keyed:
+            trie._insert(word, value)
+        return trie
+
+    def _insert(self, word, value):
+        node = self.root
+        for ch in word[:self.max_depth]:
+            node = node.setdefault(ch, {})
+            values = node.setdefault(None, [])
+            if len(values) < self.capacity and value not in values:
+                values.append(value)
+
+    def lookup(self, prefix, limit=20):
+        """Values whose name has a word starting with `prefix` (already normalized), best first."""
+        node = self.root
+        for ch in prefix[:self.max_depth]:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node.get(None, [])[:limit]
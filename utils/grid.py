@@ -0,0 +1,83 @@
+import math
+
+import pandas as pd
+
+# Rows per data_editor page; Streamlit's rerun cost follows the rows on screen, not the catalogue
+PAGE_SIZE = 50
+
+
+def page_bounds(row_count, page, page_size=PAGE_SIZE):
+    """(start, stop, page_count) for a 1-based page, clamped to the last page."""
+    page_count = max(1, math.ceil(row_count / page_size))
+    page = min(max(int(page), 1), page_count)
+    return (page - 1) * page_size, min(page * page_size, row_count), page_count
+
+
+def diff_rows(original, edited, columns):
+    """{index: {column: value}} for the rows of `edited` whose `columns` differ from `original`."""
+    before = original.loc[edited.index, columns]
+    after = edited[columns]
+    changed = (before != after) & ~(before.isna() & after.isna())
+    rows = after[changed.any(axis=1)]
+    return {idx: dict(zip(columns, values)) for idx, values in zip(rows.index.tolist(), rows.itertuples(index=False))}
+
+
+def apply_edits(df, edits):
+    """Copy of `df` with pending {index: {column: value}} edits written over it."""
+    df = df.copy()
+    for idx, values in edits.items():
+        if idx in df.index:
+            for column, value in values.items():
+                df.at[idx, column] = value
+    return df
+
+
+def paged_editor(df, key, editable, column_config=None, page_size=PAGE_SIZE):
+    """Render `df` as a paginated st.data_editor and collect edits across pages.
+
+    Only the current page is sent to the browser. Edits are kept in session state by row index
+    (with the row as it was first seen) until clear_editor() is called after saving, so paging
+    away does not lose them. Returns (merged, pending): `df` with every pending edit applied,
+    and {index: (seen_row, {column: value})} for the changed rows only, including rows edited
+    before a search hid them.
+    """
+    import streamlit as st
+
+    state = st.session_state.setdefault(f"{key}_pending", {})
+    start, stop, page_count = page_bounds(len(df), st.session_state.get(f"{key}_page", 1), page_size)
+    if page_count > 1:
+        # A narrower search can leave the stored page past the end
+        st.session_state[f"{key}_page"] = start // page_size + 1
+        page = st.number_input(f"Page (of {page_count}, {len(df)} rows)", min_value=1, max_value=page_count,
+                               step=1, key=f"{key}_page")
+        start, stop, _ = page_bounds(len(df), page, page_size)
+
+    view = apply_edits(df.iloc[start:stop], {idx: values for idx, (_, values) in state.items()})
+    edited = st.data_editor(
+        view,
+        key=f"{key}_editor_{start}",
+        disabled=[column for column in df.columns if column not in editable],
+        column_config=column_config,
+        use_container_width=True,
+        hide_index=True,
+        num_rows="fixed",
+    )
+
+    original = df.iloc[start:stop]
+    changes = diff_rows(original, edited, list(editable))
+    for idx in original.index.tolist():
+        if idx in changes:
+            seen = state[idx][0] if idx in state else original.loc[idx].to_dict()
+            state[idx] = (seen, changes[idx])
+        else:
+            state.pop(idx, None)
+    return apply_edits(df, {idx: values for idx, (_, values) in state.items()}), dict(state)
+
+
+def clear_editor(key):
+    """Drop the pending edits and editor state of a paged_editor() after they have been saved."""
+    import streamlit as st
+
+    for name in list(st.session_state):
+        if name == f"{key}_pending" or name.startswith(f"{key}_editor_"):
+            del st.session_state[name]
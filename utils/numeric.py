@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+
+def to_float_array(values):
+    """Bulk-convert driver values (MySQL Decimal, SQLite float, None) to a float64 array; None becomes 0."""
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+
+
+def fetch_frame(conn, sql, columns, params=(), numeric=()):
+    """Run a query and return a DataFrame, converting the `numeric` columns to float64 in one pass each.
+
+    Use this instead of float() on every fetched row: MySQL hands back Decimal objects, and
+    converting them one at a time inside a loop dominated the costing pages on big catalogues.
+    """
+    c = conn.cursor()
+    c.execute(sql, params)
+    df = pd.DataFrame.from_records(c.fetchall(), columns=columns)
+    for col in numeric:
+        df[col] = to_float_array(df[col])
+    return df
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from utils.numeric import to_float_array
+
+
+def load_prices_and_categories(conn, ingredient_ids):
+    c = conn.cursor()
+    c.execute('''
+        SELECT i.id, i.name, i.price_per_unit, ic.name
+        FROM ingredients i
+        LEFT JOIN warehouse w ON w.ingredient_id = i.id
+        LEFT JOIN inventory_categories ic ON w.category_id = ic.id
+    ''')
+    df = pd.DataFrame.from_records(c.fetchall(), columns=['id', 'name', 'price', 'category'])
+    df['price'] = to_float_array(df['price'])
+    # The warehouse join can repeat an ingredient; keep its last row
+    df = df.drop_duplicates('id', keep='last').set_index('id').reindex(ingredient_ids)
+    names = df['name'].fillna(pd.Series([str(i) for i in ingredient_ids], index=df.index)).tolist()
+    prices = df['price'].fillna(0.0).to_numpy(dtype=np.float64)
+    categories = df['category'].fillna('Uncategorized').tolist()
+    return names, prices, categories
+
+
+def scenario_prices(prices, ingredient_ids, categories, ingredient_pct=None, category_pct=None):
+    """Apply % changes to a price vector; an ingredient-level change overrides its category's change."""
+    factors = np.ones(len(prices))
+    category_pct = category_pct or {}
+    ingredient_pct = ingredient_pct or {}
+    if category_pct:
+        factors *= np.array([1 + category_pct.get(cat, 0) / 100 for cat in categories])
+    if ingredient_pct:
+        for j, ing_id in enumerate(ingredient_ids):
+            if ing_id in ingredient_pct:
+                factors[j] = 1 + ingredient_pct[ing_id] / 100
+    return prices * factors
+
+
+def simulate_costs(index, prices, categories, ingredient_pct=None, category_pct=None):
+    """Current vs scenario cost for every cake of a recipe index, given its load_prices_and_categories().
+
+    Each price vector is one weighted bincount over the index's sparse usage arrays, with the
+    yield markup applied per cake afterwards.
+    """
+    cake_ids, ingredient_ids = index['cake_ids'], index['ingredient_ids']
+    new_prices = scenario_prices(prices, ingredient_ids.tolist(), categories, ingredient_pct, category_pct)
+    yields = 1 + pd.Series(index['cake_yields']).reindex(cake_ids, fill_value=0.0).to_numpy(dtype=np.float64) / 100
+    current, scenario = (
+        np.bincount(index['rows'], weights=index['quantities'] * price[index['cols']], minlength=len(cake_ids)) * yields
+        for price in (prices, new_prices)
+    )
+
+    df = pd.DataFrame({
+        'Cake': [index['cake_names'][cid] for cid in cake_ids.tolist()],
+        'Current Cost': current,
+        'Scenario Cost': scenario,
+    })
+    df['Change'] = df['Scenario Cost'] - df['Current Cost']
+    df['Change %'] = np.where(df['Current Cost'] > 0, df['Change'] / df['Current Cost'].where(df['Current Cost'] > 0) * 100, 0.0)
+    return df.round(2)
@@ -0,0 +1,52 @@
+from collections import defaultdict
+from datetime import datetime
+
+from utils.cost_index import get_recipe_index, usage_map
+from utils.sql import placeholder
+from utils.stock import apply_stock_deltas
+
+CAKE = 'cake'
+SUB_RECIPE = 'sub_recipe'
+
+
+def production_consumption(conn, items):
+    """Flattened ingredient consumption for produced (item_type, item_id, quantity) lines.
+
+    Cakes are counted in pieces and sub-recipes in the same weight unit used for nesting.
+    Reads from the cached recipe index, so no per-item queries are issued.
+    """
+    index = get_recipe_index(conn)
+    weights = index['graph']['weights']
+    cake_usage, sub_usage = usage_map(index, 'cake_usage'), usage_map(index, 'sub_usage')
+    consumption = defaultdict(float)
+    for item_type, item_id, qty in items:
+        if item_type == CAKE:
+            usage, scale = cake_usage.get(item_id, {}), qty
+        else:
+            weight = weights.get(item_id, 0)
+            usage, scale = sub_usage.get(item_id, {}), (qty / weight if weight else 0)
+        for ing_id, ing_qty in usage.items():
+            consumption[ing_id] += ing_qty * scale
+    return dict(consumption)
+
+
+def post_production(conn, items, warehouse_id, produced_by):
+    """Log produced items and consume their ingredients from `warehouse_id` in one transaction."""
+    items = [(item_type, int(item_id), float(qty)) for item_type, item_id, qty in items if qty > 0]
+    if not items:
+        return {}
+    consumption = production_consumption(conn, items)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    p = placeholder(conn)
+    c = conn.cursor()
+    try:
+        c.executemany(
+            f'INSERT INTO kitchen_batch_log (item_type, item_id, quantity, produced_at, produced_by) VALUES ({p}, {p}, {p}, {p}, {p})',
+            [(item_type, item_id, qty, now, produced_by) for item_type, item_id, qty in items]
+        )
+        apply_stock_deltas(conn, warehouse_id, {i: -q for i, q in consumption.items()}, 'Kitchen Production', now)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return consumption
@@ -0,0 +1,151 @@
+import cProfile
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+SAMPLE_INTERVAL = 0.005
+RETENTION_DAYS = 30
+# Measured runs are buffered and written in one batch once this many are queued or the oldest
+# has waited this long; a process exit loses at most one batch
+METRICS_BATCH_SIZE = 20
+METRICS_FLUSH_SECONDS = 60
+
+_pending_metrics = []
+_pending_lock = threading.Lock()
+
+
+class _PandasSampler(threading.Thread):
+    """Samples the page thread's stack and counts time spent inside pandas.
+
+    Samples where a query is running (utils/query_stats on the stack) are left out, so pandas
+    time does not double count the DB time that read_sql_query spends waiting on the driver.
+    """
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            in_pandas = False
+            while frame is not None:
+                module = frame.f_globals.get('__name__', '')
+                if module == 'utils.query_stats':
+                    in_pandas = False
+                    break
+                if module.startswith('pandas'):
+                    in_pandas = True
+                frame = frame.f_back
+            self.samples += in_pandas
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.samples * SAMPLE_INTERVAL
+
+
+def profile_call(func, trace_memory=False, cprofile=False):
+    """Run `func` and return (metrics, profile_text); metrics hold wall, pandas and peak memory."""
+    sampler = _PandasSampler(threading.get_ident())
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile() if cprofile else None
+
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        if profiler:
+            profiler.runcall(func)
+        else:
+            func()
+    finally:
+        wall = time.perf_counter() - start
+        pandas_time = sampler.stop()
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024 if trace_memory else None
+        if started_tracing:
+            tracemalloc.stop()
+
+    profile_text = None
+    if profiler:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(30)
+        profile_text = out.getvalue()
+    return {'wall_ms': wall * 1000, 'pandas_ms': pandas_time * 1000, 'peak_kb': peak_kb}, profile_text
+
+
+def ensure_metrics_table(conn):
+    conn.cursor().execute('''
+        CREATE TABLE IF NOT EXISTS page_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            page TEXT,
+            recorded_at TEXT,
+            wall_ms REAL,
+            db_ms REAL,
+            queries INTEGER,
+            pandas_ms REAL,
+            peak_kb REAL
+        )
+    ''')
+
+
+def queue_metrics(page, metrics):
+    """Buffer one measured run; returns True when the buffer is due for flush_metrics()."""
+    now = datetime.now()
+    with _pending_lock:
+        _pending_metrics.append((page, now, metrics['wall_ms'], metrics['db_ms'], metrics['queries'],
+                                 metrics['pandas_ms'], metrics['peak_kb']))
+        oldest = _pending_metrics[0][1]
+        return (len(_pending_metrics) >= METRICS_BATCH_SIZE
+                or (now - oldest).total_seconds() >= METRICS_FLUSH_SECONDS)
+
+
+def flush_metrics(conn):
+    """Write the buffered runs to page_metrics in one transaction."""
+    with _pending_lock:
+        rows = list(_pending_metrics)
+        _pending_metrics.clear()
+    if not rows:
+        return
+    ensure_metrics_table(conn)
+    c = conn.cursor()
+    c.executemany(
+        'INSERT INTO page_metrics (page, recorded_at, wall_ms, db_ms, queries, pandas_ms, peak_kb) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [(page, at.strftime("%Y-%m-%d %H:%M:%S"), *values) for page, at, *values in rows]
+    )
+    # Prune occasionally rather than on every flush
+    if random.random() < 0.05:
+        cutoff = (datetime.now() - timedelta(days=RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        c.execute('DELETE FROM page_metrics WHERE recorded_at < ?', (cutoff,))
+    conn.commit()
+
+
+def page_percentiles(conn, since=None):
+    """p50/p95 of each metric per page; SQLite has no percentile function, so this is done in pandas."""
+    ensure_metrics_table(conn)
+    df = pd.read_sql_query(
+        'SELECT page, wall_ms, db_ms, queries, pandas_ms, peak_kb FROM page_metrics WHERE recorded_at >= ?',
+        conn, params=(since or '',)
+    )
+    if df.empty:
+        return df
+    metrics = ['wall_ms', 'db_ms', 'queries', 'pandas_ms', 'peak_kb']
+    df[metrics] = df[metrics].apply(pd.to_numeric, errors='coerce')
+    grouped = df.groupby('page')
+    result = grouped.size().rename('runs').to_frame()
+    for col in metrics:
+        result[f'{col} p50'] = grouped[col].median()
+        result[f'{col} p95'] = grouped[col].quantile(0.95)
+    return result.sort_values('wall_ms p95', ascending=False).round(1)
@@ -0,0 +1,161 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Statements run at least this many times in one rerun are reported as likely N+1 loops
+N_PLUS_ONE_THRESHOLD = 10
+SLOWEST_KEPT = 5
+
+_local = threading.local()
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and literals so the same statement with different values groups together."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\((?:\s*(?:\?|%s)\s*,?)+\)', '(?)', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class QueryStats:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+        self.slowest = []
+
+    def record(self, sql, elapsed):
+        statement = normalize_sql(sql)
+        self.count += 1
+        self.total_time += elapsed
+        self.statements[statement] += 1
+        self.slowest.append((elapsed, statement))
+        self.slowest = sorted(self.slowest, reverse=True)[:SLOWEST_KEPT]
+
+    def repeated(self):
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= N_PLUS_ONE_THRESHOLD]
+
+    def summary(self):
+        return {
+            'page': self.page,
+            'queries': self.count,
+            'query_time_ms': round(self.total_time * 1000, 2),
+            'run_time_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'slowest': [{'ms': round(t * 1000, 2), 'sql': sql} for t, sql in self.slowest],
+            'n_plus_one': [{'count': n, 'sql': sql} for sql, n in self.repeated()],
+        }
+
+
+def start_run(page):
+    _local.stats = QueryStats(page)
+    return _local.stats
+
+
+def current_run():
+    return getattr(_local, 'stats', None)
+
+
+def finish_run():
+    stats = current_run()
+    _local.stats = None
+    return stats.summary() if stats is not None else None
+
+
+def write_log(path, summary):
+    with open(path, 'a') as f:
+        f.write(json.dumps({'at': datetime.now().isoformat(timespec='seconds'), **summary}) + '\n')
+
+
+def _timed(sql, call):
+    start = time.perf_counter()
+    try:
+        return call()
+    finally:
+        stats = current_run()
+        if stats is not None:
+            stats.record(sql, time.perf_counter() - start)
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        return _timed(sql, lambda: self._cursor.execute(sql, params))
+
+    def executemany(self, sql, seq_of_params):
+        # A batched write counts as one query: that is the round-trip saving it exists for
+        return _timed(sql, lambda: self._cursor.executemany(sql, seq_of_params))
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Thin DB-API proxy; queries go through InstrumentedCursor and are counted against the current run."""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.raw.cursor(*args, **kwargs))
+
+    def execute(self, sql, params=()):
+        cursor = self.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def __enter__(self):
+        self.raw.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.raw.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class InstrumentedSqliteCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        return _timed(sql, lambda: sqlite3.Cursor.execute(self, sql, params))
+
+    def executemany(self, sql, seq_of_params):
+        return _timed(sql, lambda: sqlite3.Cursor.executemany(self, sql, seq_of_params))
+
+
+class InstrumentedSqliteConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors are counted against the current run.
+
+    A subclass rather than an InstrumentedConnection proxy, so pandas still recognises it as a
+    sqlite3 connection and reads through its sqlite3 path (and its own cursors are timed too).
+    Pass as `factory=` to sqlite3.connect().
+    """
+
+    def cursor(self, factory=InstrumentedSqliteCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def instrument(conn):
+    if conn is None or isinstance(conn, (InstrumentedConnection, InstrumentedSqliteConnection)):
+        return conn
+    return InstrumentedConnection(conn)
+
+
+def raw_connection(conn):
+    return conn.raw if isinstance(conn, InstrumentedConnection) else conn
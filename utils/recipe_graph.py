@@ -0,0 +1,252 @@
+import heapq
+from collections import defaultdict, deque
+
+import numpy as np
+
+from utils.numeric import fetch_frame
+from utils.sql import is_sqlite, placeholder
+
+
+class RecipeCycleError(ValueError):
+    pass
+
+
+def topological_order(nodes, edges):
+    """Kahn's algorithm over `edges` (node -> iterable of dependencies).
+
+    Dependencies come before the nodes that use them. Returns (order, nodes_in_cycles).
+    """
+    indegree = {node: 0 for node in nodes}
+    dependents = {node: [] for node in nodes}
+    for node in nodes:
+        for dep in edges.get(node, ()):
+            if dep in indegree:
+                indegree[node] += 1
+                dependents[dep].append(node)
+
+    queue = deque(node for node in nodes if indegree[node] == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for parent in dependents[node]:
+            indegree[parent] -= 1
+            if indegree[parent] == 0:
+                queue.append(parent)
+
+    cyclic = [node for node in nodes if indegree[node] > 0]
+    return order, cyclic
+
+
+def load_nesting(conn):
+    edges = fetch_frame(conn, 'SELECT parent_sub_recipe_id, sub_recipe_id, quantity FROM sub_recipe_nested',
+                        ['parent', 'child', 'quantity'], numeric=['quantity'])
+    nested = defaultdict(list)
+    for parent_id, child_id, qty in zip(edges['parent'].tolist(), edges['child'].tolist(), edges['quantity'].tolist()):
+        nested[parent_id].append((child_id, qty))
+    return nested
+
+
+def _reaches(nested, start_ids, target_id):
+    seen = set()
+    queue = deque(start_ids)
+    while queue:
+        node = queue.popleft()
+        if node == target_id:
+            return True
+        if node in seen:
+            continue
+        seen.add(node)
+        queue.extend(child for child, _ in nested.get(node, ()))
+    return False
+
+
+def would_create_cycle(conn, parent_id, child_ids):
+    """True if nesting any of `child_ids` under `parent_id` would close a loop in sub_recipe_nested."""
+    child_ids = list(child_ids)
+    if not child_ids:
+        return False
+    if parent_id in child_ids:
+        return True
+    return _reaches(load_nesting(conn), child_ids, parent_id)
+
+
+def ensure_cake_components_table(conn):
+    id_column = 'INTEGER PRIMARY KEY AUTOINCREMENT' if is_sqlite(conn) else 'INT AUTO_INCREMENT PRIMARY KEY'
+    conn.cursor().execute(f'''
+        CREATE TABLE IF NOT EXISTS cake_components (
+            id {id_column},
+            cake_id INTEGER,
+            component_cake_id INTEGER,
+            quantity DECIMAL(16,6),
+            FOREIGN KEY(cake_id) REFERENCES cakes(id),
+            FOREIGN KEY(component_cake_id) REFERENCES cakes(id)
+        )
+    ''')
+
+
+def load_cake_components(conn):
+    """{cake_id: [(component_cake_id, quantity)]}: cakes used whole inside other cakes."""
+    ensure_cake_components_table(conn)
+    edges = fetch_frame(conn, 'SELECT cake_id, component_cake_id, quantity FROM cake_components',
+                        ['cake', 'component', 'quantity'], numeric=['quantity'])
+    components = defaultdict(list)
+    for cake_id, component_id, qty in zip(edges['cake'].tolist(), edges['component'].tolist(), edges['quantity'].tolist()):
+        components[cake_id].append((component_id, qty))
+    return components
+
+
+def would_create_cake_cycle(conn, cake_id, component_ids):
+    """True if using any of `component_ids` inside `cake_id` would make a cake contain itself."""
+    component_ids = list(component_ids)
+    if cake_id in component_ids:
+        return True
+    return bool(component_ids) and _reaches(load_cake_components(conn), component_ids, cake_id)
+
+
+def parent_cake_names(conn, cake_id):
+    """Sorted names of the cakes that use `cake_id` as a component."""
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT DISTINCT c.name
+        FROM cake_components cc
+        JOIN cakes c ON c.id = cc.cake_id
+        WHERE cc.component_cake_id = {placeholder(conn)}
+    ''', (cake_id,))
+    return sorted(name for name, in c.fetchall())
+
+
+def expand_cake_quantities(components, cake_quantities):
+    """Add the component cakes needed for {cake_id: count}, recursively; returns a new dict.
+
+    Counts are pushed from parents to components in topological order, so a component shared by
+    several cakes (at any depth) is visited once with its counts summed. Raises RecipeCycleError
+    if a requested cake contains itself.
+    """
+    reachable = set()
+    queue = deque(cake_quantities)
+    while queue:
+        cake_id = queue.popleft()
+        if cake_id not in reachable:
+            reachable.add(cake_id)
+            queue.extend(child for child, _ in components.get(cake_id, ()))
+    order, cyclic = topological_order(list(reachable), {n: [child for child, _ in components.get(n, ())] for n in reachable})
+    if cyclic:
+        raise RecipeCycleError(f'Cakes {sorted(cyclic)} contain themselves')
+
+    expanded = defaultdict(float)
+    for cake_id, count in cake_quantities.items():
+        expanded[cake_id] += float(count)
+    for cake_id in reversed(order):
+        for child, qty in components.get(cake_id, ()):
+            expanded[child] += expanded[cake_id] * qty
+    return dict(expanded)
+
+
+def find_cycles(conn):
+    nested = load_nesting(conn)
+    nodes = set(nested) | {child for children in nested.values() for child, _ in children}
+    _, cyclic = topological_order(list(nodes), {n: [child for child, _ in nested.get(n, ())] for n in nodes})
+    return cyclic
+
+
+def _topological_levels(order, nested):
+    level = {}
+    for sub_id in order:
+        level[sub_id] = 1 + max((level.get(child, -1) for child, _ in nested.get(sub_id, ())), default=-1)
+    return level
+
+
+def load_recipe_graph(conn):
+    """Load the whole sub-recipe graph in three queries and precompute weights and costs.
+
+    Quantities and prices are converted to float arrays in bulk. Weights and costs are evaluated
+    level by level (children first) with array sums, so resolving any tree afterwards needs no
+    further queries and no per-row conversions.
+    """
+    c = conn.cursor()
+    c.execute('SELECT id, name FROM sub_recipes')
+    names = dict(c.fetchall())
+
+    lines = fetch_frame(conn, '''
+        SELECT sri.sub_recipe_id, sri.ingredient_id, sri.quantity, i.name, i.unit, i.price_per_unit
+        FROM sub_recipe_ingredients sri
+        JOIN ingredients i ON sri.ingredient_id = i.id
+    ''', ['sub_id', 'ingredient_id', 'quantity', 'name', 'unit', 'price'], numeric=['quantity', 'price'])
+    direct = defaultdict(list)
+    for row in zip(lines['sub_id'].tolist(), lines['ingredient_id'].tolist(), lines['quantity'].tolist(),
+                   lines['name'].tolist(), lines['unit'].tolist(), lines['price'].tolist()):
+        direct[row[0]].append(row[1:])
+
+    nested = load_nesting(conn)
+
+    nodes = list(set(names) | set(direct) | set(nested))
+    order, cyclic = topological_order(nodes, {n: [child for child, _ in nested.get(n, ())] for n in nodes})
+
+    # Direct weight/cost per sub-recipe, then nested contributions one dependency level at a time
+    position = {sub_id: i for i, sub_id in enumerate(order)}
+    weights = np.zeros(len(order))
+    costs = np.zeros(len(order))
+    if len(lines):
+        in_order = lines['sub_id'].map(position)
+        keep = in_order.notna().to_numpy()
+        idx = in_order[keep].to_numpy(dtype=np.int64)
+        qty = lines['quantity'].to_numpy()[keep]
+        weights += np.bincount(idx, weights=qty, minlength=len(order))
+        costs += np.bincount(idx, weights=qty * lines['price'].to_numpy()[keep], minlength=len(order))
+
+    level = _topological_levels(order, nested)
+    edges_by_level = defaultdict(list)
+    for parent_id in order:
+        for child_id, qty in nested.get(parent_id, ()):
+            if child_id in position:
+                edges_by_level[level[parent_id]].append((position[parent_id], position[child_id], qty))
+    for lvl in sorted(edges_by_level):
+        parent, child, qty = (np.array(col) for col in zip(*edges_by_level[lvl]))
+        usable = weights[child] > 0
+        parent, child, qty = parent[usable], child[usable], qty[usable].astype(float)
+        costs += np.bincount(parent, weights=costs[child] / weights[child] * qty, minlength=len(order))
+        weights += np.bincount(parent, weights=qty, minlength=len(order))
+
+    return {
+        'names': names,
+        'direct': direct,
+        'nested': nested,
+        'order': order,
+        'position': position,
+        'cyclic': set(cyclic),
+        'weights': dict(zip(order, weights.tolist())),
+        'costs': dict(zip(order, costs.tolist())),
+    }
+
+
+def iter_subrecipe_ingredients(graph, sub_recipe_id, final_qty):
+    """Yield (ingredient_id, quantity, name, unit, price) for `final_qty` of a sub-recipe, nesting flattened.
+
+    Scale factors are pushed from parents to children in topological order (latest in `order`
+    first), so a sub-recipe reached through several paths is expanded once with its factors summed.
+    Sub-recipes reachable from a non-cyclic one are never cyclic themselves, so no depth guard is needed.
+    """
+    if sub_recipe_id in graph['cyclic']:
+        raise RecipeCycleError(f"Sub-recipe {graph['names'].get(sub_recipe_id, sub_recipe_id)} is part of a nesting cycle")
+
+    weights, position = graph['weights'], graph['position']
+    weight = weights.get(sub_recipe_id, 0)
+    if weight == 0:
+        return
+
+    factors = {sub_recipe_id: final_qty / weight}
+    pending = [(-position[sub_recipe_id], sub_recipe_id)]
+    while pending:
+        _, sub_id = heapq.heappop(pending)
+        factor = factors[sub_id]
+        for ing_id, qty, name, unit, price in graph['direct'].get(sub_id, ()):
+            yield ing_id, qty * factor, name, unit, price
+
+        for child_id, qty in graph['nested'].get(sub_id, ()):
+            child_weight = weights.get(child_id, 0)
+            if child_weight > 0:
+                if child_id not in factors:
+                    factors[child_id] = 0.0
+                    heapq.heappush(pending, (-position[child_id], child_id))
+                factors[child_id] += factor * qty / child_weight
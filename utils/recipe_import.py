@@ -0,0 +1,210 @@
+import time
+
+import pandas as pd
+
+from utils.recipe_graph import topological_order
+from utils.recipe_paste import resolve_item_names
+from utils.sql import placeholder, placeholders
+
+CAKE = 'Cake'
+SUB_RECIPE = 'Sub-Recipe'
+
+
+def _recipe_type(value):
+    text = str(value or '').strip().lower()
+    return CAKE if text == 'cake' else SUB_RECIPE
+
+
+def _first_value(df, column, default=None):
+    if column not in df.columns:
+        return default
+    values = df[column].dropna()
+    return values.iloc[0] if not values.empty else default
+
+
+def _new_recipe(name, recipe_type, percent_yield):
+    return {
+        'name': str(name).strip(),
+        'type': recipe_type,
+        'percent_yield': float(percent_yield or 0),
+        'lines': [],
+        'errors': [],
+    }
+
+
+def _add_lines(recipe, df):
+    for _, row in df.iterrows():
+        item = row.get('Item')
+        if pd.isna(item) or not str(item).strip():
+            continue
+        try:
+            qty = float(row.get('Quantity'))
+        except (TypeError, ValueError):
+            qty = float('nan')
+        if pd.isna(qty) or qty <= 0:
+            recipe['errors'].append(f"Invalid quantity for '{item}'")
+            continue
+        recipe['lines'].append((str(item).strip(), qty))
+
+
+def read_recipe_workbook(file):
+    """Read a workbook in either layout and return a list of recipe dicts.
+
+    Long format: one sheet with columns Recipe, Recipe Type, Item, Quantity (and optional Percent Yield).
+    Sheet-per-recipe: the sheet name is the recipe name; columns Item, Quantity and optional
+    Recipe Type / Percent Yield.
+    """
+    sheets = pd.read_excel(file, sheet_name=None)
+    recipes = {}
+    for sheet_name, df in sheets.items():
+        df.columns = [str(col).strip() for col in df.columns]
+        if not {'Item', 'Quantity'}.issubset(df.columns):
+            continue
+
+        if 'Recipe' in df.columns:
+            df = df.dropna(subset=['Recipe'])
+            for recipe_name, group in df.groupby('Recipe', sort=False):
+                key = str(recipe_name).strip()
+                if key not in recipes:
+                    recipes[key] = _new_recipe(
+                        key, _recipe_type(_first_value(group, 'Recipe Type')), _first_value(group, 'Percent Yield', 0)
+                    )
+                _add_lines(recipes[key], group)
+        else:
+            key = str(sheet_name).strip()
+            if key in recipes:
+                recipes[key]['errors'].append('Recipe defined more than once in the workbook')
+                continue
+            recipes[key] = _new_recipe(
+                key, _recipe_type(_first_value(df, 'Recipe Type')), _first_value(df, 'Percent Yield', 0)
+            )
+            _add_lines(recipes[key], df)
+
+    return list(recipes.values())
+
+
+def validate_recipes(conn, recipes):
+    """Resolve and validate every recipe in memory; returns recipes in dependency order.
+
+    Each line is resolved to ('ingredient' | 'subrecipe' | 'new_subrecipe', ref). Recipes that fail,
+    or depend on a workbook sub-recipe that failed, carry their reasons in recipe['errors'].
+    """
+    by_name = {r['name']: r for r in recipes}
+    new_subs = {r['name'] for r in recipes if r['type'] == SUB_RECIPE}
+
+    c = conn.cursor()
+    existing = {}
+    for recipe_type, table in ((CAKE, 'cakes'), (SUB_RECIPE, 'sub_recipes')):
+        names = [r['name'] for r in recipes if r['type'] == recipe_type]
+        existing[recipe_type] = set()
+        if names:
+            c.execute(f'SELECT name FROM {table} WHERE name IN ({placeholders(conn, len(names))})', tuple(names))
+            existing[recipe_type].update(row[0] for row in c.fetchall())
+
+    db_items = {item for r in recipes for item, _ in r['lines'] if item not in new_subs}
+    resolved, unknown = resolve_item_names(conn, db_items)
+
+    for recipe in recipes:
+        if recipe['name'] in existing[recipe['type']]:
+            recipe['errors'].append('A recipe with this name already exists')
+        if not recipe['lines']:
+            recipe['errors'].append('No ingredient lines')
+        recipe['resolved'] = []
+        for item, qty in recipe['lines']:
+            if item in new_subs:
+                if recipe['type'] == SUB_RECIPE and item == recipe['name']:
+                    recipe['errors'].append('Sub-recipe references itself')
+                recipe['resolved'].append((('new_subrecipe', item), qty))
+            elif item in resolved:
+                recipe['resolved'].append((resolved[item], qty))
+            else:
+                suggestions = unknown.get(item) or []
+                hint = f" (did you mean: {', '.join(s.strip() for s in suggestions)}?)" if suggestions else ''
+                recipe['errors'].append(f"Unknown item '{item}'{hint}")
+
+    deps = {r['name']: [ref for (kind, ref), _ in r['resolved'] if kind == 'new_subrecipe'] for r in recipes}
+    order, cyclic = topological_order(list(by_name), deps)
+    for name in cyclic:
+        by_name[name]['errors'].append('Part of a sub-recipe dependency cycle')
+
+    # Skip anything built on top of a sub-recipe that will not be loaded
+    for name in order:
+        recipe = by_name[name]
+        failed = [dep for dep in deps[name] if by_name[dep]['errors']]
+        if failed and not recipe['errors']:
+            recipe['errors'].append(f"Depends on invalid sub-recipe(s): {', '.join(failed)}")
+
+    return [by_name[name] for name in order + cyclic]
+
+
+def load_recipes(conn, recipes):
+    """Insert all valid recipes in a single transaction with batched inserts. Returns a stats dict."""
+    started = time.perf_counter()
+    valid = [r for r in recipes if not r['errors']]
+    p = placeholder(conn)
+    c = conn.cursor()
+
+    try:
+        subs = [r for r in valid if r['type'] == SUB_RECIPE]
+        cakes = [r for r in valid if r['type'] == CAKE]
+
+        sub_ids = {}
+        if subs:
+            c.executemany(f'INSERT INTO sub_recipes (name) VALUES ({p})', [(r['name'],) for r in subs])
+            names = [r['name'] for r in subs]
+            c.execute(f'SELECT name, id FROM sub_recipes WHERE name IN ({placeholders(conn, len(names))})', tuple(names))
+            sub_ids = dict(c.fetchall())
+
+        cake_ids = {}
+        if cakes:
+            c.executemany(
+                f'INSERT INTO cakes (name, percent_yield) VALUES ({p}, {p})',
+                [(r['name'], r['percent_yield']) for r in cakes]
+            )
+            names = [r['name'] for r in cakes]
+            c.execute(f'SELECT name, id FROM cakes WHERE name IN ({placeholders(conn, len(names))})', tuple(names))
+            cake_ids = dict(c.fetchall())
+
+        sub_ingredient_rows, sub_nested_rows, cake_rows = [], [], []
+        for recipe in valid:
+            for (kind, ref), qty in recipe['resolved']:
+                if kind == 'new_subrecipe':
+                    kind, ref = 'subrecipe', sub_ids[ref]
+                if recipe['type'] == SUB_RECIPE:
+                    parent_id = sub_ids[recipe['name']]
+                    if kind == 'ingredient':
+                        sub_ingredient_rows.append((parent_id, ref, qty))
+                    else:
+                        sub_nested_rows.append((parent_id, ref, qty))
+                else:
+                    cake_rows.append((cake_ids[recipe['name']], ref, 1 if kind == 'subrecipe' else 0, qty))
+
+        if sub_ingredient_rows:
+            c.executemany(
+                f'INSERT INTO sub_recipe_ingredients (sub_recipe_id, ingredient_id, quantity) VALUES ({p}, {p}, {p})',
+                sub_ingredient_rows
+            )
+        if sub_nested_rows:
+            c.executemany(
+                f'INSERT INTO sub_recipe_nested (parent_sub_recipe_id, sub_recipe_id, quantity) VALUES ({p}, {p}, {p})',
+                sub_nested_rows
+            )
+        if cake_rows:
+            c.executemany(
+                f'INSERT INTO cake_ingredients (cake_id, ingredient_or_subrecipe_id, is_subrecipe, quantity) VALUES ({p}, {p}, {p}, {p})',
+                cake_rows
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    line_count = len(sub_ingredient_rows) + len(sub_nested_rows) + len(cake_rows)
+    return {
+        'recipes': len(valid),
+        'lines': line_count,
+        'seconds': elapsed,
+        'recipes_per_second': len(valid) / elapsed if elapsed else 0.0,
+        'lines_per_second': line_count / elapsed if elapsed else 0.0,
+    }
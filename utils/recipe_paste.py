@@ -0,0 +1,64 @@
+from utils.fuzzy import TrigramIndex
+from utils.sql import placeholders
+
+
+def parse_paste_rows(paste_data):
+    """Parse "name<TAB>qty" (or "name qty") lines; returns (rows, errors) so every bad row is reported at once."""
+    parsed_rows = []
+    errors = []
+    for row in paste_data.strip().split('\n'):
+        row = row.strip()
+        if not row:
+            continue
+        if '\t' in row:
+            parts = row.split('\t')
+        else:
+            parts = row.rsplit(' ', 1)
+        if len(parts) != 2:
+            errors.append(f"Invalid row format: {row}")
+            continue
+        try:
+            parsed_rows.append((parts[0].strip(), float(parts[1].strip())))
+        except ValueError:
+            errors.append(f"Invalid quantity in row: {row}")
+    return parsed_rows, errors
+
+
+def _fetch_ids(conn, table, names):
+    if not names:
+        return {}
+    c = conn.cursor()
+    c.execute(f'SELECT name, id FROM {table} WHERE name IN ({placeholders(conn, len(names))})', tuple(names))
+    return {name: row_id for name, row_id in c.fetchall()}
+
+
+def resolve_item_names(conn, names):
+    """Resolve names to ingredient or sub-recipe ids with one IN (...) query per table.
+
+    Returns (resolved, unknown) where resolved maps name -> ('ingredient' | 'subrecipe', id)
+    and unknown maps each missing name to a list of close matches.
+    """
+    names = list(dict.fromkeys(names))
+    ingredient_ids = _fetch_ids(conn, 'ingredients', names)
+    remaining = [n for n in names if n not in ingredient_ids]
+    sub_recipe_ids = _fetch_ids(conn, 'sub_recipes', remaining)
+
+    resolved = {n: ('ingredient', i) for n, i in ingredient_ids.items()}
+    resolved.update({n: ('subrecipe', i) for n, i in sub_recipe_ids.items()})
+
+    missing = [n for n in names if n not in resolved]
+    unknown = {}
+    if missing:
+        c = conn.cursor()
+        c.execute('SELECT name FROM ingredients UNION ALL SELECT name FROM sub_recipes')
+        index = TrigramIndex(row[0] for row in c.fetchall() if row[0])
+        unknown = {n: index.suggest(n) for n in missing}
+    return resolved, unknown
+
+
+def format_unknown_names(unknown):
+    lines = []
+    for name, suggestions in unknown.items():
+        hint = f" — did you mean: {', '.join(s.strip() for s in suggestions)}?" if suggestions else ""
+        lines.append(f'- "{name}"{hint}')
+    return 'Items not found as Ingredient or Sub-Recipe:\n' + '\n'.join(lines)
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from datetime import datetime
+
+import pandas as pd
+
+from utils.reports import invalidate_transfer_reports
+from utils.sql import placeholder, placeholders
+
+
+def load_par_positions(conn, target_ids):
+    """Every ingredient × warehouse position with the effective par level, net of Pending transfers.
+
+    Target warehouses use their own par_level, falling back to the legacy warehouse.par_level;
+    source warehouses keep their own par_level (if any) as a floor they will not transfer below.
+    Quantities on Pending transfer orders count as already arriving at their target and already
+    gone from their source, so drafted orders are not drafted again before they are received.
+    """
+    target_ids = list(target_ids)
+    target_filter = f" OR wh.id IN ({placeholders(conn, len(target_ids))})" if target_ids else ''
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT wh.id, i.id, COALESCE(ws.quantity, 0), ws.par_level, w.par_level
+        FROM warehouses wh
+        CROSS JOIN ingredients i
+        LEFT JOIN warehouse_stock ws ON ws.warehouse_id = wh.id AND ws.ingredient_id = i.id
+        LEFT JOIN warehouse w ON w.ingredient_id = i.id
+        WHERE ws.warehouse_id IS NOT NULL{target_filter}
+    ''', tuple(target_ids))
+    df = pd.DataFrame(c.fetchall(), columns=['warehouse_id', 'ingredient_id', 'quantity', 'own_par', 'legacy_par'])
+    for col in ('quantity', 'own_par', 'legacy_par'):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    c.execute('''
+        SELECT t.source_warehouse_id, t.target_warehouse_id, toi.ingredient_id, SUM(toi.quantity)
+        FROM transfer_order_items toi
+        JOIN transfer_orders t ON t.id = toi.transfer_order_id
+        WHERE t.status = 'Pending'
+        GROUP BY t.source_warehouse_id, t.target_warehouse_id, toi.ingredient_id
+    ''')
+    pending = pd.DataFrame(c.fetchall(), columns=['source_id', 'target_id', 'ingredient_id', 'quantity'])
+    pending['quantity'] = pd.to_numeric(pending['quantity'], errors='coerce').fillna(0.0)
+    position = pd.MultiIndex.from_frame(df[['warehouse_id', 'ingredient_id']])
+    incoming = pending.groupby(['target_id', 'ingredient_id'])['quantity'].sum()
+    outgoing = pending.groupby(['source_id', 'ingredient_id'])['quantity'].sum()
+    df['incoming'] = incoming.reindex(position, fill_value=0.0).to_numpy()
+    df['outgoing'] = outgoing.reindex(position, fill_value=0.0).to_numpy()
+
+    is_target = df['warehouse_id'].isin(target_ids)
+    df['par_level'] = df['own_par'].where(df['own_par'] > 0, df['legacy_par'].where(is_target)).fillna(0.0)
+    # Rounded like the allocations, so a fully covered deficit does not linger as float noise
+    df['deficit'] = (df['par_level'] - df['quantity'] - df['incoming']).round(6).clip(lower=0.0).where(is_target, 0.0)
+    df['surplus'] = (df['quantity'] - df['outgoing'] - df['par_level']).round(6).clip(lower=0.0).where(~is_target, 0.0)
+    return df
+
+
+def allocate_transfers(positions):
+    """Greedy allocation per ingredient: largest deficits are served first from the largest surpluses."""
+    deficits = positions[positions['deficit'] > 0].sort_values('deficit', ascending=False)
+    surpluses = positions[positions['surplus'] > 0].sort_values('surplus', ascending=False)
+    available = defaultdict(list)
+    for row in surpluses.itertuples(index=False):
+        available[row.ingredient_id].append([row.warehouse_id, row.surplus])
+
+    allocations = []
+    for row in deficits.itertuples(index=False):
+        need = row.deficit
+        for source in available.get(row.ingredient_id, ()):
+            if need <= 0:
+                break
+            qty = round(min(need, source[1]), 6)
+            if qty <= 0:
+                continue
+            allocations.append((source[0], row.warehouse_id, row.ingredient_id, qty))
+            source[1] -= qty
+            need -= qty
+
+    return pd.DataFrame(allocations, columns=['source_warehouse_id', 'target_warehouse_id', 'ingredient_id', 'quantity'])
+
+
+def draft_transfer_orders(conn, allocations):
+    """Create one Pending transfer order per source → target route and batch-insert its items."""
+    if allocations.empty:
+        return []
+    p = placeholder(conn)
+    c = conn.cursor()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    order_ids = []
+    items = []
+    try:
+        for (source_id, target_id), group in allocations.groupby(['source_warehouse_id', 'target_warehouse_id']):
+            c.execute(
+                f"INSERT INTO transfer_orders (source_warehouse_id, target_warehouse_id, status, created_at) VALUES ({p}, {p}, 'Pending', {p})",
+                (int(source_id), int(target_id), now)
+            )
+            order_id = c.lastrowid
+            order_ids.append(order_id)
+            items.extend((order_id, int(r.ingredient_id), float(r.quantity)) for r in group.itertuples(index=False))
+        c.executemany(
+            f'INSERT INTO transfer_order_items (transfer_order_id, ingredient_id, quantity) VALUES ({p}, {p}, {p})',
+            items
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_transfer_reports()
+    return order_ids
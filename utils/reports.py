@@ -0,0 +1,125 @@
+import pandas as pd
+
+from utils.sql import is_sqlite, placeholder
+
+# Transfer datasets are re-read on every Streamlit rerun (each filter change), but only
+# change when an order is created or received; writers call invalidate_transfer_reports().
+_TRANSFER_CACHE = {}
+
+
+def invalidate_transfer_reports():
+    _TRANSFER_CACHE.clear()
+
+
+def _cached(conn, name, loader):
+    key = ('sqlite' if is_sqlite(conn) else 'mysql', name)
+    if key not in _TRANSFER_CACHE:
+        _TRANSFER_CACHE[key] = loader()
+    return _TRANSFER_CACHE[key].copy()
+
+
+def transfer_orders_frame(conn):
+    return _cached(conn, 'orders', lambda: pd.read_sql_query('''
+        SELECT t.id AS order_id, ws.name AS source, wt.name AS target, t.status, t.created_at
+        FROM transfer_orders t
+        JOIN warehouses ws ON t.source_warehouse_id = ws.id
+        JOIN warehouses wt ON t.target_warehouse_id = wt.id
+        ORDER BY t.created_at DESC
+    ''', conn))
+
+
+def transfer_items_frame(conn):
+    """Every transfer line with its order's status, date and warehouses, created_at parsed."""
+    def load():
+        df = pd.read_sql_query('''
+            SELECT toi.ingredient_id, i.name AS ingredient, t.status, t.created_at,
+                   ws.name AS source, wt.name AS target,
+                   toi.quantity AS sent, toi.accepted_qty, toi.returned_qty, toi.wasted_qty
+            FROM transfer_order_items toi
+            JOIN transfer_orders t ON t.id = toi.transfer_order_id
+            JOIN warehouses ws ON t.source_warehouse_id = ws.id
+            JOIN warehouses wt ON t.target_warehouse_id = wt.id
+            JOIN ingredients i ON toi.ingredient_id = i.id
+        ''', conn)
+        df['created_at'] = pd.to_datetime(df['created_at'])
+        return df
+    return _cached(conn, 'items', load)
+
+
+def transfer_summaries(items):
+    """Per-ingredient movement and per-warehouse sent/received totals for a transfer_items_frame slice."""
+    by_ingredient = items.groupby("ingredient")[["sent", "accepted_qty", "returned_qty", "wasted_qty"]].sum()
+    sent = items.groupby("source")[["sent"]].sum().rename(columns={"sent": "total_sent"})
+    received = items.groupby("target")[["accepted_qty"]].sum().rename(columns={"accepted_qty": "total_received"})
+    return by_ingredient, sent.join(received, how="outer").fillna(0)
+
+
+def waste_summary_frame(conn):
+    """transfer_waste_weekly with warehouse, route, receiver and ingredient names, week parsed."""
+    def load():
+        df = pd.read_sql_query('''
+            SELECT tw.week, ws.name AS source, wt.name AS target, tw.received_by AS receiver,
+                   i.name AS ingredient, i.unit, tw.sent, tw.accepted, tw.returned, tw.wasted
+            FROM transfer_waste_weekly tw
+            JOIN warehouses ws ON tw.source_warehouse_id = ws.id
+            JOIN warehouses wt ON tw.target_warehouse_id = wt.id
+            JOIN ingredients i ON tw.ingredient_id = i.id
+        ''', conn)
+        df['week'] = pd.to_datetime(df['week'])
+        df['route'] = df['source'] + ' → ' + df['target']
+        df['receiver'] = df['receiver'].replace('', 'Unknown')
+        for col in ('sent', 'accepted', 'returned', 'wasted'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+        return df
+    return _cached(conn, 'waste', load)
+
+
+def order_items_frame(conn, order_id):
+    return pd.read_sql_query(f'''
+        SELECT i.name AS ingredient, toi.quantity AS sent, toi.accepted_qty, toi.returned_qty, toi.wasted_qty
+        FROM transfer_order_items toi
+        JOIN ingredients i ON toi.ingredient_id = i.id
+        WHERE toi.transfer_order_id = {placeholder(conn)}
+    ''', conn, params=(order_id,))
+
+
+def stock_report_frame(conn):
+    df = pd.read_sql_query('''
+        SELECT i.name AS ingredient, i.unit, ic.name AS category, w.quantity, w.par_level, w.last_updated
+        FROM warehouse w
+        JOIN ingredients i ON w.ingredient_id = i.id
+        LEFT JOIN inventory_categories ic ON w.category_id = ic.id
+        ORDER BY i.name
+    ''', conn)
+    df['last_updated'] = pd.to_datetime(df['last_updated'], errors='coerce')
+    return df
+
+
+def warehouse_overview_frame(conn, category='All'):
+    """Legacy per-ingredient stock with category filtering and the low-stock flag evaluated in SQL."""
+    p = placeholder(conn)
+    return pd.read_sql_query(f'''
+        SELECT i.name AS "Ingredient",
+               COALESCE(ic.name, 'Uncategorized') AS "Category",
+               ROUND(COALESCE(w.quantity, 0), 2) AS "Stock",
+               ROUND(COALESCE(w.par_level, 0), 2) AS "Par Level",
+               i.unit AS "Unit",
+               COALESCE(w.last_updated, 'N/A') AS "Last Updated",
+               CASE WHEN COALESCE(w.quantity, 0) < COALESCE(w.par_level, 0) THEN '🔴 LOW!' ELSE '' END AS "Alert"
+        FROM ingredients i
+        LEFT JOIN warehouse w ON i.id = w.ingredient_id
+        LEFT JOIN inventory_categories ic ON w.category_id = ic.id
+        WHERE {p} = 'All' OR COALESCE(ic.name, 'Uncategorized') = {p}
+    ''', conn, params=(category, category))
+
+
+def low_stock_alerts_frame(conn):
+    return pd.read_sql_query('''
+        SELECT wh.name AS "Warehouse", i.name AS "Ingredient", i.unit AS "Unit",
+               ROUND(a.quantity, 2) AS "Stock", ROUND(a.par_level, 2) AS "Par Level",
+               ROUND(a.par_level - a.quantity, 2) AS "Below Par By", a.updated_at AS "Since"
+        FROM low_stock_alerts a
+        JOIN warehouses wh ON wh.id = a.warehouse_id
+        JOIN ingredients i ON i.id = a.ingredient_id
+        ORDER BY wh.name, a.par_level - a.quantity DESC
+    ''', conn)
@@ -0,0 +1,137 @@
+from utils.fuzzy import PrefixTrie, normalize_name
+from utils.sql import is_sqlite, placeholder
+
+# Catalogue tables with a searchable `name`
+SEARCH_TABLES = ('ingredients', 'cakes', 'sub_recipes')
+SEARCH_LIMIT = 50
+# Queries up to this many characters are word-prefix lookups in the in-memory trie; longer ones
+# go to the full-text index (FTS5 trigrams need at least three characters)
+TRIE_DEPTH = 4
+
+# (backend, table) -> (fingerprint, PrefixTrie); a fingerprint change (rows added or deleted)
+# rebuilds the trie, renames go through invalidate_name_search(), which every recipe writer
+# reaches through invalidate_recipe_index()
+_TRIE_CACHE = {}
+_READY = set()
+
+
+def invalidate_name_search(table=None):
+    for key in list(_TRIE_CACHE):
+        if table is None or key[1] == table:
+            del _TRIE_CACHE[key]
+
+
+def _backend(conn):
+    return 'sqlite' if is_sqlite(conn) else 'mysql'
+
+
+def ensure_search_index(conn, table):
+    """Add the generated name_normalized column, its index and the full-text index to a catalogue table.
+
+    SQLite gets an external-content FTS5 trigram table kept in sync by triggers; MySQL gets a
+    FULLTEXT index with the ngram parser. Run from the schema set-up paths (warehouse.init_db()
+    for MySQL, ensure_stock_schema() for the SQLite warehouse database); search_names() only reads.
+    """
+    if (_backend(conn), table) in _READY:
+        return
+    c = conn.cursor()
+    if is_sqlite(conn):
+        c.execute(f"PRAGMA table_xinfo({table})")
+        if 'name_normalized' not in [row[1] for row in c.fetchall()]:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN name_normalized TEXT "
+                      f"GENERATED ALWAYS AS (lower(trim(name))) VIRTUAL")
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_name_normalized ON {table}(name_normalized)")
+        c.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f"{table}_fts",))
+        if c.fetchone() is None:
+            c.execute(f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+                      f"name, content='{table}', content_rowid='id', tokenize='trigram')")
+            c.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name);
+            END
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            END
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF name ON {table} BEGIN
+                INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name);
+            END
+        ''')
+    else:
+        c.execute(f"SHOW COLUMNS FROM {table}")
+        if 'name_normalized' not in [row[0] for row in c.fetchall()]:
+            c.execute(f'''
+                ALTER TABLE {table}
+                    ADD COLUMN name_normalized VARCHAR(255) GENERATED ALWAYS AS (LOWER(TRIM(name))) STORED,
+                    ADD INDEX idx_{table}_name_normalized (name_normalized),
+                    ADD FULLTEXT INDEX ft_{table}_name (name) WITH PARSER ngram
+            ''')
+    conn.commit()
+    _READY.add((_backend(conn), table))
+
+
+def _name_trie(conn, table):
+    c = conn.cursor()
+    c.execute(f"SELECT COUNT(*), MAX(id) FROM {table}")
+    fingerprint = c.fetchone()
+    key = (_backend(conn), table)
+    cached = _TRIE_CACHE.get(key)
+    if cached is None or cached[0] != fingerprint:
+        c.execute(f"SELECT id, name FROM {table} WHERE name IS NOT NULL")
+        cached = _TRIE_CACHE[key] = (fingerprint, PrefixTrie.build(c.fetchall(), TRIE_DEPTH, SEARCH_LIMIT))
+    return cached[1]
+
+
+def search_names(conn, table, text, limit=SEARCH_LIMIT):
+    """Ranked [(id, name)] of `table` rows whose name contains `text`, best match first.
+
+    Exact names rank first, then names starting with the text, then names with a word starting
+    with it, then shorter names. Short queries match word prefixes only. Needs the columns and
+    indexes from ensure_search_index().
+    """
+    query = normalize_name(text)
+    if not query:
+        return []
+    c = conn.cursor()
+    p = placeholder(conn)
+
+    if len(query) <= TRIE_DEPTH and ' ' not in query:
+        ids = _name_trie(conn, table).lookup(query, limit)
+        if not ids:
+            return []
+        c.execute(f"SELECT id, name FROM {table} WHERE id IN ({', '.join([p] * len(ids))})", tuple(ids))
+        names = dict(c.fetchall())
+        return [(ing_id, names[ing_id]) for ing_id in ids if ing_id in names]
+
+    phrase = '"' + query.replace('"', '""') + '"'
+    if is_sqlite(conn):
+        source = f"{table}_fts f JOIN {table} t ON t.id = f.rowid"
+        match = f"{table}_fts MATCH {p}"
+    else:
+        source = f"{table} t"
+        match = f"MATCH(t.name) AGAINST ({p} IN BOOLEAN MODE)"
+    c.execute(f'''
+        SELECT t.id, t.name
+        FROM {source}
+        WHERE {match} AND INSTR(t.name_normalized, {p}) > 0
+        ORDER BY
+            CASE
+                WHEN t.name_normalized = {p} THEN 0
+                WHEN INSTR(t.name_normalized, {p}) = 1 THEN 1
+                WHEN INSTR(t.name_normalized, {p}) > 0 THEN 2
+                ELSE 3
+            END,
+            LENGTH(t.name), t.name
+        LIMIT {int(limit)}
+    ''', (phrase, query, query, query, ' ' + query))
+    return c.fetchall()
+
+
+def ranked_ids(conn, table, text, limit=SEARCH_LIMIT):
+    """{id: rank} of search_names() matches, for ordering rows a page already fetched."""
+    return {row_id: rank for rank, (row_id, _) in enumerate(search_names(conn, table, text, limit))}
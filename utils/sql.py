@@ -0,0 +1,16 @@
+import sqlite3
+
+from utils.query_stats import raw_connection
+
+
+def is_sqlite(conn):
+    return isinstance(raw_connection(conn), sqlite3.Connection)
+
+
+def placeholder(conn):
+    # sqlite3 uses qmark params, mysql.connector uses format params
+    return '?' if is_sqlite(conn) else '%s'
+
+
+def placeholders(conn, count):
+    return ', '.join([placeholder(conn)] * count)
@@ -0,0 +1,375 @@
+import random
+from datetime import datetime
+
+import pandas as pd
+
+from utils.cost_layers import ensure_cost_layers, post_cost_movements, seed_cost_layers
+from utils.search import ensure_search_index
+from utils.sql import is_sqlite, placeholder, placeholders
+
+
+# Effective par level of a warehouse_stock row: its own par, else the legacy per-ingredient par
+EFFECTIVE_PAR_SQL = 'COALESCE(NULLIF(ws.par_level, 0), w.par_level, 0)'
+
+# Compare-and-swap attempts before an absolute stock write gives up on a contended row
+MAX_CAS_RETRIES = 5
+
+# backend -> (fingerprint, matrix, low) for stock_matrix(). Every stock write, from any process,
+# logs a movement, so the newest movement id (plus the warehouse and ingredient counts) is the
+# stock version the cache is keyed on. Par level and category edits go through
+# invalidate_stock_matrix(); ingredient renames and prices are not edited in the warehouse database,
+# so the Stock Matrix page has a refresh button for changes made outside the app
+_MATRIX_CACHE = {}
+
+
+class StockConflictError(RuntimeError):
+    """Raised when stock rows kept changing underneath an absolute write."""
+
+    def __init__(self, warehouse_id, ingredient_ids):
+        self.warehouse_id = warehouse_id
+        self.ingredient_ids = list(ingredient_ids)
+        super().__init__(f"Stock for ingredient(s) {self.ingredient_ids} in warehouse {warehouse_id} "
+                         f"changed {MAX_CAS_RETRIES} times while saving; reload and try again.")
+
+
+def _columns(conn, table):
+    c = conn.cursor()
+    if is_sqlite(conn):
+        c.execute(f"PRAGMA table_info({table})")
+        return [row[1] for row in c.fetchall()]
+    c.execute(f"SHOW COLUMNS FROM {table}")
+    return [row[0] for row in c.fetchall()]
+
+
+def _table_exists(conn, table):
+    c = conn.cursor()
+    if is_sqlite(conn):
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    else:
+        c.execute("SHOW TABLES LIKE %s", (table,))
+    return c.fetchone() is not None
+
+
+def ensure_stock_schema(conn):
+    c = conn.cursor()
+    if "par_level" not in _columns(conn, "warehouse_stock"):
+        c.execute("ALTER TABLE warehouse_stock ADD COLUMN par_level REAL")
+    if "version" not in _columns(conn, "warehouse_stock"):
+        c.execute(f"ALTER TABLE warehouse_stock ADD COLUMN version {'INTEGER' if is_sqlite(conn) else 'BIGINT'} DEFAULT 0")
+
+    backfill_alerts = not _table_exists(conn, "low_stock_alerts")
+    seed_costs = not _table_exists(conn, "inventory_costs")
+    ensure_cost_layers(conn)
+    if seed_costs:
+        seed_cost_layers(conn)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS low_stock_alerts (
+            warehouse_id INTEGER,
+            ingredient_id INTEGER,
+            quantity REAL,
+            par_level REAL,
+            updated_at TEXT,
+            PRIMARY KEY (warehouse_id, ingredient_id)
+        )
+    """)
+    if backfill_alerts:
+        refresh_low_stock_alerts(conn)
+    conn.commit()
+    # The warehouse pages search ingredients in the SQLite database; MySQL catalogue tables get
+    # their search index in warehouse.init_db()
+    if is_sqlite(conn):
+        ensure_search_index(conn, 'ingredients')
+
+
+def refresh_low_stock_alerts(conn, warehouse_id=None, ingredient_ids=None):
+    """Re-evaluate alerts for the given positions only (or everything when no filter is given).
+
+    Does not commit; stock writers call it inside their own transaction.
+    """
+    p = placeholder(conn)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    where, params = [], []
+    if warehouse_id is not None:
+        where.append(f"warehouse_id = {p}")
+        params.append(warehouse_id)
+    if ingredient_ids is not None:
+        ingredient_ids = list(ingredient_ids)
+        if not ingredient_ids:
+            return
+        where.append(f"ingredient_id IN ({placeholders(conn, len(ingredient_ids))})")
+        params.extend(ingredient_ids)
+
+    c = conn.cursor()
+    delete_filter = f" WHERE {' AND '.join(where)}" if where else ''
+    c.execute(f"DELETE FROM low_stock_alerts{delete_filter}", tuple(params))
+
+    select_filter = ''.join(f" AND ws.{clause}" for clause in where)
+    c.execute(f'''
+        INSERT INTO low_stock_alerts (warehouse_id, ingredient_id, quantity, par_level, updated_at)
+        SELECT ws.warehouse_id, ws.ingredient_id, ws.quantity, {EFFECTIVE_PAR_SQL}, {p}
+        FROM warehouse_stock ws
+        LEFT JOIN warehouse w ON w.ingredient_id = ws.ingredient_id
+        WHERE ws.quantity < {EFFECTIVE_PAR_SQL}{select_filter}
+    ''', (now, *params))
+
+
+def low_stock_alert_count(conn):
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM low_stock_alerts")
+    return c.fetchone()[0]
+
+
+def _new_version():
+    # A random token rather than a counter: after a batch of compare-and-swap updates, the rows
+    # carrying this call's token are exactly the ones it wrote
+    return random.getrandbits(62)
+
+
+def _delta_upsert_sql(conn):
+    p = placeholder(conn)
+    if is_sqlite(conn):
+        return f'''
+            INSERT INTO warehouse_stock (warehouse_id, ingredient_id, quantity, version)
+            VALUES ({p}, {p}, {p}, {p})
+            ON CONFLICT(warehouse_id, ingredient_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                version = excluded.version
+        '''
+    return f'''
+        INSERT INTO warehouse_stock (warehouse_id, ingredient_id, quantity, version)
+        VALUES ({p}, {p}, {p}, {p})
+        ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity), version = VALUES(version)
+    '''
+
+
+def _log_movements(conn, warehouse_id, rows, reason, timestamp, unit_costs=None):
+    p = placeholder(conn)
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    change_col = 'change' if is_sqlite(conn) else '`change`'
+    conn.cursor().executemany(
+        f'INSERT INTO stock_movements (ingredient_id, warehouse_id, {change_col}, reason, timestamp) VALUES ({p}, {p}, {p}, {p}, {p})',
+        [(ing_id, warehouse_id, change, reason, timestamp) for ing_id, change in rows]
+    )
+    refresh_low_stock_alerts(conn, warehouse_id, [ing_id for ing_id, _ in rows])
+    return post_cost_movements(conn, warehouse_id, rows, unit_costs, timestamp)
+
+
+def apply_stock_deltas(conn, warehouse_id, deltas, reason, timestamp=None, unit_costs=None):
+    """Add `deltas` (ingredient_id -> change) to a warehouse and log them to stock_movements.
+
+    Increments are applied in the database, so concurrent deltas never overwrite each other; each
+    touched row gets a new version so pending absolute edits of it notice the change. Increases
+    open cost lots at `unit_costs` ({ingredient_id: unit cost}, default the average cost) and
+    decreases draw the oldest lots, see utils.cost_layers.
+    Does not commit, so callers can fold it into a larger transaction.
+    """
+    rows = [(int(ing_id), float(change)) for ing_id, change in deltas.items() if change]
+    if not rows:
+        return 0
+    version = _new_version()
+    conn.cursor().executemany(_delta_upsert_sql(conn), [(warehouse_id, ing_id, change, version) for ing_id, change in rows])
+    _log_movements(conn, warehouse_id, rows, reason, timestamp, unit_costs)
+    return len(rows)
+
+
+def record_receipt(conn, warehouse_id, ingredient_id, quantity, unit_price, supplier=None, timestamp=None):
+    """Book a purchase receipt: the stock arrives as a new cost lot at the lot's own price.
+
+    Returns the receipt id. Does not commit.
+    """
+    p = placeholder(conn)
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    c = conn.cursor()
+    c.execute(
+        f'INSERT INTO purchase_receipts (warehouse_id, ingredient_id, quantity, unit_price, supplier, received_at) VALUES ({p}, {p}, {p}, {p}, {p}, {p})',
+        (warehouse_id, int(ingredient_id), float(quantity), float(unit_price), supplier, timestamp)
+    )
+    receipt_id = c.lastrowid
+    apply_stock_deltas(conn, warehouse_id, {ingredient_id: quantity}, f'Receipt #{receipt_id}', timestamp,
+                       unit_costs={int(ingredient_id): float(unit_price)})
+    return receipt_id
+
+
+def read_stock_versions(conn, warehouse_id, ingredient_ids=None, for_update=False):
+    """{ingredient_id: (quantity, version)} for a warehouse's existing stock rows.
+
+    `for_update` makes it a locking read on MySQL. A plain SELECT under InnoDB's REPEATABLE READ
+    returns the transaction's first snapshot again, so a compare-and-swap retry would re-read the
+    stale version forever; SELECT ... FOR UPDATE reads the latest committed row and holds it until
+    commit. SQLite has no row locks and always reads the latest data, so the flag is ignored there.
+    """
+    p = placeholder(conn)
+    sql = f'SELECT ingredient_id, quantity, version FROM warehouse_stock WHERE warehouse_id = {p}'
+    params = [warehouse_id]
+    if ingredient_ids is not None:
+        ingredient_ids = list(ingredient_ids)
+        if not ingredient_ids:
+            return {}
+        sql += f' AND ingredient_id IN ({placeholders(conn, len(ingredient_ids))})'
+        params.extend(ingredient_ids)
+    if for_update and not is_sqlite(conn):
+        sql += ' FOR UPDATE'
+    c = conn.cursor()
+    c.execute(sql, tuple(params))
+    return {ing_id: (float(qty or 0), version or 0) for ing_id, qty, version in c.fetchall()}
+
+
+def _compare_and_swap(conn, warehouse_id, targets, seen):
+    """Write {ingredient_id: quantity} only where the row still has the version in `seen`.
+
+    Ingredients missing from `seen` had no row and are inserted unless one appeared meanwhile.
+    Returns the set of ingredient ids actually written.
+    """
+    p = placeholder(conn)
+    version = _new_version()
+    updates = [(qty, version, warehouse_id, ing_id, seen[ing_id][1]) for ing_id, qty in targets.items() if ing_id in seen]
+    inserts = [(warehouse_id, ing_id, qty, version) for ing_id, qty in targets.items() if ing_id not in seen]
+    c = conn.cursor()
+    written = 0
+    if updates:
+        c.executemany(
+            f'UPDATE warehouse_stock SET quantity = {p}, version = {p} '
+            f'WHERE warehouse_id = {p} AND ingredient_id = {p} AND COALESCE(version, 0) = {p}',
+            updates
+        )
+        written += c.rowcount
+    if inserts:
+        ignore = 'OR IGNORE' if is_sqlite(conn) else 'IGNORE'
+        c.executemany(
+            f'INSERT {ignore} INTO warehouse_stock (warehouse_id, ingredient_id, quantity, version) VALUES ({p}, {p}, {p}, {p})',
+            inserts
+        )
+        written += c.rowcount
+    if written == len(targets):
+        return set(targets)
+    c.execute(f'SELECT ingredient_id FROM warehouse_stock WHERE warehouse_id = {p} AND version = {p}', (warehouse_id, version))
+    return {ing_id for ing_id, in c.fetchall()} & set(targets)
+
+
+def set_stock_levels(conn, warehouse_id, levels, reason, timestamp=None):
+    """Set absolute quantities ({ingredient_id: quantity}) for a warehouse, e.g. from a stock count upload.
+
+    Each row is compare-and-swapped against the version it was read at; rows changed by a
+    concurrent writer in between are re-read and retried, and the logged movement is the
+    difference from the quantity actually replaced. Retries re-read with a locking read, without
+    which the loop could only converge on SQLite (see read_stock_versions). Raises
+    StockConflictError if rows are still contended after MAX_CAS_RETRIES attempts. Does not commit.
+    """
+    pending = {int(ing_id): float(qty) for ing_id, qty in levels.items()}
+    moved = []
+    for attempt in range(MAX_CAS_RETRIES):
+        seen = read_stock_versions(conn, warehouse_id, pending, for_update=attempt > 0)
+        targets = {ing_id: qty for ing_id, qty in pending.items() if qty != seen.get(ing_id, (0.0, 0))[0]}
+        if not targets:
+            pending = {}
+            break
+        written = _compare_and_swap(conn, warehouse_id, targets, seen)
+        moved.extend((ing_id, targets[ing_id] - seen.get(ing_id, (0.0, 0))[0]) for ing_id in written)
+        pending = {ing_id: qty for ing_id, qty in targets.items() if ing_id not in written}
+        if not pending:
+            break
+    if pending:
+        raise StockConflictError(warehouse_id, pending)
+    if moved:
+        _log_movements(conn, warehouse_id, moved, reason, timestamp)
+    return len(moved)
+
+
+def update_stock_level(conn, warehouse_id, ingredient_id, seen_quantity, seen_version, new_quantity, reason, timestamp=None):
+    """Apply one clerk's edit of a single stock row, made while looking at (seen_quantity, seen_version).
+
+    If the row changed since, the clerk's adjustment (new - seen) is rebased onto the current
+    quantity instead of overwriting the other writer; `seen_version` None means there was no row.
+    The current row is re-read with a locking read, as in set_stock_levels(). Returns (quantity_written, rebased). Raises StockConflictError after MAX_CAS_RETRIES attempts.
+    Does not commit.
+    """
+    change = float(new_quantity) - float(seen_quantity)
+    if not change:
+        return float(seen_quantity), False
+    base = (float(seen_quantity), seen_version)
+    for attempt in range(MAX_CAS_RETRIES):
+        target = base[0] + change
+        seen = {ingredient_id: base} if base[1] is not None else {}
+        if _compare_and_swap(conn, warehouse_id, {ingredient_id: target}, seen):
+            _log_movements(conn, warehouse_id, [(ingredient_id, change)], reason, timestamp)
+            return target, attempt > 0
+        base = read_stock_versions(conn, warehouse_id, [ingredient_id], for_update=True).get(ingredient_id, (0.0, None))
+    raise StockConflictError(warehouse_id, [ingredient_id])
+
+
+def parse_stock_upload(df):
+    """{ingredient_id: quantity} from an uploaded stock count with ingredient_id/quantity columns.
+
+    Returns (levels, skipped) where skipped counts rows with a missing or non-numeric value.
+    Raises ValueError if either column is missing.
+    """
+    if not {"ingredient_id", "quantity"}.issubset(df.columns):
+        raise ValueError("Stock file must include 'ingredient_id' and 'quantity' columns.")
+    ids = pd.to_numeric(df["ingredient_id"], errors="coerce")
+    quantities = pd.to_numeric(df["quantity"], errors="coerce")
+    valid = ids.notna() & quantities.notna()
+    return dict(zip(ids[valid].astype(int), quantities[valid])), int((~valid).sum())
+
+
+def iter_stock_levels(conn, warehouse_id):
+    """Yield (ingredient_id, ingredient_name, quantity) for every ingredient in a warehouse, by name."""
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT i.id, i.name, COALESCE(ws.quantity, 0)
+        FROM ingredients i
+        LEFT JOIN warehouse_stock ws ON i.id = ws.ingredient_id AND ws.warehouse_id = {placeholder(conn)}
+        ORDER BY i.name
+    ''', (warehouse_id,))
+    yield from c
+
+
+def invalidate_stock_matrix():
+    _MATRIX_CACHE.clear()
+
+
+def stock_matrix(conn):
+    """Every ingredient's quantity in every warehouse, pivoted in one conditional-aggregation query.
+
+    Returns (matrix, low). matrix has ingredient_id, ingredient, unit, category, price, one column
+    per warehouse name (NaN where the warehouse holds no row) and Total; low has the same index
+    and warehouse columns, True where the position is below its effective par (as in low_stock_alerts).
+    """
+    c = conn.cursor()
+    c.execute("""
+        SELECT (SELECT MAX(id) FROM stock_movements), (SELECT COUNT(*) FROM warehouses),
+               (SELECT COUNT(*) FROM ingredients)
+    """)
+    fingerprint = c.fetchone()
+    key = 'sqlite' if is_sqlite(conn) else 'mysql'
+    cached = _MATRIX_CACHE.get(key)
+    if cached is None or cached[0] != fingerprint:
+        c.execute("SELECT id, name FROM warehouses ORDER BY name")
+        warehouses = c.fetchall()
+        p = placeholder(conn)
+        pivot = ''.join(
+            f",\n SUM(CASE WHEN ws.warehouse_id = {p} THEN ws.quantity END) AS q_{n}"
+            f",\n MAX(CASE WHEN ws.warehouse_id = {p} AND ws.quantity < {EFFECTIVE_PAR_SQL} THEN 1 ELSE 0 END) AS low_{n}"
+            for n in range(len(warehouses))
+        )
+        c.execute(f'''
+            SELECT i.id, i.name, i.unit, COALESCE(ic.name, 'Uncategorized'), COALESCE(i.price_per_unit, 0){pivot}
+            FROM ingredients i
+            LEFT JOIN warehouse_stock ws ON ws.ingredient_id = i.id
+            LEFT JOIN warehouse w ON w.ingredient_id = i.id
+            LEFT JOIN inventory_categories ic ON ic.id = w.category_id
+            GROUP BY i.id, i.name, i.unit, ic.name, i.price_per_unit
+            ORDER BY i.name
+        ''', tuple(wid for wid, _ in warehouses for _ in range(2)))
+        names = [name for _, name in warehouses]
+        rows = pd.DataFrame(c.fetchall(), columns=['ingredient_id', 'ingredient', 'unit', 'category', 'price']
+                            + [f'{kind}_{n}' for n in range(len(warehouses)) for kind in ('q', 'low')])
+        matrix = rows[['ingredient_id', 'ingredient', 'unit', 'category']].assign(
+            price=pd.to_numeric(rows['price'], errors='coerce').fillna(0.0))
+        for n, name in enumerate(names):
+            matrix[name] = pd.to_numeric(rows[f'q_{n}'], errors='coerce')
+        matrix['Total'] = matrix[names].sum(axis=1)
+        low = pd.DataFrame({name: pd.to_numeric(rows[f'low_{n}']).fillna(0).astype(bool) for n, name in enumerate(names)},
+                           index=matrix.index)
+        cached = _MATRIX_CACHE[key] = (fingerprint, matrix, low)
+    return cached[1].copy(), cached[2].copy()
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from utils.sql import placeholders
+
+
+def load_stock_matrix(conn, ingredient_ids):
+    """Stock of the given ingredients in every warehouse, as an ingredient × warehouse frame (single stock query)."""
+    ingredient_ids = list(dict.fromkeys(ingredient_ids))
+    c = conn.cursor()
+    c.execute('SELECT id, name FROM warehouses')
+    warehouses = dict(c.fetchall())
+    if not ingredient_ids:
+        return pd.DataFrame(columns=list(warehouses), dtype=float), warehouses
+
+    c.execute(f'''
+        SELECT ws.ingredient_id, ws.warehouse_id, ws.quantity
+        FROM warehouse_stock ws
+        JOIN warehouses w ON w.id = ws.warehouse_id
+        WHERE ws.ingredient_id IN ({placeholders(conn, len(ingredient_ids))})
+    ''', tuple(ingredient_ids))
+    rows = pd.DataFrame(c.fetchall(), columns=['ingredient_id', 'warehouse_id', 'quantity'])
+    rows['quantity'] = rows['quantity'].astype(float)
+    matrix = rows.pivot_table(index='ingredient_id', columns='warehouse_id', values='quantity', aggfunc='sum')
+    matrix = matrix.reindex(index=ingredient_ids, columns=list(warehouses)).fillna(0.0)
+    return matrix, warehouses
+
+
+def net_requirements(requirements, stock, target_warehouse_id):
+    """Net requirement columns (one per candidate plan) against the target warehouse's stock.
+
+    `requirements` is an ingredient × plan frame; returns the shortfall frame with the same shape.
+    """
+    on_hand = stock[target_warehouse_id] if target_warehouse_id in stock.columns else 0.0
+    required = requirements.reindex(stock.index).fillna(0.0)
+    return required.sub(on_hand, axis=0).clip(lower=0.0)
+
+
+def suggest_transfers(shortfall, stock, target_warehouse_id):
+    """Cover a single shortfall vector from other warehouses, drawing from the largest stock first."""
+    sources = stock.drop(columns=[target_warehouse_id], errors='ignore')
+    sources = sources.loc[shortfall[shortfall > 0].index]
+    if sources.empty or sources.shape[1] == 0:
+        return pd.DataFrame(columns=['ingredient_id', 'warehouse_id', 'quantity'])
+
+    long = sources.stack().rename('available').reset_index()
+    long.columns = ['ingredient_id', 'warehouse_id', 'available']
+    long = long[long['available'] > 0].sort_values(['ingredient_id', 'available'], ascending=[True, False])
+
+    need = long['ingredient_id'].map(shortfall).to_numpy()
+    available = long['available'].to_numpy()
+    drawn_before = long.groupby('ingredient_id')['available'].cumsum().to_numpy() - available
+    long['quantity'] = np.clip(need - drawn_before, 0.0, available)
+    return long.loc[long['quantity'] > 0, ['ingredient_id', 'warehouse_id', 'quantity']]
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from utils.cost_layers import fifo_issue_cost
+from utils.reports import invalidate_transfer_reports
+from utils.sql import placeholder
+from utils.stock import apply_stock_deltas, read_stock_versions
+from utils.waste import post_waste_summary
+
+
+class InsufficientStockError(ValueError):
+    """Raised when a received order would take more stock out of its source than the source holds."""
+
+    def __init__(self, warehouse_id, shortages):
+        self.warehouse_id = warehouse_id
+        self.shortages = shortages
+        super().__init__(f"Warehouse {warehouse_id} does not hold the sent quantity of ingredient(s) "
+                         f"{sorted(shortages)}; correct its stock or the order before receiving it.")
+
+
+def create_transfer_order(conn, source_id, target_id, items, timestamp=None):
+    """Create a Pending transfer order with its (ingredient_id, quantity) items in one transaction."""
+    p = placeholder(conn)
+    c = conn.cursor()
+    now = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        c.execute(
+            f"INSERT INTO transfer_orders (source_warehouse_id, target_warehouse_id, status, created_at) VALUES ({p}, {p}, 'Pending', {p})",
+            (source_id, target_id, now)
+        )
+        order_id = c.lastrowid
+        c.executemany(
+            f'INSERT INTO transfer_order_items (transfer_order_id, ingredient_id, quantity) VALUES ({p}, {p}, {p})',
+            [(order_id, int(ing_id), float(qty)) for ing_id, qty in items]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_transfer_reports()
+    return order_id
+
+
+def pending_orders(conn, target_id):
+    p = placeholder(conn)
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT t.id, w1.name AS source_name, t.created_at
+        FROM transfer_orders t
+        JOIN warehouses w1 ON t.source_warehouse_id = w1.id
+        WHERE t.target_warehouse_id = {p} AND t.status = 'Pending'
+        ORDER BY t.created_at DESC
+    ''', (target_id,))
+    return c.fetchall()
+
+
+def order_items(conn, order_id):
+    p = placeholder(conn)
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT toi.ingredient_id, i.name, i.unit, toi.quantity
+        FROM transfer_order_items toi
+        JOIN ingredients i ON toi.ingredient_id = i.id
+        WHERE toi.transfer_order_id = {p}
+    ''', (order_id,))
+    return c.fetchall()
+
+
+def source_shortages(conn, source_id, quantities, for_update=False):
+    """{ingredient_id: (quantity, on_hand)} for the {ingredient_id: quantity} the source warehouse does not hold."""
+    on_hand = read_stock_versions(conn, source_id, quantities, for_update=for_update)
+    shortages = {}
+    for ing_id, qty in quantities.items():
+        held = on_hand.get(ing_id, (0.0, 0))[0]
+        if qty > held + 1e-9:
+            shortages[ing_id] = (qty, held)
+    return shortages
+
+
+def receive_transfer_order(conn, order_id, items, received_by=None):
+    """Post a received order: the full sent quantity leaves the source, the accepted part reaches the target.
+
+    `items` are (ingredient_id, sent, accepted, returned, wasted). Stock moves go through
+    apply_stock_deltas, so both sides are logged and their alerts refreshed in the same transaction,
+    and the lines are added to the weekly waste summary; run ensure_waste_summary() first.
+    Raises InsufficientStockError, and posts nothing, if the source does not hold the sent quantities.
+    """
+    p = placeholder(conn)
+    c = conn.cursor()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        c.execute(f"SELECT source_warehouse_id, target_warehouse_id FROM transfer_orders WHERE id = {p}", (order_id,))
+        source_id, target_id = c.fetchone()
+
+        sent, accepted = {}, {}
+        for ing_id, sent_qty, accepted_qty, _, _ in items:
+            sent[ing_id] = sent.get(ing_id, 0) - float(sent_qty)
+            accepted[ing_id] = accepted.get(ing_id, 0) + float(accepted_qty)
+        shortages = source_shortages(conn, source_id, {ing_id: -qty for ing_id, qty in sent.items()}, for_update=True)
+        if shortages:
+            raise InsufficientStockError(source_id, shortages)
+        # Received stock keeps what it cost at the source, taken from the source's oldest lots
+        issued = fifo_issue_cost(conn, source_id, {ing_id: -qty for ing_id, qty in sent.items()})
+        unit_costs = {ing_id: cost / -sent[ing_id] for ing_id, cost in issued.items()}
+        apply_stock_deltas(conn, source_id, sent, f'Transfer #{order_id} out', now)
+        apply_stock_deltas(conn, target_id, accepted, f'Transfer #{order_id} in', now, unit_costs=unit_costs)
+
+        c.executemany(f'''
+            UPDATE transfer_order_items
+            SET accepted_qty = {p}, returned_qty = {p}, wasted_qty = {p}
+            WHERE transfer_order_id = {p} AND ingredient_id = {p}
+        ''', [(accepted_qty, returned, wasted, order_id, ing_id) for ing_id, _, accepted_qty, returned, wasted in items])
+        c.execute(f"UPDATE transfer_orders SET status = 'Received', received_at = {p}, received_by = {p} WHERE id = {p}",
+                  (now, received_by or None, order_id))
+        post_waste_summary(conn, order_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_transfer_reports()
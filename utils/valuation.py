@@ -0,0 +1,119 @@
+import pandas as pd
+
+from utils.sql import is_sqlite, placeholder
+
+
+def ensure_daily_balances(conn):
+    """Create the per-day net movement table and the watermark of the movements folded into it."""
+    c = conn.cursor()
+    day_type = 'TEXT' if is_sqlite(conn) else 'CHAR(10)'
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS stock_daily_balances (
+            warehouse_id INTEGER,
+            ingredient_id INTEGER,
+            day {day_type},
+            net_change {'REAL' if is_sqlite(conn) else 'DECIMAL(16,6)'},
+            PRIMARY KEY (warehouse_id, ingredient_id, day)
+        )
+    ''')
+    c.execute('CREATE TABLE IF NOT EXISTS stock_daily_balances_watermark (last_movement_id INTEGER)')
+    c.execute('SELECT COUNT(*) FROM stock_daily_balances_watermark')
+    if c.fetchone()[0] == 0:
+        c.execute('INSERT INTO stock_daily_balances_watermark (last_movement_id) VALUES (0)')
+    conn.commit()
+
+
+def refresh_daily_balances(conn, rebuild=False):
+    """Fold stock_movements logged since the last refresh into stock_daily_balances.
+
+    Movements are append-only, so only rows above the watermark id are aggregated; pass
+    rebuild=True after movements were edited or deleted by hand. Returns the movements folded in.
+    """
+    ensure_daily_balances(conn)
+    p = placeholder(conn)
+    c = conn.cursor()
+    if rebuild:
+        c.execute('DELETE FROM stock_daily_balances')
+        c.execute('UPDATE stock_daily_balances_watermark SET last_movement_id = 0')
+    c.execute('SELECT last_movement_id FROM stock_daily_balances_watermark')
+    watermark = c.fetchone()[0]
+    c.execute(f'SELECT COUNT(*), MAX(id) FROM stock_movements WHERE id > {p}', (watermark,))
+    count, last_id = c.fetchone()
+    if not count:
+        return 0
+
+    change = 'change' if is_sqlite(conn) else '`change`'
+    upsert = ('ON CONFLICT(warehouse_id, ingredient_id, day) DO UPDATE SET net_change = net_change + excluded.net_change'
+              if is_sqlite(conn) else 'ON DUPLICATE KEY UPDATE net_change = net_change + VALUES(net_change)')
+    c.execute(f'''
+        INSERT INTO stock_daily_balances (warehouse_id, ingredient_id, day, net_change)
+        SELECT warehouse_id, ingredient_id, SUBSTR(timestamp, 1, 10), SUM({change})
+        FROM stock_movements
+        WHERE id > {p} AND id <= {p} AND warehouse_id IS NOT NULL
+        GROUP BY warehouse_id, ingredient_id, SUBSTR(timestamp, 1, 10)
+        {upsert}
+    ''', (watermark, last_id))
+    c.execute(f'UPDATE stock_daily_balances_watermark SET last_movement_id = {p}', (last_id,))
+    conn.commit()
+    return count
+
+
+def stock_as_of(conn, dates, warehouse_id=None):
+    """Quantity and value of every stock position at the end of each of `dates` (YYYY-MM-DD).
+
+    A position at date D is its current quantity less the net movements after D, so stock that
+    predates movement logging is still counted. All dates come from one conditional aggregation
+    over stock_daily_balances. Values use the current price_per_unit.
+    Returns a long frame: date, warehouse, category, ingredient, unit, quantity, price, value.
+    """
+    dates = sorted({str(pd.Timestamp(d).date()) for d in dates})
+    columns = ['date', 'warehouse', 'category', 'ingredient', 'unit', 'quantity', 'price', 'value']
+    if not dates:
+        return pd.DataFrame(columns=columns)
+    refresh_daily_balances(conn)
+    p = placeholder(conn)
+
+    after = ', '.join(f'SUM(CASE WHEN day > {p} THEN net_change ELSE 0 END) AS after_{i}' for i in range(len(dates)))
+    warehouse_filter = f'WHERE ws.warehouse_id = {p}' if warehouse_id is not None else ''
+    df = pd.read_sql_query(f'''
+        SELECT wh.name AS warehouse, COALESCE(ic.name, 'Uncategorized') AS category, i.name AS ingredient, i.unit,
+               COALESCE(i.price_per_unit, 0) AS price, COALESCE(ws.quantity, 0) AS current_quantity,
+               {', '.join(f'COALESCE(d.after_{i}, 0) AS after_{i}' for i in range(len(dates)))}
+        FROM warehouse_stock ws
+        JOIN warehouses wh ON wh.id = ws.warehouse_id
+        JOIN ingredients i ON i.id = ws.ingredient_id
+        LEFT JOIN warehouse w ON w.ingredient_id = ws.ingredient_id
+        LEFT JOIN inventory_categories ic ON ic.id = w.category_id
+        LEFT JOIN (
+            SELECT warehouse_id, ingredient_id, {after}
+            FROM stock_daily_balances
+            WHERE day > {p}
+            GROUP BY warehouse_id, ingredient_id
+        ) d ON d.warehouse_id = ws.warehouse_id AND d.ingredient_id = ws.ingredient_id
+        {warehouse_filter}
+    ''', conn, params=(*dates, dates[0], *([warehouse_id] if warehouse_id is not None else [])))
+
+    frames = []
+    for i, date in enumerate(dates):
+        frames.append(pd.DataFrame({
+            'date': date,
+            'warehouse': df['warehouse'],
+            'category': df['category'],
+            'ingredient': df['ingredient'],
+            'unit': df['unit'],
+            'quantity': df['current_quantity'] - df[f'after_{i}'],
+            'price': df['price'],
+        }))
+    result = pd.concat(frames, ignore_index=True)
+    result['value'] = result['quantity'] * result['price']
+    return result[columns]
+
+
+def month_ends(start, end):
+    """Month-end dates (YYYY-MM-DD) from the month of `start` to the month of `end`, inclusive."""
+    return [str(month.end_time.date()) for month in pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq='M')]
+
+
+def valuation_summary(positions):
+    """Value per date × warehouse × category for a stock_as_of() frame."""
+    return positions.groupby(['date', 'warehouse', 'category'], as_index=False)[['quantity', 'value']].sum()
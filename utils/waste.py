@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from utils.sql import is_sqlite, placeholder
+from utils.stock import _columns, _table_exists
+
+# Trend detection compares the waste rate of the last RECENT_WEEKS with the BASELINE_WEEKS before;
+# a change is flagged when the rate moved by TREND_RATIO and at least TREND_MIN_DELTA (1 point)
+RECENT_WEEKS = 4
+BASELINE_WEEKS = 12
+TREND_RATIO = 1.5
+TREND_MIN_DELTA = 0.01
+
+WASTE_KEYS = ['week', 'source_warehouse_id', 'target_warehouse_id', 'received_by', 'ingredient_id']
+
+
+def _week_sql(conn, column):
+    # Monday of the column's week, as YYYY-MM-DD
+    if is_sqlite(conn):
+        return f"DATE({column}, 'weekday 0', '-6 days')"
+    return f"DATE_SUB(DATE({column}), INTERVAL WEEKDAY({column}) DAY)"
+
+
+def ensure_waste_summary(conn):
+    """Add received_at/received_by to transfer_orders and create the weekly waste aggregate.
+
+    transfer_waste_weekly holds sent/accepted/returned/wasted per week × route × receiver ×
+    ingredient. It is filled from every received order when first created, then kept current by
+    post_waste_summary() as each order is received.
+    """
+    sqlite = is_sqlite(conn)
+    text = 'TEXT' if sqlite else 'VARCHAR(255)'
+    real = 'REAL' if sqlite else 'DECIMAL(16,6)'
+    c = conn.cursor()
+    existing = _columns(conn, 'transfer_orders')
+    for column in ('received_at', 'received_by'):
+        if column not in existing:
+            c.execute(f"ALTER TABLE transfer_orders ADD COLUMN {column} {text}")
+
+    backfill = not _table_exists(conn, 'transfer_waste_weekly')
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS transfer_waste_weekly (
+            week {'TEXT' if sqlite else 'CHAR(10)'},
+            source_warehouse_id INTEGER,
+            target_warehouse_id INTEGER,
+            received_by {'TEXT' if sqlite else 'VARCHAR(191)'} NOT NULL DEFAULT '',
+            ingredient_id INTEGER,
+            sent {real},
+            accepted {real},
+            returned {real},
+            wasted {real},
+            PRIMARY KEY (week, source_warehouse_id, target_warehouse_id, received_by, ingredient_id)
+        )
+    ''')
+    if backfill:
+        post_waste_summary(conn)
+    conn.commit()
+
+
+def post_waste_summary(conn, order_id=None):
+    """Add a received order's lines (or, without `order_id`, every received order) to transfer_waste_weekly.
+
+    Orders received before received_at was recorded are filed under their creation week.
+    Does not commit; receive_transfer_order() calls it inside its own transaction.
+    """
+    p = placeholder(conn)
+    received = 'COALESCE(t.received_at, t.created_at)'
+    upsert = ', '.join(f'{col} = {col} + ' + (f'excluded.{col}' if is_sqlite(conn) else f'VALUES({col})')
+                       for col in ('sent', 'accepted', 'returned', 'wasted'))
+    conflict = (f"ON CONFLICT({', '.join(WASTE_KEYS)}) DO UPDATE SET" if is_sqlite(conn)
+                else 'ON DUPLICATE KEY UPDATE')
+    order_filter = f' AND t.id = {p}' if order_id is not None else ''
+    # SQLite needs a WHERE clause in an INSERT ... SELECT upsert to tell ON CONFLICT from a join's ON
+    conn.cursor().execute(f'''
+        INSERT INTO transfer_waste_weekly ({', '.join(WASTE_KEYS)}, sent, accepted, returned, wasted)
+        SELECT {_week_sql(conn, received)}, t.source_warehouse_id, t.target_warehouse_id,
+               COALESCE(t.received_by, ''), toi.ingredient_id,
+               SUM(COALESCE(toi.quantity, 0)), SUM(COALESCE(toi.accepted_qty, 0)),
+               SUM(COALESCE(toi.returned_qty, 0)), SUM(COALESCE(toi.wasted_qty, 0))
+        FROM transfer_order_items toi
+        JOIN transfer_orders t ON t.id = toi.transfer_order_id
+        WHERE t.status = 'Received'{order_filter}
+        GROUP BY {_week_sql(conn, received)}, t.source_warehouse_id, t.target_warehouse_id,
+                 COALESCE(t.received_by, ''), toi.ingredient_id
+        {conflict} {upsert}
+    ''', (order_id,) if order_id is not None else ())
+
+
+def rebuild_waste_summary(conn):
+    """Recompute transfer_waste_weekly from scratch, after receipts were edited by hand."""
+    conn.cursor().execute('DELETE FROM transfer_waste_weekly')
+    post_waste_summary(conn)
+    conn.commit()
+
+
+def waste_rates(summary, by):
+    """Sent, accepted, returned and wasted totals per `by` group with their rates of the sent quantity.
+
+    Shrinkage is everything sent that was not accepted (returned, wasted or unaccounted for).
+    """
+    totals = summary.groupby(by, as_index=False)[['sent', 'accepted', 'returned', 'wasted']].sum()
+    sent = totals['sent'].where(totals['sent'] > 0)
+    totals['waste_rate'] = (totals['wasted'] / sent).fillna(0.0)
+    totals['return_rate'] = (totals['returned'] / sent).fillna(0.0)
+    totals['shrinkage_rate'] = ((totals['sent'] - totals['accepted']) / sent).fillna(0.0)
+    return totals.sort_values('waste_rate', ascending=False, ignore_index=True)
+
+
+def waste_trends(summary, by, as_of=None):
+    """Recent against baseline waste rate per `by` group, with the weekly slope and a trend label.
+
+    The slope is a least-squares fit of the weekly waste rate over the recent and baseline weeks,
+    computed for every group at once from grouped sums. Groups with nothing sent recently are left out.
+    """
+    columns = list(by) + ['baseline_rate', 'recent_rate', 'slope_per_week', 'trend']
+    if summary.empty:
+        return pd.DataFrame(columns=columns)
+    weeks = pd.to_datetime(summary['week'])
+    last = pd.Timestamp(as_of).normalize() if as_of is not None else weeks.max()
+    age = ((last - weeks).dt.days // 7).to_numpy()
+    window = summary.assign(age=age)[(age >= 0) & (age < RECENT_WEEKS + BASELINE_WEEKS)]
+    window = window.assign(recent=window['age'] < RECENT_WEEKS)
+
+    periods = pd.MultiIndex.from_product([['sent', 'wasted'], [False, True]])
+    per_period = (window.groupby(list(by) + ['recent'])[['sent', 'wasted']].sum()
+                  .unstack('recent', fill_value=0.0)
+                  .reindex(columns=periods, fill_value=0.0))
+    baseline_sent, recent_sent = per_period[('sent', False)], per_period[('sent', True)]
+    trends = pd.DataFrame({
+        'baseline_rate': (per_period[('wasted', False)] / baseline_sent.where(baseline_sent > 0)).fillna(0.0),
+        'recent_rate': per_period[('wasted', True)] / recent_sent.where(recent_sent > 0),
+    }).dropna(subset=['recent_rate'])
+
+    weekly = window.groupby(list(by) + ['age'], as_index=False)[['sent', 'wasted']].sum()
+    weekly = weekly[weekly['sent'] > 0]
+    weekly = weekly.assign(x=-weekly['age'].astype(float), y=weekly['wasted'] / weekly['sent'])
+    weekly = weekly.assign(xy=weekly['x'] * weekly['y'], xx=weekly['x'] ** 2)
+    sums = weekly.groupby(list(by))[['x', 'y', 'xy', 'xx']].sum()
+    n = weekly.groupby(list(by)).size()
+    denominator = (n * sums['xx'] - sums['x'] ** 2).where(lambda d: d > 0)
+    trends['slope_per_week'] = ((n * sums['xy'] - sums['x'] * sums['y']) / denominator).reindex(trends.index).fillna(0.0)
+
+    delta = trends['recent_rate'] - trends['baseline_rate']
+    rising = (delta >= TREND_MIN_DELTA) & (trends['recent_rate'] >= trends['baseline_rate'] * TREND_RATIO)
+    falling = (-delta >= TREND_MIN_DELTA) & (trends['recent_rate'] * TREND_RATIO <= trends['baseline_rate'])
+    trends['trend'] = np.select([rising, falling], ['Rising', 'Falling'], default='Stable')
+    return trends.reset_index()[columns].sort_values('recent_rate', ascending=False, ignore_index=True)
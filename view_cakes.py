@@ -12,7 +12,13 @@ from config import DB_PATH
 import streamlit as st
 import pandas as pd
 from mysql.connector import Error
-from db import get_connection  # Make sure you have this defined
+from db import get_connection, get_sqlite_connection  # Make sure you have this defined
+from utils.cost_index import invalidate_recipe_index, get_recipe_index, usage_map, fetch_prices
+from utils.cost_layers import average_unit_costs
+from utils.recipe_graph import parent_cake_names
+from utils.search import ranked_ids
+from utils.stock import _table_exists
+from utils.costing import cake_parts, cake_components, cost_breakdown, component_breakdown, all_cake_costs
 
 def view_costs():
     st.header('🎂 View Cake Costs')
@@ -30,64 +36,19 @@ def view_costs():
         selected = st.selectbox('Select Cake to View Cost', [f"{n} (ID:{i})" for i, n in cakes])
         cid = int(selected.split('(ID:')[1].replace(')', ''))
 
-        c.execute('SELECT ingredient_or_subrecipe_id, is_subrecipe, quantity FROM cake_ingredients WHERE cake_id = %s', (cid,))
-        parts = c.fetchall()
-
-        total = 0.0
-        direct_items = []
-
-        for iid, is_sub, qty in parts:
-            qty = float(qty)
-            if is_sub:
-                c.execute('SELECT name FROM sub_recipes WHERE id = %s', (iid,))
-                sub_name = c.fetchone()[0]
-
-                c.execute('''
-                    SELECT sri.ingredient_id, sri.quantity, i.name, i.price_per_unit, i.unit
-                    FROM sub_recipe_ingredients sri
-                    JOIN ingredients i ON sri.ingredient_id = i.id
-                    WHERE sri.sub_recipe_id = %s
-                ''', (iid,))
-                sub_ingredients = c.fetchall()
-
-                sub_total_weight = sum([float(row[1]) for row in sub_ingredients])
-                sub_total = 0.0
-                sub_rows = []
-
-                if sub_total_weight == 0:
-                    st.error(f"⚠️ Sub-recipe '{sub_name}' has zero total weight. Cannot calculate proportions.")
-                    continue
-
-                for _, sub_qty, name, price, unit in sub_ingredients:
-                    sub_qty = float(sub_qty)
-                    price = float(price)
-                    ratio = sub_qty / sub_total_weight
-                    scaled_qty = ratio * qty
-                    scaled_cost = scaled_qty * price
-                    sub_total += scaled_cost
-                    sub_rows.append({
-                        'Ingredient': name,
-                        'Quantity Used': round(scaled_qty, 4),
-                        'Unit': unit,
-                        'Cost': round(scaled_cost, 2)
-                    })
-
-                st.subheader(f"🧪 Sub-Recipe: {sub_name} × {qty} kg")
-                st.dataframe(pd.DataFrame(sub_rows))
-                total += sub_total
-
-            else:
-                c.execute('SELECT name, price_per_unit, unit FROM ingredients WHERE id = %s', (iid,))
-                name, price, unit = c.fetchone()
-                price = float(price)
-                cost = price * qty
-                total += cost
-                direct_items.append({
-                    'Ingredient': name,
-                    'Quantity': qty,
-                    'Unit': unit,
-                    'Cost': round(cost, 2)
-                })
+        direct_items, sub_sections, parts_total, warnings = cost_breakdown(conn, cake_parts(conn, cid))
+        cake_sections, components_total, component_warnings = component_breakdown(conn, cake_components(conn, cid))
+        total = parts_total + components_total
+        for warning in warnings + component_warnings:
+            st.error(warning)
+
+        for sub_name, qty, sub_rows, _ in sub_sections:
+            st.subheader(f"🧪 Sub-Recipe: {sub_name} × {qty} kg")
+            st.dataframe(pd.DataFrame(sub_rows))
+
+        for cake_name, qty, cake_rows, _ in cake_sections:
+            st.subheader(f"🎂 Cake: {cake_name} × {qty}")
+            st.dataframe(pd.DataFrame(cake_rows))
 
         if direct_items:
             st.subheader("🧾 Direct Ingredients")
@@ -95,6 +56,19 @@ def view_costs():
 
         st.success(f"💰 Total Cost: {round(total, 2)}")
 
+        # The same recipe at what the stock on hand actually cost (weighted average over all
+        # warehouses); cost layers are kept with the stock in the SQLite warehouse database
+        usage = usage_map(get_recipe_index(conn), 'cake_usage').get(cid, {})
+        stock_conn = get_sqlite_connection()
+        try:
+            averages = average_unit_costs(stock_conn, usage) if _table_exists(stock_conn, 'inventory_costs') else {}
+        finally:
+            stock_conn.close()
+        if averages:
+            prices = fetch_prices(conn, usage)
+            stock_cost = sum(qty * averages.get(ing_id, prices.get(ing_id, 0.0)) for ing_id, qty in usage.items())
+            st.info(f"📦 At Stock Cost (weighted average): {round(stock_cost, 2)} ({stock_cost - total:+.2f} vs list prices)")
+
     except Error as e:
         st.error(f"MySQL Error: {e}")
     finally:
@@ -115,50 +89,25 @@ def view_all_cakes():
     conn = get_connection()
     c = conn.cursor()
 
-    if search_term:
-        c.execute("SELECT id, name, percent_yield FROM cakes WHERE name LIKE %s", (f"%{search_term}%",))
+    if search_term.strip():
+        matches = ranked_ids(conn, "cakes", search_term)
+        if matches:
+            c.execute(f"SELECT id, name, percent_yield FROM cakes WHERE id IN ({', '.join(['%s'] * len(matches))})",
+                      tuple(matches))
+        cakes = sorted(c.fetchall(), key=lambda row: matches[row[0]]) if matches else []
     else:
         c.execute("SELECT id, name, percent_yield FROM cakes")
-
-    cakes = c.fetchall()
+        cakes = c.fetchall()
 
     if not cakes:
         st.warning("No cakes found.")
         conn.close()
         return
 
-    for cake_id, name, yield_percent in cakes:
-        total_cost = 0
-
-        c.execute('SELECT ingredient_or_subrecipe_id, is_subrecipe, quantity FROM cake_ingredients WHERE cake_id = %s', (cake_id,))
-        parts = c.fetchall()
-
-        for iid, is_sub, qty in parts:
-            if is_sub:
-                c.execute('''
-                    SELECT sri.ingredient_id, sri.quantity, i.price_per_unit
-                    FROM sub_recipe_ingredients sri
-                    JOIN ingredients i ON sri.ingredient_id = i.id
-                    WHERE sri.sub_recipe_id = %s
-                ''', (iid,))
-                sub_ings = c.fetchall()
-                c.execute('SELECT SUM(quantity) FROM sub_recipe_ingredients WHERE sub_recipe_id = %s', (iid,))
-                total_weight = c.fetchone()[0]
-                if total_weight:
-                    for ing_id, ing_qty, price in sub_ings:
-                        if price is not None:
-                            total_cost += (float(ing_qty) / float(total_weight)) * float(qty) * float(price)
-                        else:
-                            st.warning(f"⚠️ Missing price for ingredient ID {ing_id} in sub-recipe {iid}")
-            else:
-                c.execute('SELECT price_per_unit FROM ingredients WHERE id = %s', (iid,))
-                result = c.fetchone()
-                if result and result[0] is not None:
-                    price = result[0]
-                    total_cost += float(qty) * float(price)
-                else:
-                    st.warning(f"⚠️ Missing or deleted ingredient ID {iid} in cake '{name}'")
+    costs = all_cake_costs(conn, [cake_id for cake_id, _, _ in cakes])
 
+    for cake_id, name, yield_percent in cakes:
+        total_cost = costs[cake_id]
         adjusted_cost = total_cost * (1 + float(yield_percent) / 100)
 
         cols = st.columns([5, 1, 1])
@@ -172,12 +121,55 @@ def view_all_cakes():
                 return
         with cols[2]:
             if st.button("🗑️ Delete", key=f"delete_{cake_id}"):
-                c.execute("DELETE FROM cake_ingredients WHERE cake_id = %s", (cake_id,))
-                c.execute("DELETE FROM cakes WHERE id = %s", (cake_id,))
-                conn.commit()
-                st.success(f"Deleted '{name}' successfully!")
-                conn.close()
-                st.experimental_rerun()
-                return
+                # Deleting a component would silently change the recipe and cost of every cake using it
+                parents = parent_cake_names(conn, cake_id)
+                if parents:
+                    st.error(f"'{name}' is used inside {', '.join(parents)}. Remove it from those cakes before deleting it.")
+                else:
+                    c.execute("DELETE FROM cake_ingredients WHERE cake_id = %s", (cake_id,))
+                    c.execute("DELETE FROM cake_components WHERE cake_id = %s", (cake_id,))
+                    c.execute("DELETE FROM cakes WHERE id = %s", (cake_id,))
+                    conn.commit()
+                    invalidate_recipe_index()
+                    st.success(f"Deleted '{name}' successfully!")
+                    conn.close()
+                    st.experimental_rerun()
+                    return
 
     conn.close()
+
+
+def price_simulation():
+    from utils.cost_index import get_recipe_index
+    from utils.price_simulation import load_prices_and_categories, simulate_costs
+
+    st.header("🧮 What-If Price Simulation")
+    st.caption("Try hypothetical price changes without touching ingredient prices.")
+
+    # The index and prices are loaded once per rerun and shared by the pickers and the simulation
+    conn = get_connection()
+    index = get_recipe_index(conn)
+    names, prices, categories = load_prices_and_categories(conn, index['ingredient_ids'])
+    conn.close()
+    name_to_id = dict(zip(names, index['ingredient_ids'].tolist()))
+
+    st.subheader("📂 Category Changes")
+    category_pct = {}
+    for cat in st.multiselect("Categories", sorted(set(categories))):
+        category_pct[cat] = st.number_input(f"{cat} change (%)", value=0.0, step=0.5, format="%.2f", key=f"sim_cat_{cat}")
+
+    st.subheader("🧾 Ingredient Changes")
+    ingredient_pct = {}
+    for name in st.multiselect("Ingredients", sorted(name_to_id)):
+        ingredient_pct[name_to_id[name]] = st.number_input(f"{name} change (%)", value=0.0, step=0.5, format="%.2f", key=f"sim_ing_{name_to_id[name]}")
+
+    df = simulate_costs(index, prices, categories, ingredient_pct, category_pct)
+
+    if df.empty:
+        st.warning("No cakes found.")
+        return
+
+    df = df.sort_values('Change', ascending=False)
+    st.dataframe(df, use_container_width=True)
+    st.success(f"💰 Catalogue cost: {df['Current Cost'].sum():,.2f} → {df['Scenario Cost'].sum():,.2f} "
+               f"({df['Change'].sum():+,.2f})")
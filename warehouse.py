@@ -12,19 +12,14 @@ import socket
 import os
 from dotenv import load_dotenv
 
-from Add_Items import add_cake, add_sub_recipe, add_ingredient
-from Manage_Items import manage_sub_recipes, manage_cakes, manage_ingredients
-from Quick_add import quick_add_cake, quick_add_sub_recipe
-from Add_stock import update_stock
-from view_cakes import view_costs, view_all_cakes
-from Batch import batch_production
-from Warehouse_functions import create_transfer_order_page, create_kitchen_batch_log_table, receive_transfer_order_page, manage_categories
-from Warehouse_Reports import view_warehouse, transfer_dashboard_page, transfer_visual_dashboard_page, transfer_order_history_page, stock_report
+from app_pages import PAGES, ADMIN_PAGES, render_page
+from Warehouse_Reports import low_stock_badge
 
 import sys
 sys.path.append('/home/ec2-user/.config/cake_warehouse')
 from auth_secrets import HASHED_PASSWORD
 from db import get_connection
+from utils.search import SEARCH_TABLES, ensure_search_index
 
 load_dotenv()
 
@@ -49,14 +44,42 @@ def check_password():
     else:
         return True
 
+# Recipe quantities are often fractions of a kilo and prices per gram are tiny, so two decimals
+# silently truncated them; six keep sub-recipe proportions and per-unit costs exact.
+QUANTITY_TYPE = 'DECIMAL(16,6)'
+PRICE_TYPE = 'DECIMAL(16,6)'
+DECIMAL_COLUMNS = {
+    ('ingredients', 'price_per_unit'): PRICE_TYPE,
+    ('sub_recipe_ingredients', 'quantity'): QUANTITY_TYPE,
+    ('cake_ingredients', 'quantity'): QUANTITY_TYPE,
+    ('cake_components', 'quantity'): QUANTITY_TYPE,
+    ('sub_recipe_nested', 'quantity'): QUANTITY_TYPE,
+    ('warehouse', 'quantity'): QUANTITY_TYPE + ' DEFAULT 0',
+    ('warehouse', 'par_level'): QUANTITY_TYPE,
+    ('stock_movements', 'change'): QUANTITY_TYPE,
+}
+
+def widen_decimal_columns(conn):
+    """Upgrade columns created with fewer decimals than DECIMAL_COLUMNS; safe to run on every start."""
+    c = conn.cursor()
+    c.execute('''
+        SELECT TABLE_NAME, COLUMN_NAME, NUMERIC_SCALE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND DATA_TYPE = 'decimal'
+    ''')
+    scales = {(table, column): scale for table, column, scale in c.fetchall()}
+    for (table, column), column_type in DECIMAL_COLUMNS.items():
+        if (table, column) in scales and scales[(table, column)] < 6:
+            c.execute(f'ALTER TABLE {table} MODIFY `{column}` {column_type}')
+    conn.commit()
+
 def init_db():
     conn = get_connection()
     c = conn.cursor()
 
-    c.execute('''CREATE TABLE IF NOT EXISTS ingredients (
+    c.execute(f'''CREATE TABLE IF NOT EXISTS ingredients (
         id INT AUTO_INCREMENT PRIMARY KEY,
         name VARCHAR(255) UNIQUE,
-        price_per_unit DECIMAL(10,2),
+        price_per_unit {PRICE_TYPE},
         unit VARCHAR(50)
     )''')
 
@@ -65,11 +88,11 @@ def init_db():
         name VARCHAR(255) UNIQUE
     )''')
 
-    c.execute('''CREATE TABLE IF NOT EXISTS sub_recipe_ingredients (
+    c.execute(f'''CREATE TABLE IF NOT EXISTS sub_recipe_ingredients (
         id INT AUTO_INCREMENT PRIMARY KEY,
         sub_recipe_id INT,
         ingredient_id INT,
-        quantity DECIMAL(10,2),
+        quantity {QUANTITY_TYPE},
         FOREIGN KEY(sub_recipe_id) REFERENCES sub_recipes(id),
         FOREIGN KEY(ingredient_id) REFERENCES ingredients(id)
     )''')
@@ -79,37 +102,46 @@ def init_db():
         name VARCHAR(255) UNIQUE
     )''')
 
-    c.execute('''CREATE TABLE IF NOT EXISTS cake_ingredients (
+    c.execute(f'''CREATE TABLE IF NOT EXISTS cake_ingredients (
         id INT AUTO_INCREMENT PRIMARY KEY,
         cake_id INT,
         ingredient_or_subrecipe_id INT,
         is_subrecipe BOOLEAN,
-        quantity DECIMAL(10,2),
+        quantity {QUANTITY_TYPE},
         FOREIGN KEY(cake_id) REFERENCES cakes(id)
     )''')
 
-    c.execute('''CREATE TABLE IF NOT EXISTS sub_recipe_nested (
+    c.execute(f'''CREATE TABLE IF NOT EXISTS cake_components (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        cake_id INT,
+        component_cake_id INT,
+        quantity {QUANTITY_TYPE},
+        FOREIGN KEY(cake_id) REFERENCES cakes(id),
+        FOREIGN KEY(component_cake_id) REFERENCES cakes(id)
+    )''')
+
+    c.execute(f'''CREATE TABLE IF NOT EXISTS sub_recipe_nested (
         id INT AUTO_INCREMENT PRIMARY KEY,
         parent_sub_recipe_id INT,
         sub_recipe_id INT,
-        quantity DECIMAL(10,2),
+        quantity {QUANTITY_TYPE},
         FOREIGN KEY(parent_sub_recipe_id) REFERENCES sub_recipes(id),
         FOREIGN KEY(sub_recipe_id) REFERENCES sub_recipes(id)
     )''')
 
-    c.execute('''CREATE TABLE IF NOT EXISTS warehouse (
+    c.execute(f'''CREATE TABLE IF NOT EXISTS warehouse (
         ingredient_id INT PRIMARY KEY,
-        quantity DECIMAL(10,2) DEFAULT 0,
+        quantity {QUANTITY_TYPE} DEFAULT 0,
         last_updated DATETIME,
         category_id INT,
-        par_level DECIMAL(10,2),
+        par_level {QUANTITY_TYPE},
         FOREIGN KEY(ingredient_id) REFERENCES ingredients(id)
     )''')
 
-    c.execute('''CREATE TABLE IF NOT EXISTS stock_movements (
+    c.execute(f'''CREATE TABLE IF NOT EXISTS stock_movements (
         id INT AUTO_INCREMENT PRIMARY KEY,
         ingredient_id INT,
-        `change` DECIMAL(10,2),
+        `change` {QUANTITY_TYPE},
         reason TEXT,
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY(ingredient_id) REFERENCES ingredients(id)
@@ -121,6 +153,9 @@ def init_db():
     )''')
 
     conn.commit()
+    widen_decimal_columns(conn)
+    for table in SEARCH_TABLES:
+        ensure_search_index(conn, table)
     conn.close()
 
 def main():
@@ -144,62 +179,9 @@ def main():
 
     init_db()
 
-    menu = [
-        'Quick Add Cake', 'Add Ingredient', 'Add Sub-Recipe', 'Quick Add Sub-Recipe', 'Add Cake',
-        'View Costs', 'Batch Production', 'Manage Ingredients', 'Manage Sub-Recipes', 'Manage Cakes',
-        'Cake Report', 'Warehouse Overview', 'Manage Categories', 'Update Stock', 'Stock Report',
-        'Stock Movements', 'Transfer Orders', 'Receive Transfers', 'Transfer History',
-        'Transfer Dashboard', 'Transfer Charts', 'Kitchen Production'
-    ]
-
-    choice = st.sidebar.selectbox('Navigation', menu)
-
-    if "edit_cake_id" in st.session_state:
-        cake_id = st.session_state.edit_cake_id
-        del st.session_state.edit_cake_id
-        add_cake(cake_id)
-        return
-
-    if choice == 'Quick Add Cake':
-        quick_add_cake()
-    elif choice == 'Add Ingredient':
-        add_ingredient()
-    elif choice == 'Add Sub-Recipe':
-        add_sub_recipe()
-    elif choice == 'Quick Add Sub-Recipe':
-        quick_add_sub_recipe()
-    elif choice == 'Add Cake':
-        add_cake()
-    elif choice == 'View Costs':
-        view_costs()
-    elif choice == 'Batch Production':
-        batch_production()
-    elif choice == 'Manage Ingredients':
-        manage_ingredients()
-    elif choice == 'Manage Sub-Recipes':
-        manage_sub_recipes()
-    elif choice == 'Manage Cakes':
-        manage_cakes()
-    elif choice == 'Cake Report':
-        view_all_cakes()
-    elif choice == 'Warehouse Overview':
-        view_warehouse()
-    elif choice == 'Update Stock':
-        update_stock()
-    elif choice == 'Stock Report':
-        stock_report()
-    elif choice == 'Manage Categories':
-        manage_categories()
-    elif choice == 'Transfer Orders':
-        create_transfer_order_page()
-    elif choice == 'Receive Transfers':
-        receive_transfer_order_page()
-    elif choice == 'Transfer History':
-        transfer_order_history_page()
-    elif choice == 'Transfer Dashboard':
-        transfer_dashboard_page()
-    elif choice == 'Transfer Charts':
-        transfer_visual_dashboard_page()
+    choice = st.sidebar.selectbox('Navigation', list(PAGES) + list(ADMIN_PAGES))
+    low_stock_badge()
+    render_page(choice)
 
 if __name__ == '__main__':
     if check_password():